@@ -1,14 +1,92 @@
 import argparse
+import sys
 
-from run_cassandra import run_cassandra
-from run_couch import run_couch
-from run_mongo import run_mongo
 
+def add_load_args(parser):
+    """모든 서브커맨드에 공통인 부하 생성 옵션"""
+    # 동시에 요청을 보내는 워커 수(closed loop: 응답을 받아야 다음 요청)
+    parser.add_argument("--concurrency", type=int, default=1)
+    # 부하를 나눠 돌릴 프로세스 수(프로세스마다 자기 연결 + --concurrency 워커, 키 k % P 몫의 연산)
+    parser.add_argument("--processes", type=int, default=1)
+    # 초당 목표 요청 수(open loop). 지정하면 예정 송신 시각부터 지연을 잰다
+    parser.add_argument("--rate", type=float, default=None)
+    # 연산을 B개씩 묶어 bulk 요청으로 보냄(백엔드가 write_many/read_many 를 지원할 때, 1이면 끔)
+    parser.add_argument("--batch-size", type=int, default=1)
+    # 클라이언트 세션 수(세션 보장 판정 단위, 0이면 워커 수). 워커는 자기 몫의 세션을 번갈아 씀
+    parser.add_argument("--sessions", type=int, default=0)
+    # 키 분포(uniform/zipfian/hotspot/latest)와 분포별 모양
+    parser.add_argument("--key-dist", default="uniform", choices=["uniform", "zipfian", "hotspot", "latest"])
+    parser.add_argument("--zipf-theta", type=float, default=0.99)
+    parser.add_argument("--hot-fraction", type=float, default=0.2)
+    parser.add_argument("--hot-prob", type=float, default=0.8)
+    parser.add_argument("--op-seed", type=int, default=42)
+    # 연산 목록을 NumPy 로 생성(빠르지만 순수 파이썬과 목록이 달라짐 → 환경 간 비교는 --save-ops 파일로)
+    parser.add_argument("--vectorize", default="off", choices=["on", "off"])
+    # 연산 목록 저장/재생(같은 파일이면 모든 백엔드가 똑같은 부하를 받음)
+    parser.add_argument("--save-ops", default=None)
+    parser.add_argument("--ops-file", default=None)
+    # 측정 전 적재: 키 0..keys-1 을 다음 버전(빈 저장소면 1)으로 채움(--preload-batch 개씩 bulk). 측정 지표에서 제외
+    parser.add_argument("--preload", default="off", choices=["on", "off"])
+    parser.add_argument("--preload-batch", type=int, default=1000)
+    # 측정 전 예열: 같은 부하를 N 연산 또는 T 초 돌리고 버림(0이면 끔, 둘 다면 먼저 닿는 쪽)
+    parser.add_argument("--warmup-ops", type=int, default=0)
+    parser.add_argument("--warmup-s", type=float, default=0.0)
 
-def main():
-    """명령행 인자를 파싱하고 각 모드별 벤치마크 함수를 호출"""
+
+def add_probe_args(parser):
+    """복제 지연 프로브 옵션(--lag-probe N 이면 일반 벤치 대신 프로브 실행)"""
+    # 마커를 몇 번 쓸지(0이면 프로브 끔)
+    parser.add_argument("--lag-probe", type=int, default=0)
+    # 복제본 폴링 간격/포기 시간/마커 사이 간격(ms)
+    parser.add_argument("--probe-poll-ms", type=float, default=1.0)
+    parser.add_argument("--probe-timeout-ms", type=float, default=10000.0)
+    parser.add_argument("--probe-interval-ms", type=float, default=50.0)
+    # 프로브 동안 배경 부하(일반 벤치와 같은 부하 옵션 사용)를 걸지
+    parser.add_argument("--bg", default="on", choices=["on", "off"])
+
+
+# 지연 프로브 결과 CSV 의 열 순서(복제본마다 한 줄)
+PROBE_HEADERS = [
+    "model",
+    "replica",
+    "probes",
+    "visible",
+    "timeouts",
+    "avg_lag_ms",
+    "p50_lag_ms",
+    "p90_lag_ms",
+    "p99_lag_ms",
+    "max_lag_ms",
+    "bg_ops_per_s",
+]
+
+# CSV 한 줄 결과의 열 순서
+HEADERS = [
+    "model",
+    "reads",
+    "writes",
+    "avg_read_ms",
+    "p95_read_ms",
+    "avg_write_ms",
+    "p95_write_ms",
+    "stale_read_rate",
+    "ryw_violation_rate",
+    "monotonic_read_violation_rate",
+    "prefix_violation_rate",
+    "wfr_violation_rate",
+    "conflicts",
+    "errors",
+    "avg_write_batch_ms",
+    "avg_read_batch_ms",
+    "preload_s",
+    "preload_keys_per_s",
+]
+
+
+def build_parser():
+    """모드별 서브커맨드를 등록한 ArgumentParser(sweep.py 도 같은 파서로 셀마다 인자를 만든다)"""
     # 최상위 ArgumentParser 생성(도움말 문구 포함)
-    p = argparse.ArgumentParser(description="DDIA Ch.5 실무형 벤치마크 (Mongo/Cassandra/CouchDB)")
+    p = argparse.ArgumentParser(description="DDIA Ch.5 실무형 벤치마크 (Mongo/Cassandra/CouchDB/시뮬레이터)")
     # 서브커맨드 등록을 위한 subparsers 생성
     sub = p.add_subparsers(dest="mode", required=True)
 
@@ -29,11 +107,13 @@ def main():
     pm.add_argument("--keys", type=int, default=1000)
     # 쓰기 비율(0.0~1.0)
     pm.add_argument("--write-ratio", type=float, default=0.3)
+    add_load_args(pm)
+    add_probe_args(pm)
 
     # -------------- Cassandra 서브커맨드 --------------
     pc = sub.add_parser("cassandra")
     # 접속 호스트(쉼표 구분, 드라이버가 메타 수집 후 다른 노드도 인지)
-    pc.add_argument("--hosts", required=True, help="host1,host2,host3  (default port 9042)")
+    pc.add_argument("--hosts", default=None, help="host1,host2,host3  (default port 9042)")
     # 키스페이스/테이블 이름
     pc.add_argument("--keyspace", default="bench")
     pc.add_argument("--table", default="kv")
@@ -49,6 +129,17 @@ def main():
     pc.add_argument("--ops", type=int, default=5000)
     pc.add_argument("--keys", type=int, default=1000)
     pc.add_argument("--write-ratio", type=float, default=0.3)
+    add_load_args(pc)
+    add_probe_args(pc)
+    # 비동기 파이프라이닝: 동시에 날아가 있는 요청 수(0이면 동기 execute)
+    pc.add_argument("--async-window", type=int, default=0)
+    # (--batch-size 는 비동기 모드에서 쓰기를 복제본별로 묶는 UNLOGGED BATCH 크기로 쓰임)
+    # 클러스터 없이 스텁 세션으로 비동기 경로 실행(지연 모델은 sim 과 같음)
+    pc.add_argument("--stub", action="store_true")
+    pc.add_argument("--stub-lag-ms", type=float, default=5.0)
+    pc.add_argument("--stub-rtt-ms", type=float, default=0.5)
+    # --preload 때 동시에 날아가 있는 적재 INSERT 수(execute_concurrent, 비동기 모드는 --async-window)
+    pc.add_argument("--preload-concurrency", type=int, default=100)
 
     # ---------------- CouchDB 서브커맨드 ----------------
     pd = sub.add_parser("couch")
@@ -65,35 +156,188 @@ def main():
     pd.add_argument("--write-to", default="both", choices=["a", "b", "both"])
     # 읽기 대상: a/b 중 선택
     pd.add_argument("--read-from", default="a", choices=["a", "b"])
+    # false 면 _bulk_docs 의 new_edits=false 로 리비전을 직접 지정해 씀(409 없음)
+    pd.add_argument("--new-edits", default="true", choices=["true", "false"])
+    # new_edits=false 쓰기에 실어 보낼 조상 리비전 수 상한(DB 의 _revs_limit 도 같은 값으로 맞춤)
+    pd.add_argument("--revs-limit", type=int, default=1000)
+    add_load_args(pd)
+    add_probe_args(pd)
+
+    # ---------------- 시뮬레이터 서브커맨드(Docker 불필요) ----------------
+    ps = sub.add_parser("sim")
+    # 팔로워 수(리더 1 + 팔로워 N)
+    ps.add_argument("--followers", type=int, default=2)
+    # 복제 지연 분포와 평균(ms)
+    ps.add_argument("--lag-dist", default="exp", choices=["const", "uniform", "exp", "lognormal"])
+    ps.add_argument("--lag-ms", type=float, default=5.0)
+    # 클라이언트 ↔ 노드 왕복 시간(ms)
+    ps.add_argument("--rtt-ms", type=float, default=0.5)
+    # 쓰기 컨선/읽기 대상(Mongo 와 같은 의미)
+    ps.add_argument("--write-concern", default="1", choices=["1", "majority", "all"])
+    ps.add_argument("--read-from", default="secondary", choices=["primary", "secondary", "nearest"])
+    # real: 실제로 기다림 / virtual: 가상 시간(기다리지 않고 시계만 진행)
+    ps.add_argument("--clock", default="real", choices=["real", "virtual"])
+    ps.add_argument("--seed", type=int, default=42)
+    # 총 연산 수/키/쓰기 비율
+    ps.add_argument("--ops", type=int, default=5000)
+    ps.add_argument("--keys", type=int, default=1000)
+    ps.add_argument("--write-ratio", type=float, default=0.3)
+    add_load_args(ps)
+    add_probe_args(ps)
+
+    # ---------------- Dynamo 계열 리더리스 시뮬레이터(Docker 불필요) ----------------
+    py = sub.add_parser("dynamo")
+    # 노드 수와 정족수(N 복제본, 쓰기 W / 읽기 R 응답)
+    py.add_argument("--nodes", type=int, default=5)
+    py.add_argument("--n", type=int, default=3)
+    py.add_argument("--w", type=int, default=2)
+    py.add_argument("--r", type=int, default=2)
+    # sloppy quorum / hinted handoff / read repair 켜고 끄기
+    py.add_argument("--sloppy", default="on", choices=["on", "off"])
+    py.add_argument("--hinted-handoff", default="on", choices=["on", "off"])
+    py.add_argument("--read-repair", default="on", choices=["on", "off"])
+    # 클라이언트 ↔ 노드 단방향 지연 분포와 평균(ms)
+    py.add_argument("--lat-dist", default="exp", choices=["const", "uniform", "exp", "lognormal"])
+    py.add_argument("--lat-ms", type=float, default=0.5)
+    # 장애/분단: down-ms 구간마다 노드가 down-prob 확률로 닿지 않음
+    py.add_argument("--down-prob", type=float, default=0.0)
+    py.add_argument("--down-ms", type=float, default=200.0)
+    # 머클 트리 anti-entropy 주기(ms, 0이면 끔)와 트리 깊이(잎 2^depth 개)
+    py.add_argument("--ae-interval-ms", type=float, default=0.0)
+    py.add_argument("--merkle-depth", type=int, default=6)
+    py.add_argument("--vnodes", type=int, default=8)
+    py.add_argument("--clock", default="real", choices=["real", "virtual"])
+    py.add_argument("--seed", type=int, default=42)
+    # 총 연산 수/키/쓰기 비율
+    py.add_argument("--ops", type=int, default=5000)
+    py.add_argument("--keys", type=int, default=1000)
+    py.add_argument("--write-ratio", type=float, default=0.3)
+    add_load_args(py)
+    add_probe_args(py)
+
+    # ---------------- 다중 리더 + 충돌 해소 시뮬레이터(Docker 불필요) ----------------
+    pl = sub.add_parser("multileader")
+    # 리더 수와 충돌 해소 전략
+    pl.add_argument("--leaders", type=int, default=2)
+    pl.add_argument("--resolver", default="lww", choices=["lww", "couch", "mv-register", "pn-counter"])
+    # 쓰기/읽기를 받을 리더(any 면 연산마다 무작위, 숫자면 그 리더)
+    pl.add_argument("--write-to", default="any")
+    pl.add_argument("--read-from", default="0")
+    # change feed 를 내보내는 주기(ms)와 한 배치의 최대 변경 수
+    pl.add_argument("--feed-interval-ms", type=float, default=10.0)
+    pl.add_argument("--feed-batch", type=int, default=100)
+    # 리더 사이 배치 전달 지연 분포와 평균(ms)
+    pl.add_argument("--link-lag-dist", default="exp", choices=["const", "uniform", "exp", "lognormal"])
+    pl.add_argument("--link-lag-ms", type=float, default=5.0)
+    # 리더별 시계 오차 범위(±ms, lww 타임스탬프에만 영향)
+    pl.add_argument("--clock-skew-ms", type=float, default=0.0)
+    pl.add_argument("--rtt-ms", type=float, default=0.5)
+    pl.add_argument("--clock", default="real", choices=["real", "virtual"])
+    pl.add_argument("--seed", type=int, default=42)
+    # 총 연산 수/키/쓰기 비율
+    pl.add_argument("--ops", type=int, default=5000)
+    pl.add_argument("--keys", type=int, default=1000)
+    pl.add_argument("--write-ratio", type=float, default=0.3)
+    add_load_args(pl)
+    add_probe_args(pl)
+    return p
+
+
+def check_leader_spec(args, p):
+    """multileader 의 --write-to/--read-from 은 any 또는 0..leaders-1"""
+    valid = {"any"} | {str(i) for i in range(args.leaders)}
+    for flag, value in (("--write-to", args.write_to), ("--read-from", args.read_from)):
+        if value not in valid:
+            p.error(f"multileader: {flag} must be 'any' or 0..{args.leaders - 1} (got {value!r})")
+
+
+def run_probe(args, p):
+    """--lag-probe: 모드별 백엔드를 만들어 복제본별 time-to-visibility 를 잰다(복제본마다 한 행)"""
+    from lagprobe import run_probe as probe
+    if args.mode == "mongo":
+        from pymongo.errors import PyMongoError
+        from run_mongo import MongoBackend
+        return probe(MongoBackend(args), args, skip_errors=(PyMongoError,))
+    if args.mode == "cassandra":
+        if args.stub or not args.hosts:
+            p.error("cassandra: --lag-probe needs a live cluster (--hosts)")
+        from run_cassandra import CassandraBackend
+        return probe(CassandraBackend(args), args)
+    if args.mode == "couch":
+        import requests
+        from run_couch import CouchBackend
+        return probe(CouchBackend(args), args, skip_errors=(requests.RequestException,))
+    if args.mode == "dynamo":
+        from run_dynamo import Unavailable, make_dynamo
+        return probe(make_dynamo(args), args, skip_errors=(Unavailable,))
+    if args.mode == "multileader":
+        check_leader_spec(args, p)
+        from run_multileader import make_multileader
+        return probe(make_multileader(args), args)
+    # 폴링 스레드가 복제본마다 동시에 기다려야 하므로 시뮬레이터도 실제 시계로
+    from run_sim import make_sim
+    return probe(make_sim(args), args)
 
-    # 인자 파싱 실행
-    args = p.parse_args()
 
+def run(args, p):
+    """파싱된 인자로 해당 모드의 벤치를 한 번 실행하고 보고서 딕셔너리를 돌려준다"""
+    # 여러 프로세스로 나눠 돌리고 지표를 합침(자식은 processes=1 로 다시 이 함수를 부른다)
+    if args.processes > 1:
+        if args.mode == "cassandra" and not args.stub and not args.hosts:
+            p.error("cassandra: --hosts is required (or use --stub)")
+        from multiproc import run_processes
+        return run_processes(args)
     # 서브커맨드에 따라 해당 벤치마크 함수 호출
+    # (드라이버 패키지는 필요한 것만 임포트 → sim 은 pymongo/cassandra/requests 없이도 실행)
     if args.mode == "mongo":
+        from run_mongo import run_mongo
         res = run_mongo(args)
+    elif args.mode == "cassandra" and args.stub:
+        from cassandra_async import run_cassandra_stub
+        args.async_window = args.async_window or 64
+        res = run_cassandra_stub(args)
     elif args.mode == "cassandra":
+        if not args.hosts:
+            p.error("cassandra: --hosts is required (or use --stub)")
+        from run_cassandra import run_cassandra
         res = run_cassandra(args)
-    else:
+    elif args.mode == "couch":
+        from run_couch import run_couch
         res = run_couch(args)
+    elif args.mode == "dynamo":
+        from run_dynamo import run_dynamo
+        res = run_dynamo(args)
+    elif args.mode == "multileader":
+        check_leader_spec(args, p)
+        from run_multileader import run_multileader
+        res = run_multileader(args)
+    else:
+        from run_sim import run_sim
+        res = run_sim(args)
+    return res
 
-    # 결과를 CSV 한 줄로 표준출력(스크립트/CI에서 파싱하기 쉽게)
-    headers = [
-        "model",
-        "reads",
-        "writes",
-        "avg_read_ms",
-        "p95_read_ms",
-        "avg_write_ms",
-        "p95_write_ms",
-        "stale_read_rate",
-        "ryw_violation_rate",
-        "conflicts",
-    ]
-    # 헤더 출력
-    print(",".join(headers))
+
+def main():
+    """명령행 인자를 파싱하고 각 모드별 벤치마크 함수를 호출"""
+    p = build_parser()
+    # 인자 파싱 실행
+    args = p.parse_args()
+    if args.lag_probe:
+        if args.processes > 1:
+            p.error("--lag-probe runs in a single process (drop --processes)")
+        rows = run_probe(args, p)
+        print(",".join(PROBE_HEADERS))
+        for row in rows:
+            print(",".join(str(row.get(h, "")) for h in PROBE_HEADERS))
+        return
+    res = run(args, p)
+    # 결과를 CSV 한 줄로 표준출력(스크립트/CI에서 파싱하기 쉽게), 헤더 먼저
+    print(",".join(HEADERS))
     # 값 출력(키가 없으면 빈 문자열)
-    print(",".join(str(res.get(h, "")) for h in headers))
+    print(",".join(str(res.get(h, "")) for h in HEADERS))
+    # 백엔드 내부 지표(시뮬레이터의 힌트/리페어 수 등)는 표준에러에 한 줄로
+    if res.get("backend_stats"):
+        print("# " + " ".join(f"{k}={v}" for k, v in res["backend_stats"].items()), file=sys.stderr)
 
 # 스크립트가 직접 실행될 때만 main() 호출(모듈 임포트 시엔 실행 안 함)
 if __name__ == "__main__":
@@ -0,0 +1,302 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from driver import SharedVersions, attach_meter, make_ops, owned_keys, wait_start
+from meter import Meter, Session
+from run_sim import SimReplicaSet
+
+
+class AsyncCassandraRunner:
+    """
+    execute_async 로 요청을 파이프라이닝하는 Cassandra 실행기.
+    - 동시에 날아가 있는 요청(in-flight)을 window 개로 제한(세마포어)
+    - 지연은 응답 콜백에서 기록 → 요청을 보내는 루프는 응답을 기다리지 않는다
+    - stale 판정은 '요청을 보낸 시점에 ack 된 버전'과 비교(키별로 정확), 세션 보장은 클라이언트 세션별로
+    - batch_size > 1 이면 쓰기를 파티션(담당 복제본)별로 모아 UNLOGGED BATCH 로 보낸다
+      (배치 안 쓰기들의 지연은 각자 버퍼에 들어간 시각부터 배치 응답까지)
+    - persistent 면(실제 클러스터) 먼저 키마다 남은 버전을 읽어 버전을 그 다음부터 발급하고,
+    - --preload on 이면 측정 전에 키 전체를 in-flight 창만큼 파이프라이닝해 채우고,
+      --warmup-ops/--warmup-s 만큼 같은 부하를 돌린 뒤 Meter 와 세션을 새로 시작한다
+    """
+    def __init__(self, session, write_stmt, read_stmt, args, make_batch=None, partition_of=None, write_params=None,
+                 persistent=False):
+        self.session = session
+        self.write_stmt = write_stmt
+        self.read_stmt = read_stmt
+        self.args = args
+        self.window = max(1, args.async_window)
+        self.batch_size = max(1, getattr(args, "batch_size", 1) or 1)
+        self.make_batch = make_batch
+        self.partition_of = partition_of or (lambda k: k)
+        # (k, v) → 쓰기 문 바인딩 값(실제 클러스터는 USING TIMESTAMP 까지 넣어 준다)
+        self.write_params = write_params or (lambda k, v: (k, v, int(time.time() * 1000)))
+        self.persistent = persistent
+        self.meter = Meter()
+        self.versions = SharedVersions()
+        # 클라이언트 세션(연산 i 는 i % S 번 세션, 기본 S = in-flight 창 크기)
+        # 같은 세션의 요청이 동시에 날아가 있을 수 있어, 읽기의 세션 보장 판정은 보낸 시점의 세션 상태(snapshot) 기준
+        self.client_sessions = self._new_sessions()
+        # 적재/예열 구간의 소요 시간과 처리량(보고서에 덧붙임)
+        self.phases = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(self.window)
+        # 측정 시작 시각(초 단위 구간 계산 기준)
+        self._t_start = time.perf_counter()
+
+    def _new_sessions(self):
+        return [Session() for _ in range(max(1, getattr(self.args, "sessions", 0) or self.window))]
+
+    # ---------- 콜백(드라이버 이벤트 루프 스레드에서 호출) ----------
+    def _on_write(self, rows, writes):
+        now = time.perf_counter()
+        with self._lock:
+            for k, v, t0, sess in writes:
+                self.meter.write_lat.record((now - t0) * 1000)
+                self.meter.mark(now - self._t_start, (now - t0) * 1000)
+                self.meter.writes += 1
+                self.versions.ack(k, v, dep=sess.last_read)
+                sess.wrote(k, v)
+        self._slots.release()
+
+    def _on_read(self, rows, k, latest_known, t0, sess, snap):
+        now = time.perf_counter()
+        row = rows[0] if rows else None
+        # 결과가 없거나 v가 None이면 0으로 해석
+        seen_v = row.v if row is not None and getattr(row, "v", None) is not None else 0
+        with self._lock:
+            self.meter.read_lat.record((now - t0) * 1000)
+            self.meter.mark(now - self._t_start, (now - t0) * 1000)
+            self.meter.reads += 1
+            # 보낸 시점의 상태와 비교하고, 새로 본 것만 세션에 합친다
+            self.meter.observe_read(k, seen_v, latest_known, snap, self.versions)
+            sess.absorb(snap)
+        self._slots.release()
+
+    def _on_error(self, exc, writes=None):
+        # 배치 하나가 실패하면 그 안의 쓰기 전부가 실패(다른 실행기처럼 연산 단위로 셈)
+        with self._lock:
+            self.meter.errors += len(writes) if writes else 1
+        self._slots.release()
+
+    # ---------- 송신 ----------
+    def _send_writes(self, writes):
+        self._slots.acquire()
+        if len(writes) == 1:
+            k, v, _, _ = writes[0]
+            fut = self.session.execute_async(self.write_stmt, self.write_params(k, v))
+        else:
+            batch = self.make_batch()
+            for k, v, _, _ in writes:
+                batch.add(self.write_stmt, self.write_params(k, v))
+            fut = self.session.execute_async(batch)
+        fut.add_callbacks(self._on_write, self._on_error, callback_args=(writes,), errback_args=(writes,))
+
+    def _drain(self):
+        """날아가 있는 요청이 모두 돌아올 때까지 기다린다(창은 다시 비워 둠)"""
+        for _ in range(self.window):
+            self._slots.acquire()
+        for _ in range(self.window):
+            self._slots.release()
+
+    def _seed(self):
+        """맡은 키들의 남은 버전을 in-flight 창만큼 파이프라이닝해 읽고 버전의 출발점으로(driver.seed_versions 와 같음)"""
+        current = {}
+
+        def ok(rows, k):
+            row = rows[0] if rows else None
+            with self._lock:
+                current[k] = row.v if row is not None and getattr(row, "v", None) is not None else 0
+            self._slots.release()
+
+        def err(exc, k):
+            self._slots.release()
+
+        for k in owned_keys(self.args):
+            self._slots.acquire()
+            fut = self.session.execute_async(self.read_stmt, (k,))
+            fut.add_callbacks(ok, err, callback_args=(k,), errback_args=(k,))
+        self._drain()
+        self.versions.seed(current)
+
+    def _preload(self) -> dict:
+        """키 0..keys-1 을 다음 버전(빈 저장소면 1)으로 채운다(in-flight 창만큼 파이프라이닝, Meter 에는 안 들어감)"""
+        items = [(k, self.versions.next_version(k)) for k in owned_keys(self.args)]
+        failed = []
+
+        def ok(rows, k, v):
+            self.versions.ack(k, v)
+            self._slots.release()
+
+        def err(exc, k, v):
+            with self._lock:
+                failed.append(k)
+            self._slots.release()
+
+        t0 = time.perf_counter()
+        for k, v in items:
+            self._slots.acquire()
+            fut = self.session.execute_async(self.write_stmt, self.write_params(k, v))
+            fut.add_callbacks(ok, err, callback_args=(k, v), errback_args=(k, v))
+        self._drain()
+        elapsed = time.perf_counter() - t0
+        loaded = len(items) - len(failed)
+        return {
+            "preload_keys": loaded,
+            "preload_errors": len(failed),
+            "preload_s": round(elapsed, 3),
+            "preload_keys_per_s": round(loaded / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _pump(self, ops, max_ops=None, duration_s=None):
+        """
+        연산 목록을 보낸다. max_ops/duration_s 가 있으면 목록을 반복하며 그만큼만(예열 구간).
+        남은 배치까지 보내고, 응답이 모두 돌아오면 끝난다
+        """
+        rate = getattr(self.args, "rate", None)
+        cycling = max_ops is not None or duration_s is not None
+        pending = {}  # 파티션 → 아직 안 보낸 쓰기 [(k, v, t0, 클라이언트 세션)]
+        t_start = self._t_start = time.perf_counter()
+        for i in (itertools.count() if cycling else range(len(ops))):
+            if cycling and ((max_ops is not None and i >= max_ops)
+                            or (duration_s is not None and time.perf_counter() - t_start >= duration_s)):
+                break
+            is_write, k = ops[i % len(ops)]
+            if rate:
+                t0 = t_start + i / rate
+                delay = t0 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                t0 = time.perf_counter()
+
+            sess = self.client_sessions[i % len(self.client_sessions)]
+            if is_write:
+                v = self.versions.next_version(k)
+                if self.batch_size == 1:
+                    self._send_writes([(k, v, t0, sess)])
+                    continue
+                group = pending.setdefault(self.partition_of(k), [])
+                group.append((k, v, t0, sess))
+                if len(group) >= self.batch_size:
+                    self._send_writes(pending.pop(self.partition_of(k)))
+            else:
+                # 요청 시점에 확인된 최신 버전(아직 버퍼/전송 중인 쓰기는 제외)
+                latest_known = self.versions.last_written.get(k, 0)
+                with self._lock:
+                    snap = sess.snapshot(k)
+                self._slots.acquire()
+                fut = self.session.execute_async(self.read_stmt, (k,))
+                fut.add_callbacks(self._on_read, self._on_error, callback_args=(k, latest_known, t0, sess, snap))
+
+        # 남은 배치를 보내고, 날아가 있는 요청이 모두 돌아올 때까지 대기
+        for group in pending.values():
+            self._send_writes(group)
+        self._drain()
+
+    def run(self) -> Meter:
+        ops = make_ops(self.args)
+        if self.persistent:
+            self._seed()
+        if getattr(self.args, "preload", "off") == "on":
+            self.phases.update(self._preload())
+        warmup_ops = getattr(self.args, "warmup_ops", 0) or None
+        warmup_s = getattr(self.args, "warmup_s", 0) or None
+        if warmup_ops is not None or warmup_s is not None:
+            t0 = time.perf_counter()
+            self._pump(ops, max_ops=warmup_ops, duration_s=warmup_s)
+            self.phases.update({"warmup_ops": self.meter.reads + self.meter.writes,
+                                "warmup_s": round(time.perf_counter() - t0, 3)})
+            # 예열 지표는 버리고 세션도 새로(버전은 이어서 씀)
+            self.meter = Meter()
+            self.client_sessions = self._new_sessions()
+        wait_start(self.args)
+        self._pump(ops)
+        self.meter.last_written = self.versions.last_written
+        self.meter.elapsed_s = time.perf_counter() - self._t_start
+        return self.meter
+
+
+# ---------------- 클러스터 없이 돌려 보기 위한 스텁 ----------------
+
+class StubFuture:
+    """cassandra ResponseFuture 의 add_callbacks 만 흉내"""
+    def __init__(self, cf):
+        self._cf = cf
+
+    def add_callbacks(self, callback, errback, callback_args=(), errback_args=()):
+        def done(cf):
+            exc = cf.exception()
+            if exc is not None:
+                errback(exc, *errback_args)
+            else:
+                callback(cf.result(), *callback_args)
+        self._cf.add_done_callback(done)
+
+
+class StubBatch:
+    """BatchStatement.add(statement, parameters) 만 흉내"""
+    def __init__(self):
+        self.entries = []
+
+    def add(self, statement, parameters):
+        self.entries.append((statement, parameters))
+
+
+class StubSession:
+    """
+    cassandra Session 의 prepare/execute_async 를 흉내 내는 스텁.
+    - 실제 저장은 SimReplicaSet(리더/팔로워 지연 모델)에 맡기고, 요청은 스레드 풀에서 비동기로 실행
+    - CL 은 근사치로 매핑: 쓰기 ONE→리더만 / QUORUM→과반 / ALL→전부,
+      읽기 ONE→임의 노드 / QUORUM·ALL→리더(겹치는 쿼럼이 최신을 본다고 가정)
+    """
+    def __init__(self, rf: int, write_cl: str, read_cl: str, lag_ms: float, rtt_ms: float, max_workers: int):
+        wc = {"ONE": "1", "QUORUM": "majority", "LOCAL_QUORUM": "majority", "ALL": "all"}[write_cl]
+        rf_read = "nearest" if read_cl == "ONE" else "primary"
+        self.sim = SimReplicaSet(followers=rf - 1, lag_ms=lag_ms, rtt_ms=rtt_ms, write_concern=wc, read_from=rf_read)
+        self.n_nodes = rf
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def prepare(self, cql: str):
+        return SimpleNamespace(kind="write" if cql.lstrip().upper().startswith("INSERT") else "read",
+                               consistency_level=None)
+
+    def new_batch(self):
+        return StubBatch()
+
+    def _run(self, stmt, params):
+        if isinstance(stmt, StubBatch):
+            # 배치는 한 번의 왕복으로 처리(각 행의 복제는 따로)
+            self.sim.write_batch([(k, v) for _, (k, v, _) in stmt.entries])
+            return []
+        if stmt.kind == "write":
+            k, v, _ = params
+            self.sim.write(k, v)
+            return []
+        return [SimpleNamespace(v=self.sim.read(params[0]) or None)]
+
+    def execute_async(self, stmt, params=None):
+        return StubFuture(self._pool.submit(self._run, stmt, params))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+
+def run_cassandra_stub(args):
+    """클러스터 없이 StubSession 으로 비동기 실행 경로를 돌려 본다"""
+    session = StubSession(args.rf, args.write_cl, args.read_cl, args.stub_lag_ms, args.stub_rtt_ms,
+                          max_workers=max(1, args.async_window))
+    write_stmt = session.prepare("INSERT INTO kv (k, v, ts) VALUES (?, ?, ?)")
+    read_stmt = session.prepare("SELECT v, ts FROM kv WHERE k=?")
+    runner = AsyncCassandraRunner(session, write_stmt, read_stmt, args,
+                                  make_batch=session.new_batch,
+                                  partition_of=lambda k: k % session.n_nodes)
+    try:
+        meter = runner.run()
+    finally:
+        session.shutdown()
+    res = meter.report(model=f"cassandra-stub_W{args.write_cl}_R{args.read_cl}_RF{args.rf}")
+    res.update(runner.phases)
+    return attach_meter(res, meter, args)
@@ -0,0 +1,465 @@
+import itertools
+import threading
+import time
+from typing import Dict, Iterator, List, Protocol
+
+import opstream
+from meter import Meter, Session
+
+
+class Backend(Protocol):
+    """
+    벤치 대상 저장소가 구현할 최소 인터페이스. 드라이버는 이것만 보고 연산을 보낸다.
+    - model: 보고서에 찍힐 모델 이름(예: mongo_secondary_w1)
+    - setup(): DB/테이블 생성, 복제 설정 등 측정 전 준비
+    - write(k, v): 키 k 에 버전 v 쓰기(실패하면 예외)
+    - read(k): 키 k 에서 본 버전(없으면 0)
+    - close(): 연결 정리
+    - conflicts: (선택) 측정 중 관측한 충돌 수
+    - stats: (선택) 보고서의 backend_stats 로 덧붙일 내부 지표 딕셔너리
+    - write_many(items) / read_many(keys): (선택) --batch-size 모드용 bulk 연산.
+      write_many 는 실패한 항목의 인덱스들을, read_many 는 {k: 본 버전} 을 돌려준다
+    - replicas() / read_at(replica, k) / write_marker(k, v): (선택) 지연 프로브(lagprobe.py)용.
+      복제본 이름 목록, 특정 복제본에서 직접 읽기, 리더(또는 기준 노드)에 쓰기
+    - preload(items): (선택) --preload 용 대량 적재. write_many 와 같은 약속(실패 인덱스를 돌려줌).
+      없으면 write_many, 그것도 없으면 write 를 키마다 부른다
+    - persistent: (선택) True 면 저장소가 실행 사이에 데이터를 유지한다(도커 클러스터 등).
+      측정 전에 키마다 남아 있는 버전을 읽어 버전 카운터를 그 위에서 시작(seed_versions)
+    """
+    model: str
+
+    def setup(self) -> None: ...
+
+    def write(self, k: int, v: int) -> None: ...
+
+    def read(self, k: int) -> int: ...
+
+    def close(self) -> None: ...
+
+
+class RealClock:
+    """실제 시간(perf_counter)과 실제 sleep"""
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    가상 시간: sleep() 은 기다리지 않고 시계만 앞으로 민다.
+    - 시뮬레이터의 복제 지연/왕복 시간이 실제 대기 없이 흘러가므로 수천 가지 설정을 몇 초 안에 돌릴 수 있다
+    - 시계가 하나라 워커가 여럿이면 각자의 sleep 이 차례로 더해진다(동시성 1에서 쓰는 것이 자연스러움)
+    """
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._now += seconds
+
+    def advance_to(self, t: float):
+        with self._lock:
+            if t > self._now:
+                self._now = t
+
+
+REAL_CLOCK = RealClock()
+
+
+class SharedVersions:
+    """
+    여러 워커가 함께 쓰는 키별 버전 카운터.
+    - next_version(): 쓰기마다 키별로 단조 증가하는 새 버전을 발급
+    - ack(): 쓰기가 성공하면 '확인된 최신 버전'(last_written)을 올리고,
+      그 쓰기의 전역 ack 순번과 의존(쓴 세션이 직전에 본 (키, 버전))을 남김 → meta() 로 조회
+    - 읽기의 stale 판정은 '읽기 시작 전에 ack 된 버전'과 비교한다(동시에 진행 중인 쓰기는 제외)
+    - seed(): 저장소에 이전 실행이 남긴 버전을 출발점으로 삼는다(새 버전은 항상 그보다 큼)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next: Dict[int, int] = {}
+        self.last_written: Dict[int, int] = {}
+        # 키 → {버전: (ack 순번, 의존 (키, 버전) 또는 None)}
+        self._meta: Dict[int, Dict[int, tuple]] = {}
+        self._seq = 0
+
+    def next_version(self, k: int) -> int:
+        with self._lock:
+            v = self._next.get(k, 0) + 1
+            self._next[k] = v
+            return v
+
+    def seed(self, current: Dict[int, int]):
+        """{k: 저장소에 남아 있는 버전} 을 발급/확인된 최신 버전의 출발점으로(ack 순번/의존은 없음)"""
+        with self._lock:
+            for k, v in current.items():
+                if v > self._next.get(k, 0):
+                    self._next[k] = v
+                if v > self.last_written.get(k, 0):
+                    self.last_written[k] = v
+
+    def ack(self, k: int, v: int, dep=None):
+        with self._lock:
+            if v > self.last_written.get(k, 0):
+                self.last_written[k] = v
+            self._seq += 1
+            self._meta.setdefault(k, {})[v] = (self._seq, dep)
+
+    def meta(self, k: int, v: int):
+        """키 k 버전 v 쓰기의 (ack 순번, 의존). 아직 ack 전이거나 없는 버전이면 None"""
+        return self._meta.get(k, {}).get(v)
+
+
+def worker_sessions(n_workers: int, args) -> List[Iterator[Session]]:
+    """
+    --sessions S 개의 클라이언트 세션을 워커에 나눠 준다(워커 w 는 w, w+C, w+2C ... 번 세션).
+    - 한 세션의 연산은 항상 같은 워커가 차례로 보내므로 세션 안에서는 요청이 겹치지 않는다
+    - 워커는 자기 세션들을 연산마다 번갈아 쓴다. S 가 워커 수보다 작으면 워커 수로 올림
+    """
+    n = max(n_workers, getattr(args, "sessions", 0) or 0)
+    sessions = [Session() for _ in range(n)]
+    return [itertools.cycle(sessions[w::n_workers]) for w in range(n_workers)]
+
+
+def owned_keys(args) -> range:
+    """
+    이 프로세스가 맡은 키들. --processes P 의 자식 i 는 k % P == i 인 키만(args.partition = (i, P)),
+    아니면 0..keys-1 전부. 키 하나의 연산이 한 프로세스에만 있으므로 키별 버전/stale 판정이 프로세스 안에서 정확
+    """
+    index, n = getattr(args, "partition", None) or (0, 1)
+    return range(index, args.keys, n)
+
+
+def make_ops(args):
+    """
+    측정 전에 (is_write, k) 연산 목록을 미리 만든다(opstream.from_args: 키 분포/저장/재생).
+    - 워커들은 이 목록을 앞에서부터 나눠 가져간다
+    - --processes 의 자식이면 부모가 만들어 나눠 준 자기 몫(args.ops_list)을 그대로 쓴다
+    """
+    ops = getattr(args, "ops_list", None)
+    if ops is not None:
+        return ops
+    return opstream.from_args(args)
+
+
+def wait_start(args):
+    """--processes 의 자식이면 모든 자식의 준비(적재/예열)가 끝날 때까지 기다렸다가 함께 측정을 시작"""
+    barrier = getattr(args, "start_barrier", None)
+    if barrier is not None:
+        barrier.wait()
+
+
+def attach_meter(res: dict, meter: Meter, args) -> dict:
+    """--processes 의 자식이면 부모가 합칠 수 있게 Meter 전체를 보고서에 싣는다"""
+    if getattr(args, "partition", None):
+        res["meter"] = meter.to_dict()
+    return res
+
+
+def _until(n_ops, stop, max_ops, duration_s, clock, t_start):
+    """
+    연산 번호 i 에서 멈출지 판정하는 함수.
+    - stop/max_ops/duration_s 가 모두 없으면 목록 끝에서 멈춤
+    - 하나라도 있으면 목록을 반복해서 돌고, stop 이 set 되거나 i 가 max_ops 에 닿거나 duration_s 초가 지나면 멈춤
+    """
+    if stop is None and max_ops is None and duration_s is None:
+        return lambda i: i >= n_ops
+
+    def done(i):
+        return ((stop is not None and stop.is_set())
+                or (max_ops is not None and i >= max_ops)
+                or (duration_s is not None and clock.now() - t_start >= duration_s))
+    return done
+
+
+def drive(write, read, args, skip_errors=(), clock=REAL_CLOCK, write_many=None, read_many=None, stop=None,
+          versions=None, max_ops=None, duration_s=None):
+    """
+    write(k, v) / read(k) → seen_v 두 함수로 연산 목록을 실행하고 합쳐진 Meter 를 돌려준다.
+
+    - closed loop(기본): 워커 args.concurrency 개가 각자 '응답을 받으면 다음 요청'
+    - open loop(--rate R): 연산 i 의 예정 송신 시각은 시작 + i/R 초.
+      지연은 실제 송신이 아니라 예정 송신 시각부터 잰다
+      → 서버가 밀려 요청이 늦게 나가도 그 대기 시간이 지연에 포함됨(coordinated omission 방지)
+    - skip_errors 에 해당하는 예외가 난 연산은 기록하지 않고 건너뜀
+    - clock: 시간 측정/대기에 쓸 시계(시뮬레이터는 VirtualClock 을 넘긴다)
+    - --batch-size B 이고 write_many/read_many 가 있으면 연산을 B개씩 묶어
+      쓰기는 write_many 한 번, 읽기는 read_many 한 번으로 보낸다.
+      연산별 지연은 '배치 시작(또는 예정 시각) → 자기 bulk 요청 응답', 배치 지연은 bulk 요청 한 번의 왕복
+    - stop(threading.Event)이 주어지면 목록을 다 써도 처음부터 다시 돌고, stop 이 set 되면 멈춘다
+      (지연 프로브의 배경 부하처럼 '다른 측정이 끝날 때까지' 부하를 유지할 때)
+    - max_ops / duration_s: 목록을 반복하며 연산 max_ops 개 또는 duration_s 초만 돌린다(예열 구간)
+    - versions: 예열/적재 구간과 이어지는 SharedVersions(없으면 새로 만듦)
+    """
+    ops = make_ops(args)
+    if versions is None:
+        versions = SharedVersions()
+    batch_size = max(1, getattr(args, "batch_size", 1) or 1)
+    if batch_size > 1 and write_many is not None and read_many is not None:
+        return _drive_batched(write_many, read_many, ops, args, batch_size, skip_errors, clock, stop,
+                              versions, max_ops, duration_s)
+    concurrency = max(1, getattr(args, "concurrency", 1) or 1)
+    rate = getattr(args, "rate", None)
+    meters = [Meter() for _ in range(concurrency)]
+    # itertools.count 의 next() 는 GIL 아래에서 원자적 → 워커끼리 연산 번호를 겹치지 않게 나눔
+    ticket = itertools.count()
+    t_start = clock.now()
+    done = _until(len(ops), stop, max_ops, duration_s, clock, t_start)
+
+    def worker(meter: Meter, sessions: Iterator[Session]):
+        while True:
+            i = next(ticket)
+            if done(i):
+                return
+            is_write, k = ops[i % len(ops)]
+            session = next(sessions)
+            if rate:
+                # 예정 시각까지 기다렸다가 보내고, 지연의 기준은 예정 시각
+                t0 = t_start + i / rate
+                delay = t0 - clock.now()
+                if delay > 0:
+                    clock.sleep(delay)
+            else:
+                t0 = clock.now()
+
+            if is_write:
+                v = versions.next_version(k)
+                try:
+                    write(k, v)
+                except skip_errors:
+                    meter.errors += 1
+                    continue
+                now = clock.now()
+                meter.write_lat.record((now - t0) * 1000)
+                meter.mark(now - t_start, (now - t0) * 1000)
+                meter.writes += 1
+                # 이 쓰기는 세션이 직전에 본 값에 의존(writes-follow-reads)
+                versions.ack(k, v, dep=session.last_read)
+                session.wrote(k, v)
+            else:
+                # 읽기 시작 전에 확인된 최신 버전
+                latest_known = versions.last_written.get(k, 0)
+                try:
+                    seen_v = read(k)
+                except skip_errors:
+                    meter.errors += 1
+                    continue
+                now = clock.now()
+                meter.read_lat.record((now - t0) * 1000)
+                meter.mark(now - t_start, (now - t0) * 1000)
+                meter.reads += 1
+                meter.observe_read(k, seen_v, latest_known, session, versions)
+
+    return _run_workers(worker, meters, versions, clock, t_start, args)
+
+
+def _run_workers(worker, meters, versions, clock, t_start, args):
+    """워커마다 스레드를 띄워 실행하고, 워커별 Meter 를 하나로 합쳐 돌려준다"""
+    sessions = worker_sessions(len(meters), args)
+    if len(meters) == 1:
+        worker(meters[0], sessions[0])
+    else:
+        threads = [threading.Thread(target=worker, args=(m, ss)) for m, ss in zip(meters, sessions)]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+    merged = Meter()
+    for m in meters:
+        merged.merge(m)
+    merged.last_written = versions.last_written
+    merged.elapsed_s = clock.now() - t_start
+    return merged
+
+
+def _drive_batched(write_many, read_many, ops, args, batch_size, skip_errors, clock, stop=None,
+                   versions=None, max_ops=None, duration_s=None):
+    """drive() 의 배치 버전: 워커가 연산 B개 단위로 가져가 bulk 요청 두 번(쓰기/읽기)으로 처리"""
+    concurrency = max(1, getattr(args, "concurrency", 1) or 1)
+    rate = getattr(args, "rate", None)
+    meters = [Meter() for _ in range(concurrency)]
+    ticket = itertools.count()
+    t_start = clock.now()
+    done = _until(len(ops), stop, max_ops, duration_s, clock, t_start)
+    cycling = stop is not None or max_ops is not None or duration_s is not None
+
+    def worker(meter: Meter, sessions: Iterator[Session]):
+        while True:
+            lo = next(ticket) * batch_size
+            if done(lo):
+                return
+            if cycling:
+                batch = [ops[(lo + j) % len(ops)] for j in range(batch_size)]
+            else:
+                batch = ops[lo:lo + batch_size]
+            if rate:
+                # 배치의 마지막 연산이 예정된 시각에 보낸다(앞쪽 연산은 그만큼 기다린 것으로 계산)
+                starts = [t_start + (lo + j) / rate for j in range(len(batch))]
+                delay = starts[-1] - clock.now()
+                if delay > 0:
+                    clock.sleep(delay)
+            else:
+                starts = [clock.now()] * len(batch)
+
+            # 배치 하나는 한 세션의 연산들
+            session = next(sessions)
+            writes = [(k, versions.next_version(k), t0) for (is_write, k), t0 in zip(batch, starts) if is_write]
+            reads = [(k, t0) for (is_write, k), t0 in zip(batch, starts) if not is_write]
+
+            if writes:
+                sent = clock.now()
+                try:
+                    failed = set(write_many([(k, v) for k, v, _ in writes]) or ())
+                except skip_errors:
+                    failed = set(range(len(writes)))
+                now = clock.now()
+                meter.write_batch_lat.record((now - sent) * 1000)
+                for j, (k, v, t0) in enumerate(writes):
+                    if j in failed:
+                        meter.errors += 1
+                        continue
+                    meter.write_lat.record((now - t0) * 1000)
+                    meter.mark(now - t_start, (now - t0) * 1000)
+                    meter.writes += 1
+                    versions.ack(k, v, dep=session.last_read)
+                    session.wrote(k, v)
+
+            if reads:
+                # 읽기 요청을 보내기 직전에 확인된 최신 버전(같은 배치의 쓰기는 포함)
+                latest = [versions.last_written.get(k, 0) for k, _ in reads]
+                sent = clock.now()
+                try:
+                    seen = read_many(list({k for k, _ in reads}))
+                except skip_errors:
+                    meter.errors += len(reads)
+                    continue
+                now = clock.now()
+                meter.read_batch_lat.record((now - sent) * 1000)
+                for (k, t0), latest_known in zip(reads, latest):
+                    meter.read_lat.record((now - t0) * 1000)
+                    meter.mark(now - t_start, (now - t0) * 1000)
+                    meter.reads += 1
+                    meter.observe_read(k, seen.get(k, 0), latest_known, session, versions)
+
+    return _run_workers(worker, meters, versions, clock, t_start, args)
+
+
+def seed_versions(backend: Backend, args, versions: SharedVersions, skip_errors=()):
+    """
+    실행 사이에 데이터가 남는 저장소(backend.persistent)에서, 맡은 키들의 현재 버전을 읽어 versions 의 출발점으로.
+    - 버전을 매번 1부터 발급하면 이전 실행(sweep 반복, 같은 도커 클러스터)이 남긴 더 큰 v 를 먼저 읽고
+      이번 실행의 작은 v 를 나중에 읽어 단조 읽기/RYW/WFR 위반으로 잘못 셈
+      (Mongo 의 $max 는 이번 실행의 쓰기를 아예 가리고, Couch/Cassandra 는 작은 v 로 덮어씀)
+    - read_many 가 있으면 --preload-batch 개씩, 없으면 키마다 read. 읽기에 실패한 키는 0부터
+    """
+    if not getattr(backend, "persistent", False):
+        return
+    keys = list(owned_keys(args))
+    batch = max(1, getattr(args, "preload_batch", 1000))
+    read_many = getattr(backend, "read_many", None)
+    current = {}
+    for lo in range(0, len(keys), batch):
+        chunk = keys[lo:lo + batch]
+        if read_many is not None:
+            try:
+                current.update(read_many(chunk))
+            except skip_errors:
+                pass
+            continue
+        for k in chunk:
+            try:
+                current[k] = backend.read(k)
+            except skip_errors:
+                pass
+    versions.seed(current)
+
+
+def preload(backend: Backend, args, versions: SharedVersions, skip_errors=(), clock=REAL_CLOCK) -> dict:
+    """
+    측정 전에 키 0..keys-1 전부를 다음 버전(빈 저장소면 1)으로 채운다(빈 키스페이스에서 seen_v=0 읽기가 섞이지 않게).
+    - --preload-batch 개씩 backend.preload → write_many → 키마다 write 순으로 있는 것을 쓴다
+    - 성공한 키만 versions 에 ack → 측정 구간의 stale 판정이 적재된 버전을 기준으로 한다
+    - 적재에 걸린 시간과 초당 키 수를 돌려준다(Meter 에는 들어가지 않음)
+    """
+    batch = max(1, getattr(args, "preload_batch", 1000))
+    bulk = getattr(backend, "preload", None) or getattr(backend, "write_many", None)
+    items = [(k, versions.next_version(k)) for k in owned_keys(args)]
+    failed = set()
+    t0 = clock.now()
+    for lo in range(0, len(items), batch):
+        chunk = items[lo:lo + batch]
+        if bulk is not None:
+            try:
+                failed.update(lo + i for i in bulk(chunk) or ())
+            except skip_errors:
+                failed.update(range(lo, lo + len(chunk)))
+            continue
+        for i, (k, v) in enumerate(chunk):
+            try:
+                backend.write(k, v)
+            except skip_errors:
+                failed.add(lo + i)
+    elapsed = clock.now() - t0
+    for i, (k, v) in enumerate(items):
+        if i not in failed:
+            versions.ack(k, v)
+    loaded = len(items) - len(failed)
+    return {
+        "preload_keys": loaded,
+        "preload_errors": len(failed),
+        "preload_s": round(elapsed, 3),
+        "preload_keys_per_s": round(loaded / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def warm_up(backend: Backend, args, versions: SharedVersions, skip_errors=(), clock=REAL_CLOCK) -> dict:
+    """
+    측정과 같은 부하를 --warmup-ops 개 또는 --warmup-s 초(둘 다면 먼저 닿는 쪽) 돌리고 Meter 는 버린다.
+    (커넥션 풀/캐시/JIT 를 데움. 버전은 versions 로 이어져 측정 구간의 판정이 어긋나지 않음)
+    """
+    n_ops = getattr(args, "warmup_ops", 0) or None
+    secs = getattr(args, "warmup_s", 0) or None
+    if n_ops is None and secs is None:
+        return {}
+    meter = drive(backend.write, backend.read, args, skip_errors=skip_errors, clock=clock,
+                  write_many=getattr(backend, "write_many", None),
+                  read_many=getattr(backend, "read_many", None),
+                  versions=versions, max_ops=n_ops, duration_s=secs)
+    return {"warmup_ops": meter.reads + meter.writes, "warmup_s": round(meter.elapsed_s, 3)}
+
+
+def run_backend(backend: Backend, args, skip_errors=(), clock=REAL_CLOCK):
+    """setup → (남은 버전 읽기 → 적재 → 예열) → drive → close 를 거쳐 백엔드 하나의 보고서를 만든다"""
+    backend.setup()
+    versions = SharedVersions()
+    phases = {}
+    try:
+        seed_versions(backend, args, versions, skip_errors)
+        if getattr(args, "preload", "off") == "on":
+            phases.update(preload(backend, args, versions, skip_errors, clock))
+        phases.update(warm_up(backend, args, versions, skip_errors, clock))
+        wait_start(args)
+        meter = drive(backend.write, backend.read, args, skip_errors=skip_errors, clock=clock,
+                      write_many=getattr(backend, "write_many", None),
+                      read_many=getattr(backend, "read_many", None),
+                      versions=versions)
+    finally:
+        backend.close()
+    meter.conflicts += getattr(backend, "conflicts", 0)
+    res = meter.report(model=backend.model)
+    # 적재/예열 구간의 소요 시간과 처리량(측정 지표에는 포함되지 않음)
+    res.update(phases)
+    attach_meter(res, meter, args)
+    # 백엔드가 내부 지표를 모아 두었으면 함께(예: 시뮬레이터의 힌트/리페어 수)
+    if getattr(backend, "stats", None):
+        res["backend_stats"] = dict(backend.stats)
+    return res
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from driver import REAL_CLOCK, drive
+from meter import LatencyHistogram
+
+
+class LagProbe:
+    """
+    복제 지연(time-to-visibility) 프로브.
+    - 배경 부하와 겹치지 않는 마커 키에 버전 v 를 리더(CouchDB 는 A 노드)에 쓰고,
+      복제본마다 스레드 하나가 그 복제본에서 직접 읽으며 v 이상이 보일 때까지 poll_ms 간격으로 폴링
+    - 지연 = 마커 쓰기를 보낸 시각 → 그 복제본에서 처음 v 가 보인 읽기의 응답 시각
+      (폴링 간격 + 읽기 왕복만큼 크게 잡힐 수 있음 → poll_ms 는 기대 지연보다 충분히 작게)
+    - timeout_ms 안에 안 보이면 그 복제본의 timeouts 로 셈
+    """
+    def __init__(self, backend, marker_key: int, poll_ms: float = 1.0, timeout_ms: float = 10_000.0,
+                 skip_errors=(), clock=REAL_CLOCK):
+        self.backend = backend
+        self.marker_key = marker_key
+        self.poll = poll_ms / 1000.0
+        self.timeout = timeout_ms / 1000.0
+        self.skip_errors = skip_errors
+        self.clock = clock
+        self.replicas = backend.replicas()
+        self.lag = {r: LatencyHistogram() for r in self.replicas}
+        self.timeouts = {r: 0 for r in self.replicas}
+        self._write_marker = getattr(backend, "write_marker", backend.write)
+        self._pool = ThreadPoolExecutor(max_workers=len(self.replicas))
+
+    def _wait_visible(self, replica, v: int, t0: float):
+        """replica 에서 마커 버전 v 이상이 보일 때까지 폴링. 보인 시각까지의 지연(ms) 또는 None"""
+        deadline = t0 + self.timeout
+        while True:
+            try:
+                seen = self.backend.read_at(replica, self.marker_key)
+            except self.skip_errors:
+                seen = 0
+            now = self.clock.now()
+            if seen >= v:
+                return (now - t0) * 1000
+            if now >= deadline:
+                return None
+            self.clock.sleep(self.poll)
+
+    def probe(self, v: int):
+        """마커 한 번 쓰고 모든 복제본을 동시에 기다린다"""
+        t0 = self.clock.now()
+        self._write_marker(self.marker_key, v)
+        futs = {r: self._pool.submit(self._wait_visible, r, v, t0) for r in self.replicas}
+        for r, fut in futs.items():
+            lag_ms = fut.result()
+            if lag_ms is None:
+                self.timeouts[r] += 1
+            else:
+                self.lag[r].record(lag_ms)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def report(self, model: str, probes: int) -> list:
+        rows = []
+        for r in self.replicas:
+            h = self.lag[r]
+            rows.append({
+                "model": model,
+                "replica": r,
+                "probes": probes,
+                "visible": h.count,
+                "timeouts": self.timeouts[r],
+                "avg_lag_ms": round(h.mean(), 3),
+                "p50_lag_ms": round(h.percentile(50), 3),
+                "p90_lag_ms": round(h.percentile(90), 3),
+                "p99_lag_ms": round(h.percentile(99), 3),
+                "max_lag_ms": round(h.max, 3),
+            })
+        return rows
+
+
+def run_probe(backend, args, skip_errors=(), clock=REAL_CLOCK):
+    """
+    setup → (배경 부하 시작) → 마커 --lag-probe 번 → 배경 부하 정지 → close.
+    - 배경 부하는 평소 벤치와 같은 인자(--concurrency/--rate/--key-dist ...)로 키 0..keys-1 에 걸리고,
+      프로브가 끝날 때까지 연산 목록을 반복한다(--bg off 면 부하 없이 측정)
+    - 마커 키는 keys(배경 부하 키 범위 밖)
+    """
+    backend.setup()
+    stop = threading.Event()
+    bg_result = {}
+    bg = None
+    probe = None
+    try:
+        if getattr(args, "bg", "on") == "on":
+            def background():
+                bg_result["meter"] = drive(backend.write, backend.read, args, skip_errors=skip_errors,
+                                           clock=clock, stop=stop)
+            bg = threading.Thread(target=background, daemon=True)
+            bg.start()
+        probe = LagProbe(backend, marker_key=args.keys, poll_ms=args.probe_poll_ms,
+                         timeout_ms=args.probe_timeout_ms, skip_errors=skip_errors, clock=clock)
+        for v in range(1, args.lag_probe + 1):
+            probe.probe(v)
+            clock.sleep(args.probe_interval_ms / 1000.0)
+    finally:
+        stop.set()
+        if bg is not None:
+            bg.join()
+        if probe is not None:
+            probe.close()
+        backend.close()
+
+    rows = probe.report(backend.model, args.lag_probe)
+    # 배경 부하가 실제로 얼마나 걸렸는지 함께 기록
+    meter = bg_result.get("meter")
+    bg_ops_per_s = round((meter.reads + meter.writes) / meter.elapsed_s, 1) if meter and meter.elapsed_s else 0.0
+    for row in rows:
+        row["bg_ops_per_s"] = bg_ops_per_s
+    return rows
@@ -1,11 +1,112 @@
+import math
 from typing import Dict
 
 
+class LatencyHistogram:
+    """
+    고정 메모리 로그 버킷 지연 히스토그램(HDR 히스토그램과 같은 발상).
+    - [lowest_ms, highest_ms] 구간을 비율 (1 + 2*precision) 간격의 버킷으로 나눈다
+      → 어떤 값이든 상대 오차 precision 이내로 기록되고, 버킷 수는 샘플 수와 무관하게 고정
+    - 평균/최소/최대는 버킷과 별도로 정확히 유지
+    - 같은 설정의 히스토그램끼리 merge() 가능(워커별 집계 후 합치기), to_dict()/from_dict() 로 직렬화
+    """
+    def __init__(self, lowest_ms: float = 0.001, highest_ms: float = 3_600_000.0, precision: float = 0.01):
+        self.lowest_ms = lowest_ms
+        self.highest_ms = highest_ms
+        self.precision = precision
+        # 버킷 i 는 [lowest * base^i, lowest * base^(i+1)) 구간
+        self._log_base = math.log1p(2 * precision)
+        self.counts = [0] * (int(math.log(highest_ms / lowest_ms) / self._log_base) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _index(self, v: float) -> int:
+        if v <= self.lowest_ms:
+            return 0
+        return min(int(math.log(v / self.lowest_ms) / self._log_base), len(self.counts) - 1)
+
+    def record(self, v: float, n: int = 1):
+        """지연 v(ms)를 n번 기록 — O(1)"""
+        self.counts[self._index(v)] += n
+        self.count += n
+        self.total += v * n
+        if v < self.min:
+            self.min = v
+        if v > self.max:
+            self.max = v
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, p: float) -> float:
+        """p-퍼센타일(0~100). 해당 버킷의 기하 중앙값을 돌려준다(최소/최대로 잘라냄)"""
+        if not self.count:
+            return 0.0
+        if p >= 100:
+            return self.max
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                v = self.lowest_ms * math.exp(self._log_base * (i + 0.5))
+                return min(max(v, self.min), self.max)
+        return self.max
+
+    def _check_compatible(self, other: "LatencyHistogram"):
+        if (self.lowest_ms, self.highest_ms, self.precision) != (other.lowest_ms, other.highest_ms, other.precision):
+            raise ValueError("cannot merge histograms with different bucket settings")
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """other 의 샘플을 이 히스토그램에 더한다(버킷 설정이 같아야 함)"""
+        self._check_compatible(other)
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def to_dict(self) -> dict:
+        """JSON 으로 보낼 수 있는 형태(0이 아닌 버킷만 [인덱스, 개수]로)"""
+        return {
+            "lowest_ms": self.lowest_ms,
+            "highest_ms": self.highest_ms,
+            "precision": self.precision,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+            "buckets": [[i, c] for i, c in enumerate(self.counts) if c],
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "LatencyHistogram":
+        h = cls(d["lowest_ms"], d["highest_ms"], d["precision"])
+        for i, c in d["buckets"]:
+            h.counts[i] = c
+        h.count = d["count"]
+        h.total = d["total"]
+        h.min = d["min"] if d["min"] is not None else math.inf
+        h.max = d["max"]
+        return h
+
+
 def pct(xs, p):
-    """리스트 xs의 p-퍼센타일 값을 계산하는 간단한 함수"""
+    """리스트(또는 LatencyHistogram) xs의 p-퍼센타일 값을 계산하는 간단한 함수"""
     # xs가 비어 있으면 0.0 반환
     if not xs:
         return 0.0
+    # 히스토그램이면 정렬 없이 버킷을 훑어 계산
+    if isinstance(xs, LatencyHistogram):
+        return xs.percentile(p)
     # 정렬된 복사본 준비(퍼센타일 계산은 정렬 기반)
     xs = sorted(xs)
     # p 위치(0~len-1 사이 실수 인덱스)를 선형 보간 방식으로 계산
@@ -17,42 +118,226 @@ def pct(xs, p):
     # 실수 인덱스라면 f와 c 사이를 선형 보간
     return xs[f] * (c - k) + xs[c] * (k - f)
 
+class Session:
+    """
+    클라이언트 세션 하나의 관측 상태(세션 보장 위반 판정용). 모든 갱신/판정이 딕셔너리 조회 몇 번 → 연산당 O(1)
+    - own: 이 세션이 쓰고 ack 받은 키별 최신 버전(RYW 기준)
+    - seen: 이 세션이 키별로 지금까지 본 최대 버전(단조 읽기 기준)
+    - required: 이 세션이 본 쓰기들이 의존하는 (키, 버전) → 이후 그 키는 그 버전 이상이어야 함(writes-follow-reads)
+    - max_seq: 이 세션이 본 쓰기들 중 가장 늦게 ack 된 것의 전역 순번(consistent prefix 기준)
+    - last_read: 마지막으로 본 (키, 버전) → 이 세션의 다음 쓰기가 여기에 의존한다고 기록
+    """
+    __slots__ = ("own", "seen", "required", "max_seq", "last_read")
+
+    def __init__(self):
+        self.own: Dict[int, int] = {}
+        self.seen: Dict[int, int] = {}
+        self.required: Dict[int, int] = {}
+        self.max_seq = 0
+        self.last_read = None
+
+    def wrote(self, k: int, v: int):
+        if v > self.own.get(k, 0):
+            self.own[k] = v
+
+    def snapshot(self, k: int) -> "Session":
+        """
+        요청을 보낸 시점의 키 k 기준 상태. 같은 세션의 요청이 여럿 날아가 있으면(비동기 실행기)
+        응답 순서가 아니라 보낸 시점에 세션이 알던 것과 비교해야 늦게 도착한 이전 읽기를 위반으로 세지 않는다
+        """
+        s = Session()
+        for name in ("own", "seen", "required"):
+            v = getattr(self, name).get(k)
+            if v:
+                getattr(s, name)[k] = v
+        s.max_seq = self.max_seq
+        return s
+
+    def absorb(self, snap: "Session"):
+        """snapshot 위에서 판정하며 새로 알게 된 것(본 버전/의존/ack 순번/마지막 읽기)을 이 세션에 합친다"""
+        for name in ("seen", "required"):
+            mine = getattr(self, name)
+            for k, v in getattr(snap, name).items():
+                if v > mine.get(k, 0):
+                    mine[k] = v
+        if snap.max_seq > self.max_seq:
+            self.max_seq = snap.max_seq
+        if snap.last_read is not None:
+            self.last_read = snap.last_read
+
+
 class Meter:
     """벤치마크 동안 지연/일관성 관련 지표를 수집하는 간단한 집계기"""
     def __init__(self):
-        # 읽기 지연(ms) 기록 리스트
-        self.read_lat = []
-        # 쓰기 지연(ms) 기록 리스트
-        self.write_lat = []
+        # 읽기 지연(ms) 히스토그램(샘플 수와 무관한 고정 메모리)
+        self.read_lat = LatencyHistogram()
+        # 쓰기 지연(ms) 히스토그램
+        self.write_lat = LatencyHistogram()
         # 총 읽기/쓰기 카운트
         self.reads = 0
         self.writes = 0
         # 최신값보다 과거를 읽은 횟수(복제 지연으로 인한 stale read)
         self.stale = 0
-        # 내가 바로 전에 쓴 값을 못 본 횟수(세션 관점의 RYW 위반)
+        # 같은 세션이 쓴 값을 못 본 횟수(세션 관점의 RYW 위반)
         self.ryw_violation = 0
+        # 같은 세션이 전에 본 것보다 과거 버전을 본 횟수(단조 읽기 위반)
+        self.monotonic_violation = 0
+        # 세션이 이미 본 쓰기보다 먼저 ack 된 쓰기를 못 본 횟수(consistent prefix 위반)
+        self.prefix_violation = 0
+        # 세션이 본 쓰기가 의존하는 쓰기를 못 본 횟수(writes-follow-reads 위반)
+        self.wfr_violation = 0
         # (CouchDB) 문서 충돌 관측 횟수(_conflicts)
         self.conflicts = 0
+        # 실패해서 기록에서 빠진 연산 수
+        self.errors = 0
+        # 배치 모드에서 배치 한 번(bulk 요청 1회)의 지연
+        self.write_batch_lat = LatencyHistogram()
+        self.read_batch_lat = LatencyHistogram()
         # 각 키에 대해 "마지막으로 쓴 버전"을 기억(간단한 버전 카운터)
         self.last_written: Dict[int, int] = {}
-        # 각 키에 대해 "마지막으로 본 버전"(단조 읽기 체크 보조용)
-        self.last_seen: Dict[int, int] = {}
+        # 측정 구간 길이(초). 드라이버가 채우면 처리량도 함께 보고
+        self.elapsed_s = 0.0
+        # 초 단위 구간별 완료 연산 지연(구간 번호 → 히스토그램). 처리량/지연의 시간 변화 확인용
+        self.windows: Dict[int, LatencyHistogram] = {}
+
+    def mark(self, at_s: float, lat_ms: float):
+        """측정 시작 후 at_s 초에 끝난 연산 하나(지연 lat_ms)를 그 초의 구간에 기록"""
+        i = int(at_s)
+        w = self.windows.get(i)
+        if w is None:
+            w = self.windows[i] = LatencyHistogram()
+        w.record(lat_ms)
+
+    def observe_read(self, k: int, seen_v: int, latest_known: int, session: Session = None, versions=None):
+        """
+        읽은 값 seen_v 를 판정한다.
+        - stale: '읽기 시작 전에 (어느 세션이든) ack 된 최신 버전' latest_known 보다 과거
+        - 나머지는 session 이 주어졌을 때 그 세션 기준으로(versions 는 쓰기별 ack 순번/의존을 기록한 SharedVersions)
+        """
+        # 내가 아는 "마지막 쓴 값"(최신)보다 작으면 stale로 간주
+        if seen_v < latest_known:
+            self.stale += 1
+        if session is None:
+            return
+        # RYW: 이 세션이 쓴 것만 기준
+        if seen_v < session.own.get(k, 0):
+            self.ryw_violation += 1
+        # 단조 읽기: 이 세션이 전에 본 버전보다 과거로 돌아감
+        if seen_v < session.seen.get(k, 0):
+            self.monotonic_violation += 1
+        # writes-follow-reads: 전에 본 쓰기가 의존하던 버전을 못 봄
+        if seen_v < session.required.get(k, 0):
+            self.wfr_violation += 1
+        if versions is not None:
+            # consistent prefix: 본 버전의 다음 버전이, 이 세션이 이미 본 어떤 쓰기보다 먼저 ack 됐는데 안 보임
+            nxt = versions.meta(k, seen_v + 1)
+            if nxt is not None and nxt[0] < session.max_seq:
+                self.prefix_violation += 1
+            cur = versions.meta(k, seen_v)
+            if cur is not None:
+                seq, dep = cur
+                if seq > session.max_seq:
+                    session.max_seq = seq
+                if dep is not None and dep[1] > session.required.get(dep[0], 0):
+                    session.required[dep[0]] = dep[1]
+        if seen_v > session.seen.get(k, 0):
+            session.seen[k] = seen_v
+        if seen_v:
+            session.last_read = (k, seen_v)
+
+    def merge(self, other: "Meter") -> "Meter":
+        """다른 워커의 Meter 를 합친다(카운터는 더하고, 히스토그램은 merge, 버전은 최댓값)"""
+        self.read_lat.merge(other.read_lat)
+        self.write_lat.merge(other.write_lat)
+        self.write_batch_lat.merge(other.write_batch_lat)
+        self.read_batch_lat.merge(other.read_batch_lat)
+        self.reads += other.reads
+        self.writes += other.writes
+        self.stale += other.stale
+        self.ryw_violation += other.ryw_violation
+        self.monotonic_violation += other.monotonic_violation
+        self.prefix_violation += other.prefix_violation
+        self.wfr_violation += other.wfr_violation
+        self.conflicts += other.conflicts
+        self.errors += other.errors
+        for k, v in other.last_written.items():
+            if v > self.last_written.get(k, 0):
+                self.last_written[k] = v
+        self.elapsed_s = max(self.elapsed_s, other.elapsed_s)
+        for i, w in other.windows.items():
+            if i in self.windows:
+                self.windows[i].merge(w)
+            else:
+                self.windows[i] = LatencyHistogram().merge(w)
+        return self
+
+    # to_dict()/from_dict() 로 주고받는 카운터 필드
+    COUNTERS = ("reads", "writes", "stale", "ryw_violation", "monotonic_violation", "prefix_violation",
+                "wfr_violation", "conflicts", "errors", "elapsed_s")
+    HISTOGRAMS = ("read_lat", "write_lat", "write_batch_lat", "read_batch_lat")
+
+    def to_dict(self) -> dict:
+        """
+        다른 프로세스로 보낼 수 있는 형태(히스토그램/카운터/초 단위 구간).
+        last_written 은 보고서에 쓰이지 않고 키 수만큼 커지므로 빼고 보낸다
+        """
+        d = {name: getattr(self, name) for name in self.COUNTERS}
+        for name in self.HISTOGRAMS:
+            d[name] = getattr(self, name).to_dict()
+        d["windows"] = [[i, w.to_dict()] for i, w in self.windows.items()]
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Meter":
+        m = cls()
+        for name in cls.COUNTERS:
+            setattr(m, name, d[name])
+        for name in cls.HISTOGRAMS:
+            setattr(m, name, LatencyHistogram.from_dict(d[name]))
+        m.windows = {i: LatencyHistogram.from_dict(w) for i, w in d["windows"]}
+        return m
 
     def report(self, model: str):
         """수집된 지표를 사람이 보기 쉬운 딕셔너리로 요약"""
-        # 평균 계산 보조 함수(비어 있으면 0.0)
-        def avg(a):
-            return (sum(a) / len(a)) if a else 0.0
-        # 결과 딕셔너리 구성(지연 평균/95백분위, stale/RYW율, 충돌 수)
-        return {
+        # 결과 딕셔너리 구성(지연 평균/백분위, stale/RYW율, 충돌 수)
+        res = {
             "model": model,
             "reads": self.reads,
             "writes": self.writes,
-            "avg_read_ms": round(avg(self.read_lat), 3),
-            "p95_read_ms": round(pct(self.read_lat, 95), 3),
-            "avg_write_ms": round(avg(self.write_lat), 3),
-            "p95_write_ms": round(pct(self.write_lat, 95), 3),
+            "avg_read_ms": round(self.read_lat.mean(), 3),
+            "p95_read_ms": round(self.read_lat.percentile(95), 3),
+            "avg_write_ms": round(self.write_lat.mean(), 3),
+            "p95_write_ms": round(self.write_lat.percentile(95), 3),
             "stale_read_rate": round(self.stale / self.reads, 4) if self.reads else 0.0,
             "ryw_violation_rate": round(self.ryw_violation / self.reads, 4) if self.reads else 0.0,
+            "monotonic_read_violation_rate": round(self.monotonic_violation / self.reads, 4) if self.reads else 0.0,
+            "prefix_violation_rate": round(self.prefix_violation / self.reads, 4) if self.reads else 0.0,
+            "wfr_violation_rate": round(self.wfr_violation / self.reads, 4) if self.reads else 0.0,
             "conflicts": self.conflicts,
+            "errors": self.errors,
         }
+        # 처리량(드라이버가 측정 구간을 기록한 경우)
+        ops = self.reads + self.writes
+        res["ops_per_s"] = round(ops / self.elapsed_s, 1) if self.elapsed_s else 0.0
+        # 배치 모드라면 배치 단위 지연도 함께
+        for name, h in (("write", self.write_batch_lat), ("read", self.read_batch_lat)):
+            if h.count:
+                res[f"{name}_batches"] = h.count
+                res[f"avg_{name}_batch_ms"] = round(h.mean(), 3)
+                res[f"p95_{name}_batch_ms"] = round(h.percentile(95), 3)
+        # CSV 에는 나오지 않는 꼬리 지연 백분위수(p50/p90/p99/p99.9/max)
+        for name, h in (("read", self.read_lat), ("write", self.write_lat)):
+            for label, p in (("p50", 50), ("p90", 90), ("p99", 99), ("p999", 99.9), ("max", 100)):
+                res[f"{label}_{name}_ms"] = round(h.percentile(p), 3)
+        # 초 단위 구간별 처리량/지연(읽기+쓰기). s 는 구간의 실제 길이(마지막 구간은 1초가 안 될 수 있음)
+        res["windows"] = [
+            {"t": i, "s": self._window_s(i), "ops": w.count,
+             "p50_ms": round(w.percentile(50), 3), "p99_ms": round(w.percentile(99), 3)}
+            for i, w in sorted(self.windows.items())
+        ]
+        return res
+
+    def _window_s(self, i: int) -> float:
+        """구간 i 의 길이(초). 측정 구간 끝에 걸린 마지막 구간만 1초보다 짧다"""
+        left = self.elapsed_s - i
+        return round(min(1.0, left), 3) if left > 0 else 1.0
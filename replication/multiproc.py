@@ -0,0 +1,114 @@
+import multiprocessing as mp
+import queue
+import traceback
+
+import opstream
+from meter import Meter
+
+# 자식 보고서에서 프로세스끼리 합칠 때 합(나머지 적재/예열 값은 최댓값)
+SUMMED_PHASES = ("preload_keys", "preload_errors", "warmup_ops")
+
+
+def split_ops(ops, n):
+    """연산 목록을 키 몫(k % n)별로 나눈다(각 몫 안에서는 원래 순서 유지)"""
+    parts = [[] for _ in range(n)]
+    for op in ops:
+        parts[op[1] % n].append(op)
+    return parts
+
+
+def _child(args, index, n, ops, barrier, out):
+    """
+    자식 프로세스 하나: 부모가 나눠 준 자기 키 몫(k % n == index)의 연산만 자기 백엔드 연결로 실행하고
+    보고서(+ Meter 전체)를 큐로 보낸다. 실패하면 barrier 를 깨서 다른 자식이 기다리지 않게 한다
+    """
+    from bench import build_parser, run
+    args.processes = 1
+    args.partition = (index, n)
+    args.ops_list = ops
+    args.start_barrier = barrier
+    if args.rate:
+        # 전체 목표 속도와 예열 연산 수를 프로세스 수로 나눔
+        args.rate = args.rate / n
+    if args.warmup_ops:
+        args.warmup_ops = -(-args.warmup_ops // n)
+    try:
+        res = run(args, build_parser())
+        out.put((index, res, None))
+    except BaseException:
+        barrier.abort()
+        out.put((index, None, traceback.format_exc()))
+
+
+def _merge_stats(stats_list):
+    """backend_stats 합치기: 정수는 합, 실수(비율/평균)는 프로세스 평균"""
+    merged = {}
+    for name in stats_list[0]:
+        vals = [s[name] for s in stats_list if name in s]
+        if all(isinstance(v, int) for v in vals):
+            merged[name] = sum(vals)
+        elif all(isinstance(v, (int, float)) for v in vals):
+            merged[name] = round(sum(vals) / len(vals), 4)
+    return merged
+
+
+def merge_reports(results, n):
+    """자식 보고서들의 Meter 를 합쳐 한 프로세스에서 돈 것과 같은 모양의 보고서를 만든다"""
+    meter = Meter()
+    for res in results:
+        meter.merge(Meter.from_dict(res["meter"]))
+    merged = meter.report(model=results[0]["model"])
+    merged["processes"] = n
+    for name in SUMMED_PHASES:
+        if name in results[0]:
+            merged[name] = sum(r.get(name, 0) for r in results)
+    for name in ("preload_s", "warmup_s"):
+        if name in results[0]:
+            merged[name] = max(r.get(name, 0.0) for r in results)
+    if "preload_s" in merged:
+        s = merged["preload_s"]
+        merged["preload_keys_per_s"] = round(merged["preload_keys"] / s, 1) if s else 0.0
+    stats = [r["backend_stats"] for r in results if r.get("backend_stats")]
+    if stats:
+        merged["backend_stats"] = _merge_stats(stats)
+    return merged
+
+
+def run_processes(args):
+    """
+    --processes P: 벤치를 자식 프로세스 P 개로 나눠 돌린다(GIL 에 묶인 클라이언트가 먼저 포화되지 않게).
+    - 연산 목록은 부모가 한 번만 만들어(--save-ops 면 저장, --ops-file 이면 읽기) 키 몫(k % P)별로 나눠 자식에게 넘김
+    - 자식마다 자기 백엔드 연결/세션/--concurrency 워커. 적재/예열 뒤 barrier 에서 모여 함께 측정 시작
+    - 자식은 히스토그램/카운터를 Meter.to_dict() 로 보내고, 부모가 merge 해 표준 보고서로
+    - 시뮬레이터 모드는 자식마다 독립된 클러스터가 생긴다(키끼리 독립이라 판정 결과는 같은 모양)
+    """
+    n = args.processes
+    # 분포/시드 계산과 저장은 부모에서 한 번만, 자식은 나눠 받은 목록만 실행
+    parts = split_ops(opstream.from_args(args), n)
+    args.save_ops = None
+    barrier = mp.Barrier(n)
+    out = mp.Queue()
+    procs = [mp.Process(target=_child, args=(args, i, n, parts[i], barrier, out)) for i in range(n)]
+    for proc in procs:
+        proc.start()
+    results, errors = {}, []
+    while len(results) + len(errors) < n:
+        try:
+            index, res, err = out.get(timeout=1.0)
+        except queue.Empty:
+            # 큐에 아무것도 못 넣고 죽은 자식(메모리 부족 등)
+            if all(not proc.is_alive() for proc in procs) and out.empty():
+                errors.append("worker process exited without a report")
+                break
+            continue
+        if err:
+            errors.append(f"worker {index}:\n{err}")
+        else:
+            results[index] = res
+    for proc in procs:
+        proc.join()
+    if errors:
+        # barrier 가 깨져 따라 죽은 자식보다 먼저 실패한 자식의 에러를 보여줌
+        errors.sort(key=lambda e: "BrokenBarrierError" in e)
+        raise SystemExit("bench: --processes worker failed\n" + errors[0])
+    return merge_reports([results[i] for i in range(n)], n)
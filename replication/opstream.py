@@ -0,0 +1,180 @@
+import gzip
+import json
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import List, Tuple
+
+# --vectorize on 이고 NumPy 가 있으면 난수/키 선택을 배열 단위로 한 번에 만든다(기본은 순수 파이썬)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DISTRIBUTIONS = ["uniform", "zipfian", "hotspot", "latest"]
+
+Op = Tuple[bool, int]
+
+
+def _zipf_cdf(n: int, theta: float) -> List[float]:
+    """순위 1..n 의 확률이 1/r^theta 에 비례하는 누적 분포"""
+    weights = [1.0 / (r ** theta) for r in range(1, n + 1)]
+    total = sum(weights)
+    return [c / total for c in accumulate(weights)]
+
+
+def _scramble(n: int, seed: int) -> List[int]:
+    """순위 → 키 고정 순열(인기 키가 0, 1, 2... 에 몰려 같은 파티션에 붙지 않게)"""
+    perm = list(range(n))
+    random.Random(seed ^ 0x5EED).shuffle(perm)
+    return perm
+
+
+class OpStream:
+    """
+    측정 전에 (is_write, k) 연산 목록을 한 번에 만들어 두는 생성기.
+    - uniform: 모든 키가 같은 확률
+    - zipfian: 순위 r 키의 확률 ∝ 1/r^theta (YCSB 기본 theta=0.99), 순위는 고정 순열로 키에 흩뿌림
+    - hotspot: 키의 hot_fraction 이 연산의 hot_prob 를 받음
+    - latest: 쓰기는 zipfian, 읽기는 '최근에 쓴 키'일수록 자주(직전 쓰기에서 zipf 만큼 떨어진 쓰기의 키)
+    기본은 순수 파이썬 생성기 → 같은 설정/시드면 어느 환경에서든 같은 목록.
+    vectorize=True 면 NumPy 로 크게 빨리 만들지만 난수열이 달라지므로(같은 분포, 다른 목록)
+    다른 환경과 같은 부하를 주려면 save() 한 파일을 load() 해서 쓴다.
+    """
+    def __init__(self, ops: int, keys: int, write_ratio: float, dist: str = "uniform", theta: float = 0.99,
+                 hot_fraction: float = 0.2, hot_prob: float = 0.8, seed: int = 42, vectorize: bool = False):
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"unknown key distribution: {dist}")
+        self.ops = ops
+        self.keys = keys
+        self.write_ratio = write_ratio
+        self.dist = dist
+        self.theta = theta
+        self.hot_fraction = hot_fraction
+        self.hot_prob = hot_prob
+        self.seed = seed
+        self.vectorize = vectorize
+
+    def params(self) -> dict:
+        return {
+            "ops": self.ops, "keys": self.keys, "write_ratio": self.write_ratio, "dist": self.dist,
+            "theta": self.theta, "hot_fraction": self.hot_fraction, "hot_prob": self.hot_prob, "seed": self.seed,
+        }
+
+    def generate(self) -> List[Op]:
+        # NumPy 경로는 명시적으로 켰을 때만(없으면 순수 파이썬으로)
+        if self.vectorize and np is not None:
+            return self._generate_np()
+        return self._generate_py()
+
+    # ---------- 순수 파이썬 ----------
+    def _generate_py(self) -> List[Op]:
+        rng = random.Random(self.seed)
+        n, keys = self.ops, self.keys
+        if self.dist == "uniform":
+            # 예전 make_ops 와 같은 난수 소비 순서(같은 시드면 같은 목록)
+            out = []
+            for _ in range(n):
+                is_write = rng.random() < self.write_ratio
+                out.append((is_write, rng.randrange(keys)))
+            return out
+
+        flags = [rng.random() < self.write_ratio for _ in range(n)]
+        if self.dist == "hotspot":
+            n_hot = max(1, int(keys * self.hot_fraction))
+            cold_lo = n_hot if keys > n_hot else 0
+            ks = [rng.randrange(n_hot) if rng.random() < self.hot_prob else rng.randrange(cold_lo, keys)
+                  for _ in range(n)]
+            return list(zip(flags, ks))
+
+        cdf = _zipf_cdf(keys, self.theta)
+        perm = _scramble(keys, self.seed)
+        ranks = [min(bisect_left(cdf, rng.random()), keys - 1) for _ in range(n)]
+        if self.dist == "zipfian":
+            return [(w, perm[r]) for w, r in zip(flags, ranks)]
+
+        # latest: 쓰기 키는 zipfian, 읽기는 직전 쓰기들 중 r 번째 전 것(아직 쓰기가 없으면 uniform)
+        written = []
+        out = []
+        for w, r in zip(flags, ranks):
+            if w:
+                k = perm[r]
+                written.append(k)
+            elif written:
+                k = written[max(0, len(written) - 1 - r)]
+            else:
+                k = rng.randrange(keys)
+            out.append((w, k))
+        return out
+
+    # ---------- NumPy ----------
+    def _generate_np(self) -> List[Op]:
+        rng = np.random.default_rng(self.seed)
+        n, keys = self.ops, self.keys
+        flags = rng.random(n) < self.write_ratio
+        if self.dist == "uniform":
+            ks = rng.integers(0, keys, n)
+        elif self.dist == "hotspot":
+            n_hot = max(1, int(keys * self.hot_fraction))
+            hot = rng.random(n) < self.hot_prob
+            cold_lo = n_hot if keys > n_hot else 0
+            ks = np.where(hot, rng.integers(0, n_hot, n), rng.integers(cold_lo, keys, n))
+        else:
+            w = 1.0 / np.arange(1, keys + 1, dtype=np.float64) ** self.theta
+            cdf = np.cumsum(w) / w.sum()
+            ranks = np.minimum(np.searchsorted(cdf, rng.random(n)), keys - 1)
+            perm = np.asarray(_scramble(keys, self.seed))
+            ks = perm[ranks]
+            if self.dist == "latest":
+                # i 번째 연산 직전까지의 쓰기 수 → 읽기는 그 중 ranks 만큼 앞선 쓰기의 키
+                write_idx = np.flatnonzero(flags)
+                before = np.cumsum(flags) - flags
+                pos = before - 1 - ranks
+                has_prev = before > 0
+                pick = write_idx[np.clip(pos, 0, None)] if len(write_idx) else np.zeros(n, dtype=np.int64)
+                read_ks = np.where(has_prev, ks[pick] if len(write_idx) else 0, rng.integers(0, keys, n))
+                ks = np.where(flags, ks, read_ks)
+        return list(zip(flags.tolist(), ks.tolist()))
+
+    # ---------- 저장/재생 ----------
+    def save(self, path: str, ops: List[Op]):
+        """연산 목록을 gzip JSON 으로 저장(설정값 포함). 어떤 백엔드/환경에서도 같은 부하를 재생"""
+        body = {
+            "params": self.params(),
+            "w": "".join("1" if w else "0" for w, _ in ops),
+            "k": [k for _, k in ops],
+        }
+        with gzip.open(path, "wt") as f:
+            json.dump(body, f)
+
+    @staticmethod
+    def load(path: str) -> List[Op]:
+        with gzip.open(path, "rt") as f:
+            body = json.load(f)
+        return [(c == "1", k) for c, k in zip(body["w"], body["k"])]
+
+
+def from_args(args) -> List[Op]:
+    """
+    bench 인자로 연산 목록을 만든다.
+    - --ops-file 이 있으면 그 파일을 재생(--ops/--keys/--key-dist 무시)
+    - --save-ops 가 있으면 만든 목록을 저장
+    """
+    path = getattr(args, "ops_file", None)
+    if path:
+        return OpStream.load(path)
+    stream = OpStream(
+        ops=args.ops,
+        keys=args.keys,
+        write_ratio=args.write_ratio,
+        dist=getattr(args, "key_dist", "uniform"),
+        theta=getattr(args, "zipf_theta", 0.99),
+        hot_fraction=getattr(args, "hot_fraction", 0.2),
+        hot_prob=getattr(args, "hot_prob", 0.8),
+        seed=getattr(args, "op_seed", 42),
+        vectorize=getattr(args, "vectorize", "off") == "on",
+    )
+    ops = stream.generate()
+    if getattr(args, "save_ops", None):
+        stream.save(args.save_ops, ops)
+    return ops
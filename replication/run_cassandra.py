@@ -1,93 +1,142 @@
-import random
 import time
 
-from meter import Meter
+from cassandra_async import AsyncCassandraRunner
+from driver import attach_meter, run_backend
 from cassandra.cluster import Cluster
+from cassandra.concurrent import execute_concurrent_with_args
 from cassandra.auth import PlainTextAuthProvider
+from cassandra.query import BatchStatement, BatchType
 from cassandra import ConsistencyLevel
 
+
+# 문자열을 ConsistencyLevel 상수로 변환하는 헬퍼
+def cl_from(s):
+    return getattr(ConsistencyLevel, s.upper())
+
+
+class CassandraBackend:
+    """Cassandra에서 ConsistencyLevel 조합(W/R)을 바꿔가며 측정하는 백엔드"""
+    # 실행 사이에 테이블이 남음 → 드라이버가 남은 버전을 읽어 그 다음부터 발급
+    persistent = True
+
+    def __init__(self, args):
+        self.args = args
+        # 모델명에 CL/W/R/RF 표기
+        self.model = f"cassandra_W{args.write_cl}_R{args.read_cl}_RF{args.rf}"
+
+    def setup(self):
+        args = self.args
+        # 호스트 리스트를 쉼표로 분리하여 배열 생성
+        hosts = [h.strip() for h in args.hosts.split(",")]
+        # 사용자/비밀번호가 있으면 인증 객체 구성
+        auth = None
+
+        if args.username and args.password:
+            auth = PlainTextAuthProvider(username=args.username, password=args.password)
+        # 클러스터 객체 생성(기본 포트 9042, 첫 노드로부터 메타데이터 수집)
+        self.cluster = Cluster(hosts, auth_provider=auth)
+        # 세션 획득(키스페이스 선택 전에 system으로 연결됨)
+        session = self.session = self.cluster.connect()
+
+        # 키스페이스 생성(없으면 생성, replication_factor는 테스트용 SimpleStrategy)
+        session.execute(
+            f"CREATE KEYSPACE IF NOT EXISTS {args.keyspace} "
+            f"WITH replication = {{'class':'SimpleStrategy','replication_factor':{args.rf}}};"
+        )
+        # 테이블 생성(없으면 생성) — k(파티션키), v/ts 필드
+        session.execute(
+            f"CREATE TABLE IF NOT EXISTS {args.keyspace}.{args.table} "
+            f"(k int PRIMARY KEY, v int, ts bigint);"
+        )
+
+        # 준비된 쓰기/읽기 쿼리(파라미터 바인딩)
+        # 쓰기 타임스탬프를 버전에서 만든다(USING TIMESTAMP 기준 + v) → 같은 키에 v6 이 v5 보다 먼저 도착해도
+        # 셀 LWW 가 v6 을 남김. 기준은 실행 시작 시각(µs)이라 이전 실행이 남긴 셀보다 항상 새것
+        self.ts_base = int(time.time() * 1_000_000)
+        self.write_stmt = session.prepare(
+            f"INSERT INTO {args.keyspace}.{args.table} (k, v, ts) VALUES (?, ?, ?) USING TIMESTAMP ?")
+        self.read_stmt = session.prepare(f"SELECT v, ts FROM {args.keyspace}.{args.table} WHERE k=?")
+        # ConsistencyLevel 설정(튜너블 쿼럼)
+        self.write_stmt.consistency_level = cl_from(args.write_cl)
+        self.read_stmt.consistency_level = cl_from(args.read_cl)
+
+    def write_params(self, k, v):
+        # (k, v, ts 열, 쓰기 타임스탬프)
+        return (k, v, int(time.time() * 1000), self.ts_base + v)
+
+    def write(self, k, v):
+        # 파라미터 바인딩으로 쓰기 실행
+        self.session.execute(self.write_stmt, self.write_params(k, v))
+
+    def read(self, k):
+        # 읽기 실행(one()으로 단일 행)
+        row = self.session.execute(self.read_stmt, (k,)).one()
+        # 결과가 없거나 v가 None이면 0으로 해석
+        return row.v if row and hasattr(row, "v") and row.v is not None else 0
+
+    def preload(self, items):
+        """
+        --preload 용 대량 적재: 준비된 쓰기 문을 execute_concurrent 로 동시에 여러 개 날린다.
+        (파티션이 제각각인 키를 LOGGED/UNLOGGED BATCH 로 묶으면 코디네이터만 바빠지므로 묶지 않음)
+        실패한 항목의 인덱스들을 돌려준다
+        """
+        results = execute_concurrent_with_args(
+            self.session, self.write_stmt, [self.write_params(k, v) for k, v in items],
+            concurrency=self.args.preload_concurrency, raise_on_first_error=False,
+        )
+        return [i for i, (ok, _) in enumerate(results) if not ok]
+
+    def replica_of(self, k):
+        """키 k 를 담당하는 첫 복제본 주소(UNLOGGED BATCH 를 복제본별로 묶는 기준)"""
+        routing_key = self.write_stmt.bind((k, 0, 0, 0)).routing_key
+        replicas = self.cluster.metadata.get_replicas(self.args.keyspace, routing_key)
+        return replicas[0].address if replicas else k
+
+    # ---------- 지연 프로브용 ----------
+    def replicas(self):
+        """지연 프로브의 마커 키를 담당하는 복제본 주소들(read_at 은 그 노드를 코디네이터로 CL ONE 읽기)"""
+        probe_key = self.args.keys
+        routing_key = self.write_stmt.bind((probe_key, 0, 0, 0)).routing_key
+        hosts = self.cluster.metadata.get_replicas(self.args.keyspace, routing_key)
+        self.replica_hosts = {h.address: h for h in hosts}
+        # 코디네이터 자신이 복제본이므로 CL ONE 이면 대개 로컬 데이터를 돌려준다(동적 스니치가 다른 복제본을 고를 수도 있음)
+        self.probe_stmt = self.session.prepare(f"SELECT v FROM {self.args.keyspace}.{self.args.table} WHERE k=?")
+        self.probe_stmt.consistency_level = ConsistencyLevel.ONE
+        return list(self.replica_hosts)
+
+    def read_at(self, replica, k):
+        row = self.session.execute(self.probe_stmt, (k,), host=self.replica_hosts[replica]).one()
+        return row.v if row and row.v is not None else 0
+
+    def close(self):
+        self.cluster.shutdown()
+
+
+def run_cassandra_async(args):
+    """execute_async 파이프라이닝(+ 선택적으로 복제본별 UNLOGGED BATCH)으로 측정"""
+    backend = CassandraBackend(args)
+    backend.setup()
+    try:
+        runner = AsyncCassandraRunner(
+            backend.session, backend.write_stmt, backend.read_stmt, args,
+            make_batch=lambda: BatchStatement(batch_type=BatchType.UNLOGGED,
+                                              consistency_level=cl_from(args.write_cl)),
+            partition_of=backend.replica_of,
+            write_params=backend.write_params,
+            persistent=backend.persistent,
+        )
+        meter = runner.run()
+    finally:
+        backend.close()
+    res = meter.report(model=f"{backend.model}_async{args.async_window}_batch{args.batch_size}")
+    res.update(runner.phases)
+    return attach_meter(res, meter, args)
+
+
 def run_cassandra(args):
     """Cassandra에서 ConsistencyLevel 조합(W/R)을 바꿔가며 측정"""
-
-    # 문자열을 ConsistencyLevel 상수로 변환하는 헬퍼
-    def cl_from(s):
-        return getattr(ConsistencyLevel, s.upper())
-
-    # 호스트 리스트를 쉼표로 분리하여 배열 생성
-    hosts = [h.strip() for h in args.hosts.split(",")]
-    # 사용자/비밀번호가 있으면 인증 객체 구성
-    auth = None
-
-    if args.username and args.password:
-        auth = PlainTextAuthProvider(username=args.username, password=args.password)
-    # 클러스터 객체 생성(기본 포트 9042, 첫 노드로부터 메타데이터 수집)
-    cluster = Cluster(hosts, auth_provider=auth)
-    # 세션 획득(키스페이스 선택 전에 system으로 연결됨)
-    session = cluster.connect()
-
-    # 키스페이스 생성(없으면 생성, replication_factor는 테스트용 SimpleStrategy)
-    session.execute(
-        f"CREATE KEYSPACE IF NOT EXISTS {args.keyspace} "
-        f"WITH replication = {{'class':'SimpleStrategy','replication_factor':{args.rf}}};"
-    )
-    # 테이블 생성(없으면 생성) — k(파티션키), v/ts 필드
-    session.execute(
-        f"CREATE TABLE IF NOT EXISTS {args.keyspace}.{args.table} "
-        f"(k int PRIMARY KEY, v int, ts bigint);"
-    )
-
-    # 준비된 쓰기/읽기 쿼리(파라미터 바인딩)
-    write = session.prepare(f"INSERT INTO {args.keyspace}.{args.table} (k, v, ts) VALUES (?, ?, ?)")
-    read = session.prepare(f"SELECT v, ts FROM {args.keyspace}.{args.table} WHERE k=?")
-    # ConsistencyLevel 설정(튜너블 쿼럼)
-    write.consistency_level = cl_from(args.write_cl)
-    read.consistency_level = cl_from(args.read_cl)
-
-    # 메트릭 집계기 생성
-    meter = Meter()
-    # 난수 시드 고정
-    rng = random.Random(42)
-
-    # 총 연산 루프
-    for _ in range(args.ops):
-        # 쓰기/읽기 결정
-        is_write = rng.random() < args.write_ratio
-        # 랜덤 키 선택
-        k = rng.randrange(args.keys)
-
-        if is_write:
-            # 버전 증가
-            v = meter.last_written.get(k, 0) + 1
-            # 쓰기 지연 시작
-            t0 = time.perf_counter()
-            # 파라미터 바인딩으로 쓰기 실행
-            session.execute(write, (k, v, int(time.time() * 1000)))
-            # 쓰기 지연 기록
-            meter.write_lat.append((time.perf_counter() - t0) * 1000)
-            # 쓰기 카운트 증가
-            meter.writes += 1
-            # 마지막 쓴 버전 갱신
-            meter.last_written[k] = v
-        else:
-            # 읽기 지연 시작
-            t0 = time.perf_counter()
-            # 읽기 실행(one()으로 단일 행)
-            row = session.execute(read, (k,)).one()
-            # 읽기 지연 기록
-            meter.read_lat.append((time.perf_counter() - t0) * 1000)
-            # 읽기 카운트 증가
-            meter.reads += 1
-            # 결과가 없거나 v가 None이면 0으로 해석
-            seen_v = row.v if row and hasattr(row, "v") and row.v is not None else 0
-
-            # 최신값 대비 stale/RYW 체크
-            latest_known = meter.last_written.get(k, 0)
-            if seen_v < latest_known:
-                meter.stale += 1
-                if latest_known:
-                    meter.ryw_violation += 1
-            # last_seen 갱신
-            meter.last_seen[k] = max(meter.last_seen.get(k, 0), seen_v)
-
-    # 결과 딕셔너리 반환(모델명에 CL/W/R/RF 표기)
-    return meter.report(model=f"cassandra_W{args.write_cl}_R{args.read_cl}_RF{args.rf}")
+    # in-flight 창이 지정되면 비동기 파이프라이닝 모드
+    if getattr(args, "async_window", 0):
+        return run_cassandra_async(args)
+    # 연산 목록을 --concurrency 워커(또는 --rate 오픈 루프)로 실행
+    return run_backend(CassandraBackend(args), args)
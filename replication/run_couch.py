@@ -1,129 +1,241 @@
+import hashlib
 import random
+import threading
 import time
 
-from meter import Meter
+from driver import run_backend
 # requests: CouchDB HTTP API 호출용 세션
 import requests
-
-def run_couch(args):
-    """CouchDB 2노드 간 양방향 continuous replication에서 충돌/지연 관찰"""
-
-    # 세션 생성(커넥션 재사용)
-    s = requests.Session()
-
-    # 데이터베이스 생성(이미 존재하면 412/409 등 무시)
-    def put_db(base, db):
-        s.put(f"{base}/{db}")
-
-    # 양방향 복제를 설정하는 헬퍼(각 노드에서 서로를 target으로 지정)
-    def start_continuous_replication(src_base, dst_base, db):
-        payload = {"source": f"{src_base}/{db}", "target": f"{dst_base}/{db}", "continuous": True}
-        s.post(f"{src_base}/_replicate", json=payload, timeout=10)
-
-    # A/B 노드에 DB 생성 후, 양방향 continuous replication 설정
-    put_db(args.couch_a, args.db)
-    put_db(args.couch_b, args.db)
-    start_continuous_replication(args.couch_a, args.couch_b, args.db)
-    start_continuous_replication(args.couch_b, args.couch_a, args.db)
-
-    # 메트릭 집계기 생성
-    meter = Meter()
-    # 난수 시드 고정
-    rng = random.Random(42)
-    # 각 노드별 최근 _rev 캐시(갱신 시 충돌(409) 회피 위해 최신 rev를 보내야 함)
-    rev_cache = {"a": {}, "b": {}}
+from requests.adapters import HTTPAdapter
+
+
+def rev_id(k, v) -> str:
+    """키 k 의 버전 v 에 대한 결정적 리비전 해시(new_edits=false 로 쓸 때 _rev/_revisions 에 사용)"""
+    return hashlib.md5(f"{k}:{v}".encode()).hexdigest()
+
+
+class CouchBackend:
+    """CouchDB 2노드 간 양방향 continuous replication에서 충돌/지연을 관찰하는 백엔드"""
+    # 실행 사이에 DB 가 남음 → 드라이버가 남은 버전을 읽어 그 다음부터 발급
+    persistent = True
+
+    def __init__(self, args):
+        self.args = args
+        # new_edits=false 면 클라이언트가 리비전을 직접 정해 넣는다(409 없음, 복제와 같은 경로)
+        self.new_edits = args.new_edits == "true"
+        # 모델명에 읽기/쓰기 라우팅 표기
+        self.model = f"couch_{args.read_from}_writeTo{args.write_to}" + ("" if self.new_edits else "_noNewEdits")
+        # 충돌 관측 수(여러 워커가 함께 올리므로 락으로 보호)
+        self.conflicts = 0
+        self._conflicts_lock = threading.Lock()
+        # 난수 시드 고정(쓰기 노드 선택용)
+        self.rng = random.Random(42)
+        # 각 노드별 최근 _rev 캐시(갱신 시 충돌(409) 회피 위해 최신 rev를 보내야 함)
+        self.rev_cache = {"a": {}, "b": {}}
+        # 쓰기를 어느 노드로 보낼지 확률 설정("both"면 50:50 분산)
+        self.write_to_a_prob = 0.5 if args.write_to == "both" else (1.0 if args.write_to == "a" else 0.0)
+
+    def setup(self):
+        args = self.args
+        # 세션 생성(커넥션 재사용)
+        s = self.s = requests.Session()
+        # 기본 풀(노드당 10개)은 워커가 많으면 커넥션을 닫고 다시 여는 일이 생김 → 동시성에 맞춰 키움
+        pool = max(10, getattr(args, "concurrency", 1) or 1)
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
+
+        # 데이터베이스 생성(이미 존재하면 412/409 등 무시)
+        def put_db(base, db):
+            s.put(f"{base}/{db}")
+
+        # 양방향 복제를 설정하는 헬퍼(각 노드에서 서로를 target으로 지정)
+        def start_continuous_replication(src_base, dst_base, db):
+            payload = {"source": f"{src_base}/{db}", "target": f"{dst_base}/{db}", "continuous": True}
+            s.post(f"{src_base}/_replicate", json=payload, timeout=10)
+
+        # A/B 노드에 DB 생성 후, 양방향 continuous replication 설정
+        put_db(args.couch_a, args.db)
+        put_db(args.couch_b, args.db)
+        start_continuous_replication(args.couch_a, args.couch_b, args.db)
+        start_continuous_replication(args.couch_b, args.couch_a, args.db)
+        if not self.new_edits:
+            # 쓰기에 싣는 조상 수와 DB 가 트리를 잘라 내는(stemming) 깊이를 맞춘다
+            for base in (args.couch_a, args.couch_b):
+                s.put(f"{base}/{args.db}/_revs_limit", data=str(args.revs_limit))
+
+    def _count_conflict(self, n=1):
+        with self._conflicts_lock:
+            self.conflicts += n
 
     # "a"/"b" 문자열을 실제 베이스 URL로 변환하는 헬퍼
-    def get_node(which):
-        return args.couch_a if which == "a" else args.couch_b
+    def get_node(self, which):
+        return self.args.couch_a if which == "a" else self.args.couch_b
+
+    # 쓰기 노드 선택(a/b)
+    def pick_write_node(self):
+        return "a" if self.rng.random() < self.write_to_a_prob else "b"
 
     # 문서를 읽어오는 함수(옵션으로 conflicts 필드 포함)
-    def get_doc(which, k, with_conflicts=False):
-        base = get_node(which)
+    def get_doc(self, which, k, with_conflicts=False):
+        base = self.get_node(which)
         params = {"conflicts": "true"} if with_conflicts else None
-        r = s.get(f"{base}/{args.db}/{k}", params=params)
+        r = self.s.get(f"{base}/{self.args.db}/{k}", params=params)
         if r.status_code == 200:
             return r.json()
         return None
 
+    # 현재 rev 만 조회(HEAD → ETag, 본문을 받지 않음)
+    def head_rev(self, which, k):
+        r = self.s.head(f"{self.get_node(which)}/{self.args.db}/{k}")
+        if r.status_code != 200:
+            return None
+        return r.headers.get("ETag", "").strip('"') or None
+
     # 문서를 쓰는 함수(있다면 _rev 포함하여 갱신, 없으면 생성)
-    def put_doc(which, k, v, rev=None):
-        base = get_node(which)
+    def put_doc(self, which, k, v, rev=None):
+        base = self.get_node(which)
         body = {"_id": str(k), "v": v, "ts": int(time.time() * 1000)}
         if rev:
             body["_rev"] = rev
-        r = s.put(f"{base}/{args.db}/{k}", json=body)
+        r = self.s.put(f"{base}/{self.args.db}/{k}", json=body)
         return r
 
-    # 쓰기를 어느 노드로 보낼지 확률 설정("both"면 50:50 분산)
-    write_to_a_prob = 0.5 if args.write_to == "both" else (1.0 if args.write_to == "a" else 0.0)
-    # 읽기 대상 노드 고정("a" 또는 "b")
-    read_from = args.read_from
-
-    # 총 연산 루프
-    for _ in range(args.ops):
-        # 쓰기/읽기 결정
-        is_write = rng.random() < args.write_ratio
-        # 키 선택(문서 _id로 사용하기 위해 문자열로도 활용)
-        k = rng.randrange(args.keys)
+    def write(self, k, v):
+        # 어느 노드(a/b)에 쓸지 결정
+        self.write_at(self.pick_write_node(), k, v)
+
+    def write_at(self, which, k, v):
+        if not self.new_edits:
+            # 리비전을 직접 정하는 쓰기는 _bulk_docs 로만 가능
+            if self.write_many_at(which, [(k, v)]):
+                raise requests.HTTPError(f"bulk write of {k} failed")
+            return
+        # 키를 문서 _id로 사용하기 위해 문자열로
         sk = str(k)
-
-        if is_write:
-            # 어느 노드(a/b)에 쓸지 결정
-            which = "a" if rng.random() < write_to_a_prob else "b"
-            # 버전 증가
-            v = meter.last_written.get(k, 0) + 1
-            # 최신 rev(있으면) 조회
-            rev = rev_cache[which].get(k)
-            # 쓰기 요청 1회 시도
-            r = put_doc(which, sk, v, rev)
+        # 최신 rev(있으면) 조회
+        rev = self.rev_cache[which].get(k)
+        # 쓰기 요청 1회 시도
+        r = self.put_doc(which, sk, v, rev)
+        if r.status_code == 409:
+            # 409(충돌)이면 HEAD 로 최신 rev 만 받아 한 번 더 시도(문서 본문 GET 생략)
+            r = self.put_doc(which, sk, v, self.head_rev(which, sk))
+            # 그래도 409면 로컬 경쟁으로 인한 충돌 증가 카운트
             if r.status_code == 409:
-                # 409(충돌)이면 최신 rev를 구해 한 번 더 시도
-                doc = get_doc(which, sk)
-                rev2 = doc.get("_rev") if doc else None
-                r = put_doc(which, sk, v, rev2)
-                # 그래도 409면 로컬 경쟁으로 인한 충돌 증가 카운트
-                if r.status_code == 409:
-                    meter.conflicts += 1
-                else:
-                    # 성공 시 rev 캐시에 최신 rev 저장
-                    rev_cache[which][k] = r.json().get("rev")
-            elif r.ok:
-                # 첫 시도 성공 시 rev 캐시 저장
-                rev_cache[which][k] = r.json().get("rev")
-
-            # 쓰기 지연 측정은 CouchDB HTTP 왕복을 간략화해 생략
-            # 간단히 0ms로 간주하지 않고 실제 시간을 넣고 싶으면 아래 2줄처럼 감싸:
-            # t0 = time.perf_counter(); ...요청 수행...
-            # meter.write_lat.append((time.perf_counter()-t0)*1000)
-            meter.writes += 1
-            meter.last_written[k] = v
+                self._count_conflict()
+                return
+        if r.ok:
+            # 성공 시 rev 캐시에 최신 rev 저장
+            self.rev_cache[which][k] = r.json().get("rev")
+        else:
+            r.raise_for_status()
+
+    def _bulk_body(self, which, k, v):
+        body = {"_id": str(k), "v": v, "ts": int(time.time() * 1000)}
+        if self.new_edits:
+            rev = self.rev_cache[which].get(k)
+            if rev:
+                body["_rev"] = rev
         else:
-            # 읽기 대상 노드 결정(고정)
-            which = read_from
-            # 읽기 지연 측정 시작
-            t0 = time.perf_counter()
-            # 문서 읽기(충돌 메타 포함)
-            doc = get_doc(which, sk, with_conflicts=True)
-            # 읽기 지연 기록
-            meter.read_lat.append((time.perf_counter() - t0) * 1000)
-            # 읽기 카운트 증가
-            meter.reads += 1
-            # 문서가 있으면 v, 없으면 0
-            seen_v = (doc or {}).get("v", 0)
-
-            # 복제 병행 중 충돌이 있으면 _conflicts 배열이 등장 → 충돌 카운트 증가
-            if doc and "_conflicts" in doc and doc["_conflicts"]:
-                meter.conflicts += 1
-
-            # 최신값 대비 stale/RYW 체크
-            latest_known = meter.last_written.get(k, 0)
-            if seen_v < latest_known:
-                meter.stale += 1
-                if latest_known:
-                    meter.ryw_violation += 1
-            # last_seen 갱신
-            meter.last_seen[k] = max(meter.last_seen.get(k, 0), seen_v)
-
-    # 결과 딕셔너리 반환(모델명에 읽기/쓰기 라우팅 표기)
-    return meter.report(model=f"couch_{args.read_from}_writeTo{args.write_to}")
+            # 리비전 v-해시를 직접 지정하고, 최근 조상들을 이어 붙임(복제기와 같은 방식).
+            # 버전은 결정적이라 중간 버전(v-1 등)이 이 노드에 한 번도 안 쓰였어도 기존 트리의 가지 끝에 붙는다
+            # (직전 버전만 보내면 빠진 버전에서 끊겨 별도 가지 → 영구 _conflicts 가 됨).
+            # 조상은 최근 --revs-limit 개까지만: DB 도 그 깊이에서 트리를 잘라 내므로 더 보내도 남지 않고,
+            # 1..v 전체를 보내면 뜨거운 키일수록 요청이 커져 쓰기 지연이 본문 크기를 재게 됨
+            # (연결 지점이 남아 있으려면 한 노드에 쓰기가 revs_limit 버전 넘게 건너뛰지 않아야 함)
+            ids = [rev_id(k, i) for i in range(v, max(0, v - self.args.revs_limit), -1)]
+            body["_rev"] = f"{v}-{ids[0]}"
+            body["_revisions"] = {"start": v, "ids": ids}
+        return body
+
+    def _post_bulk(self, which, latest):
+        """{k: v} 를 _bulk_docs 한 번으로 쓰고, 409 로 거절된 키 목록을 돌려준다"""
+        base = self.get_node(which)
+        docs = [self._bulk_body(which, k, v) for k, v in latest.items()]
+        r = self.s.post(f"{base}/{self.args.db}/_bulk_docs", json={"docs": docs, "new_edits": self.new_edits})
+        r.raise_for_status()
+        rejected = []
+        # new_edits=true 면 문서마다 {"id","rev"} 또는 {"id","error"}; false 면 실패한 것만 돌아옴
+        for row in r.json():
+            k = int(row["id"])
+            if "error" in row:
+                rejected.append(k)
+            elif "rev" in row:
+                self.rev_cache[which][k] = row["rev"]
+        return rejected
+
+    def _fetch_revs(self, which, keys):
+        """_all_docs 한 번으로 여러 문서의 현재 rev 를 받아 캐시에 넣는다"""
+        base = self.get_node(which)
+        r = self.s.post(f"{base}/{self.args.db}/_all_docs", json={"keys": [str(k) for k in keys]})
+        r.raise_for_status()
+        for row in r.json().get("rows", []):
+            if "value" in row:
+                self.rev_cache[which][int(row["key"])] = row["value"]["rev"]
+
+    def write_many(self, items):
+        return self.write_many_at(self.pick_write_node(), items)
+
+    def write_many_at(self, which, items):
+        """
+        (k, v) 여러 개를 한 노드의 _bulk_docs 한 번으로 쓴다. 실패한 항목의 인덱스들을 돌려준다.
+        - new_edits=true: 캐시된 rev 로 갱신, 409 난 문서만 _all_docs 로 rev 를 한 번에 받아 한 번 더 시도
+        - new_edits=false: 클라이언트가 정한 리비전을 그대로 저장(409 없음, 충돌은 복제 중에 생김)
+        """
+        # 한 배치 안의 같은 키는 가장 큰 버전 하나만 보냄
+        latest, owners = {}, {}
+        for i, (k, v) in enumerate(items):
+            latest[k] = max(v, latest.get(k, 0))
+            owners.setdefault(k, []).append(i)
+        rejected = self._post_bulk(which, latest)
+        if rejected and self.new_edits:
+            self._fetch_revs(which, rejected)
+            rejected = self._post_bulk(which, {k: latest[k] for k in rejected})
+            self._count_conflict(len(rejected))
+        return [i for k in rejected for i in owners[k]]
+
+    def read(self, k):
+        # 문서 읽기(충돌 메타 포함, 읽기 대상 노드는 고정)
+        doc = self.get_doc(self.args.read_from, str(k), with_conflicts=True)
+        # 복제 병행 중 충돌이 있으면 _conflicts 배열이 등장 → 충돌 카운트 증가
+        if doc and "_conflicts" in doc and doc["_conflicts"]:
+            self._count_conflict()
+        # 문서가 있으면 v, 없으면 0
+        return (doc or {}).get("v", 0)
+
+    def read_many(self, keys):
+        # _all_docs?include_docs=true 에 keys 를 실어 한 번에 읽음(없는 키는 error 행 → 빠짐)
+        base = self.get_node(self.args.read_from)
+        r = self.s.post(f"{base}/{self.args.db}/_all_docs",
+                        params={"include_docs": "true", "conflicts": "true"},
+                        json={"keys": [str(k) for k in keys]})
+        r.raise_for_status()
+        seen = {}
+        for row in r.json().get("rows", []):
+            doc = row.get("doc")
+            if not doc:
+                continue
+            if doc.get("_conflicts"):
+                self._count_conflict()
+            seen[int(row["key"])] = doc.get("v", 0)
+        return seen
+
+    # ---------- 지연 프로브용(마커는 A 에 쓰고 A/B 양쪽에서 직접 읽음) ----------
+    def replicas(self):
+        return ["a", "b"]
+
+    def write_marker(self, k, v):
+        self.write_at("a", k, v)
+
+    def read_at(self, replica, k):
+        return (self.get_doc(replica, str(k)) or {}).get("v", 0)
+
+    def close(self):
+        self.s.close()
+
+
+def run_couch(args):
+    """CouchDB 2노드 간 양방향 continuous replication에서 충돌/지연 관찰"""
+    # 연산 목록을 --concurrency 워커(또는 --rate 오픈 루프)로 실행(쓰기 지연은 409 재시도 포함해 측정)
+    # --batch-size B 면 _bulk_docs / _all_docs 로 B개씩 묶어 보냄, HTTP 오류는 errors 로 셈
+    return run_backend(CouchBackend(args), args, skip_errors=(requests.RequestException,))
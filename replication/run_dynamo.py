@@ -0,0 +1,344 @@
+import random
+import threading
+from bisect import bisect_right
+
+from driver import REAL_CLOCK, VirtualClock, run_backend
+from run_sim import lag_sampler
+
+
+class Unavailable(Exception):
+    """살아 있는 복제본이 W(또는 R)개보다 적어 요청을 처리할 수 없음"""
+
+
+class _Node:
+    """
+    복제본 하나의 저장 상태.
+    - base: 이미 반영된 키별 버전 / pending: 아직 도착 전인 (도착 시각, 버전) 목록
+    - hinted: 다른 노드 몫으로 맡아 둔 키별 버전(sloppy quorum 의 대리 쓰기)
+    """
+    __slots__ = ("base", "pending", "hinted")
+
+    def __init__(self):
+        self.base = {}
+        self.pending = {}
+        self.hinted = {}
+
+    def apply(self, k: int, v: int, at: float):
+        self.pending.setdefault(k, []).append((at, v))
+
+    def value(self, k: int, t: float) -> int:
+        """시각 t 에 이 노드가 가진 k 의 버전(맡아 둔 힌트 포함)"""
+        v = max(self.base.get(k, 0), self.hinted.get(k, 0))
+        for at, pv in self.pending.get(k, ()):
+            if at <= t and pv > v:
+                v = pv
+        return v
+
+    def fold(self, k: int, now: float):
+        """now 까지 도착한 pending 을 base 로 접는다(목록이 자라지 않게)"""
+        p = self.pending.get(k)
+        if not p:
+            return
+        keep = []
+        v = self.base.get(k, 0)
+        for at, pv in p:
+            if at <= now:
+                v = max(v, pv)
+            else:
+                keep.append((at, pv))
+        self.base[k] = v
+        if keep:
+            self.pending[k] = keep
+        else:
+            del self.pending[k]
+
+
+class DynamoSim:
+    """
+    Dynamo 계열 리더리스 저장소 시뮬레이터(프로세스 안, 여러 워커 스레드가 함께 사용).
+    - 노드 nodes 개를 vnodes 개씩 해시 링에 올리고, 키마다 링을 시계 방향으로 돌며 만나는 서로 다른 노드 n 개가 복제본
+    - 쓰기: 살아 있는 복제본 모두에 보내고 w 개 ack 가 모이면 응답 / 읽기: r 개 응답 중 최대 버전을 돌려줌
+    - 노드 장애/분단: 시간을 down_ms 구간으로 나눠 구간마다 노드가 down_prob 확률로 클라이언트에서 닿지 않음
+      - strict(sloppy=False): 살아 있는 '원래 복제본'이 w(r)개보다 적으면 Unavailable
+      - sloppy: 죽은 복제본 대신 링의 다음 살아 있는 노드가 대리로 받고(w 에 포함) 힌트를 남김
+      - hinted handoff: 원래 노드가 살아나면 힌트를 전달(strict 에서는 코디네이터가 힌트를 들고 있다가 전달)
+    - read repair: 응답한 r 개 중 뒤처진 노드에 최신 버전을 비동기로 다시 씀
+    - anti-entropy: ae_interval_ms 마다 복제본 쌍이 2^merkle_depth 잎의 머클 트리를 비교해 다른 잎의 키만 맞춤
+    - 지연: 노드마다 요청별 단방향 지연을 lat_dist/lat_ms 로 뽑고, 왕복은 그 두 배
+    """
+    def __init__(self, nodes: int = 5, n: int = 3, w: int = 2, r: int = 2, sloppy: bool = True,
+                 hinted_handoff: bool = True, read_repair: bool = True, lat_dist: str = "exp",
+                 lat_ms: float = 0.5, down_prob: float = 0.0, down_ms: float = 200.0,
+                 ae_interval_ms: float = 0.0, merkle_depth: int = 6, keys: int = 1000, vnodes: int = 8,
+                 clock=REAL_CLOCK, seed: int = 42):
+        if not (1 <= w <= n and 1 <= r <= n and n <= nodes):
+            raise ValueError("need 1 <= W, R <= N <= nodes")
+        self.n, self.w, self.r = n, w, r
+        self.sloppy = sloppy
+        self.hinted_handoff = hinted_handoff
+        self.read_repair = read_repair
+        self.down_prob = down_prob
+        self.down_s = down_ms / 1000.0
+        self.ae_interval = ae_interval_ms / 1000.0
+        self.merkle_depth = merkle_depth
+        self.keys = keys
+        self.clock = clock
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self._lat = lag_sampler(lat_dist, lat_ms, self.rng)
+        self._lock = threading.Lock()
+        self.nodes = [_Node() for _ in range(nodes)]
+        # 해시 링: (토큰, 노드) 정렬 목록
+        ring = sorted((self.rng.random(), i) for i in range(nodes) for _ in range(vnodes))
+        self._tokens = [t for t, _ in ring]
+        self._owners = [i for _, i in ring]
+        self._prefs_cache = {}
+        self._down_cache = {}
+        # 대상 노드 → {k: (버전, 힌트를 든 노드 또는 None=코디네이터)}
+        self._hints = {}
+        self._next_ae = clock.now() + self.ae_interval
+        self._groups = None
+        self.stats = {
+            "unavailable": 0, "hints_stored": 0, "hints_delivered": 0, "read_repairs": 0,
+            "ae_rounds": 0, "ae_hash_compares": 0, "ae_keys_repaired": 0,
+        }
+        self.model = (f"dynamo_N{n}W{w}R{r}_{'sloppy' if sloppy else 'strict'}_M{nodes}"
+                      f"_{lat_dist}{lat_ms:g}ms_down{down_prob:g}"
+                      + ("" if hinted_handoff else "_noHH") + ("" if read_repair else "_noRR")
+                      + (f"_ae{ae_interval_ms:g}ms" if ae_interval_ms > 0 else ""))
+
+    # ---------- 링/장애 ----------
+    def _prefs(self, k: int):
+        """키 k 에서 링을 돌며 만나는 서로 다른 노드 전체(앞의 n 개가 원래 복제본, 나머지는 대리 후보 순서)"""
+        prefs = self._prefs_cache.get(k)
+        if prefs is None:
+            token = random.Random(k * 1_000_003 + self.seed).random()
+            start = bisect_right(self._tokens, token)
+            prefs = []
+            for j in range(len(self._owners)):
+                node = self._owners[(start + j) % len(self._owners)]
+                if node not in prefs:
+                    prefs.append(node)
+            self._prefs_cache[k] = prefs
+        return prefs
+
+    def _up(self, node: int, t: float) -> bool:
+        if self.down_prob <= 0:
+            return True
+        epoch = int(t / self.down_s)
+        up = self._down_cache.get((node, epoch))
+        if up is None:
+            rnd = random.Random(hash((self.seed, node, epoch))).random()
+            up = self._down_cache[(node, epoch)] = rnd >= self.down_prob
+        return up
+
+    def _targets(self, k: int, t: float):
+        """시각 t 에 요청을 보낼 (노드, 대신 받아 주는 원래 노드 또는 None) 목록과 죽은 원래 복제본들"""
+        prefs = self._prefs(k)
+        home = prefs[:self.n]
+        targets = [(x, None) for x in home if self._up(x, t)]
+        down = [x for x in home if not self._up(x, t)]
+        if self.sloppy and down:
+            subs = [x for x in prefs[self.n:] if self._up(x, t)]
+            targets += [(s, d) for d, s in zip(down, subs)]
+        return targets, down
+
+    def _hint(self, target: int, k: int, v: int, holder):
+        hints = self._hints.setdefault(target, {})
+        if v > hints.get(k, (0, None))[0]:
+            hints[k] = (v, holder)
+        self.stats["hints_stored"] += 1
+
+    # ---------- 유지 작업(요청이 들어올 때 시각을 보고 처리) ----------
+    def _maintain(self, now: float):
+        if self.hinted_handoff:
+            for target in [t for t in self._hints if self._up(t, now)]:
+                pending = self._hints[target]
+                for k, (v, holder) in list(pending.items()):
+                    if holder is not None and not self._up(holder, now):
+                        continue
+                    self.nodes[target].apply(k, v, now + self._lat())
+                    if holder is not None and self.nodes[holder].hinted.get(k, 0) <= v:
+                        self.nodes[holder].hinted.pop(k, None)
+                    del pending[k]
+                    self.stats["hints_delivered"] += 1
+                if not pending:
+                    del self._hints[target]
+        if self.ae_interval > 0 and now >= self._next_ae:
+            self._anti_entropy(now)
+            self._next_ae = now + self.ae_interval
+
+    def _replica_groups(self):
+        """원래 복제본 묶음 → 그 묶음이 맡는 키들을 머클 잎(버킷)별로 나눈 목록"""
+        if self._groups is None:
+            leaves = 1 << self.merkle_depth
+            groups = {}
+            for k in range(self.keys):
+                buckets = groups.setdefault(tuple(self._prefs(k)[:self.n]), [[] for _ in range(leaves)])
+                buckets[hash((k, self.seed)) % leaves].append(k)
+            self._groups = groups
+        return self._groups
+
+    def _merkle(self, node: int, buckets, now: float):
+        """잎부터 뿌리까지 레벨별 해시 목록(levels[0] 이 잎, levels[-1] 이 뿌리)"""
+        st = self.nodes[node]
+        level = []
+        for keys in buckets:
+            for k in keys:
+                st.fold(k, now)
+            level.append(hash(tuple(st.value(k, now) for k in keys)))
+        levels = [level]
+        while len(level) > 1:
+            level = [hash((level[i], level[i + 1])) for i in range(0, len(level), 2)]
+            levels.append(level)
+        return levels
+
+    def _diff_leaves(self, ta, tb):
+        """뿌리부터 내려가며 해시가 다른 가지만 따라가 다른 잎 번호들을 찾는다"""
+        frontier = [0]
+        for depth in range(len(ta) - 1, -1, -1):
+            nxt = []
+            for i in frontier:
+                self.stats["ae_hash_compares"] += 1
+                if ta[depth][i] != tb[depth][i]:
+                    nxt += [2 * i, 2 * i + 1] if depth else [i]
+            frontier = nxt
+        return frontier
+
+    def _anti_entropy(self, now: float):
+        self.stats["ae_rounds"] += 1
+        for group, buckets in self._replica_groups().items():
+            alive = [x for x in group if self._up(x, now)]
+            if len(alive) < 2:
+                continue
+            a = alive[0]
+            ta = self._merkle(a, buckets, now)
+            for b in alive[1:]:
+                tb = self._merkle(b, buckets, now)
+                for leaf in self._diff_leaves(ta, tb):
+                    for k in buckets[leaf]:
+                        va, vb = self.nodes[a].value(k, now), self.nodes[b].value(k, now)
+                        if va != vb:
+                            lagging = b if va > vb else a
+                            self.nodes[lagging].apply(k, max(va, vb), now + self._lat())
+                            self.stats["ae_keys_repaired"] += 1
+
+    def _unavailable(self, t0: float) -> float:
+        """
+        거절 응답 시각. 거절도 코디네이터 왕복 한 번은 걸린다(안 그러면 장애 구간에 실패 요청만 시간 없이 쏟아짐).
+        호출한 쪽은 락을 놓은 뒤 이 시각까지 기다렸다가 Unavailable 을 던진다
+        """
+        self.stats["unavailable"] += 1
+        return t0 + 2 * self._lat()
+
+    # ---------- Backend ----------
+    def setup(self):
+        pass
+
+    def write(self, k: int, v: int):
+        with self._lock:
+            t0 = self.clock.now()
+            self._maintain(t0)
+            targets, down = self._targets(k, t0)
+            if len(targets) < self.w:
+                done = self._unavailable(t0)
+                failed = f"write k={k}: {len(targets)} of W={self.w} replicas reachable"
+            else:
+                done = self._write_targets(k, v, t0, targets, down)
+                failed = None
+        self.clock.sleep(done - self.clock.now())
+        if failed:
+            raise Unavailable(failed)
+
+    def _write_targets(self, k: int, v: int, t0: float, targets, down) -> float:
+        """닿는 복제본(과 대리 노드)에 쓰고 W 번째 ack 시각을 돌려준다(락 안에서 호출)"""
+        acks = []
+        for node, hint_for in targets:
+            lat = self._lat()
+            if hint_for is None:
+                self.nodes[node].fold(k, t0)
+                self.nodes[node].apply(k, v, t0 + lat)
+            else:
+                # 대리 노드는 힌트와 함께 맡아 둠(sloppy 읽기에서는 이 값도 보임)
+                self.nodes[node].hinted[k] = max(v, self.nodes[node].hinted.get(k, 0))
+                self._hint(hint_for, k, v, node)
+            acks.append(t0 + 2 * lat)
+        if self.hinted_handoff and not self.sloppy:
+            for d in down:
+                self._hint(d, k, v, None)
+        return sorted(acks)[self.w - 1]
+
+    def read(self, k: int) -> int:
+        with self._lock:
+            t0 = self.clock.now()
+            self._maintain(t0)
+            targets, _ = self._targets(k, t0)
+            if len(targets) < self.r:
+                done, seen = self._unavailable(t0), 0
+                failed = f"read k={k}: {len(targets)} of R={self.r} replicas reachable"
+            else:
+                done, seen = self._read_targets(k, t0, targets)
+                failed = None
+        self.clock.sleep(done - self.clock.now())
+        if failed:
+            raise Unavailable(failed)
+        return seen
+
+    def _read_targets(self, k: int, t0: float, targets):
+        """먼저 도착한 R 개 응답의 (응답 시각, 최대 버전). 뒤처진 응답자는 read repair(락 안에서 호출)"""
+        resp = []
+        for node, _ in targets:
+            lat = self._lat()
+            resp.append((t0 + 2 * lat, self.nodes[node].value(k, t0 + lat), node, lat))
+        # 먼저 도착한 r 개의 응답 중 최대 버전
+        first = sorted(resp)[:self.r]
+        done = first[-1][0]
+        seen = max(v for _, v, _, _ in first)
+        if self.read_repair:
+            for _, v, node, lat in first:
+                if v < seen:
+                    self.nodes[node].apply(k, seen, done + lat)
+                    self.stats["read_repairs"] += 1
+        return done, seen
+
+    # ---------- 지연 프로브용 ----------
+    def replicas(self):
+        # 마커 키(keys, 배경 부하 키 범위 밖)의 원래 복제본들
+        return [f"n{i}" for i in self._prefs(self.keys)[:self.n]]
+
+    def read_at(self, replica: str, k: int) -> int:
+        with self._lock:
+            return self.nodes[int(replica[1:])].value(k, self.clock.now())
+
+    def close(self):
+        pass
+
+
+def make_dynamo(args, clock=REAL_CLOCK) -> DynamoSim:
+    """인자로 DynamoSim 을 만든다(run_dynamo 와 지연 프로브가 함께 씀)"""
+    return DynamoSim(
+        nodes=args.nodes,
+        n=args.n,
+        w=args.w,
+        r=args.r,
+        sloppy=args.sloppy == "on",
+        hinted_handoff=args.hinted_handoff == "on",
+        read_repair=args.read_repair == "on",
+        lat_dist=args.lat_dist,
+        lat_ms=args.lat_ms,
+        down_prob=args.down_prob,
+        down_ms=args.down_ms,
+        ae_interval_ms=args.ae_interval_ms,
+        merkle_depth=args.merkle_depth,
+        keys=args.keys,
+        vnodes=args.vnodes,
+        clock=clock,
+        seed=args.seed,
+    )
+
+
+def run_dynamo(args):
+    """Dynamo 계열 리더리스 시뮬레이터(N/W/R, sloppy quorum, hinted handoff, read repair, anti-entropy)로 실행"""
+    clock = VirtualClock() if args.clock == "virtual" else REAL_CLOCK
+    # 정족수를 못 채운 요청은 errors 로 셈
+    return run_backend(make_dynamo(args, clock), args, skip_errors=(Unavailable,), clock=clock)
@@ -1,82 +1,111 @@
-import random
 import time
 
-from meter import Meter
-from pymongo import MongoClient, ReadPreference, WriteConcern
-from pymongo.errors import PyMongoError
+from driver import run_backend
+from pymongo import MongoClient, ReadPreference, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
+from pymongo.uri_parser import parse_uri
+
+
+class MongoBackend:
+    """MongoDB Replica Set에서 리더 기반(ReadPreference, WriteConcern) 조합을 측정하는 백엔드"""
+    # 실행 사이에 컬렉션이 남음 → 드라이버가 남은 버전을 읽어 그 다음부터 발급
+    persistent = True
+
+    def __init__(self, args):
+        self.args = args
+        # 모델명에는 읽기쪽/쓰기 컨선이 드러나게
+        self.model = f"mongo_{args.read_from}_w{args.write_concern}"
+
+    def setup(self):
+        args = self.args
+        # MongoClient 생성(URI에는 replicaSet=rs0 등을 포함)
+        self.client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=8000)
+        # 사용할 데이터베이스 핸들
+        db = self.client[args.db]
+        # 사용할 컬렉션 핸들
+        coll = db[args.coll]
+        # 키(k) 고유 인덱스 생성(없으면 생성, 있으면 그대로 통과)
+        coll.create_index("k", unique=True)
+
+        # 쓰기 컨센서스(1 또는 majority) 설정
+        wc = WriteConcern(w=args.write_concern if args.write_concern != "1" else 1)
+        # 쓰기 옵션이 적용된 컬렉션 핸들
+        self.coll_w = coll.with_options(write_concern=wc)
+
+        # 읽기 선호도(primary 또는 secondary) 설정
+        rp = ReadPreference.PRIMARY if args.read_from == "primary" else ReadPreference.SECONDARY
+        # 읽기 옵션이 적용된 컬렉션 핸들
+        self.coll_r = coll.with_options(read_preference=rp)
+
+    def write(self, k, v):
+        # upsert로 문서 쓰기(없으면 생성, 있으면 v 갱신)
+        # $max: 두 워커의 같은 키 쓰기가 v6 → v5 순으로 도착해도 v 는 거꾸로 가지 않음
+        self.coll_w.update_one({"k": k}, {"$max": {"v": v}, "$set": {"ts": int(time.time() * 1000)}}, upsert=True)
+
+    def read(self, k):
+        # 읽기 수행(프로젝션으로 _id 제외, v만)
+        doc = self.coll_r.find_one({"k": k}, projection={"_id": 0, "v": 1})
+        # 읽어서 본 값(문서 없으면 0으로 취급)
+        return doc["v"] if doc and "v" in doc else 0
+
+    def write_many(self, items):
+        """
+        (k, v) 여러 개를 unordered bulk_write 한 번으로 upsert. 실패한 항목의 인덱스들을 돌려준다.
+        - 한 배치 안에 같은 키가 여러 번 나오면 가장 큰 버전 하나만 보낸다(같은 문서를 두 번 upsert 하지 않게)
+        - ordered=False: 한 건이 실패해도 나머지는 계속 반영
+        """
+        # 키별 최대 버전과, 그 키를 가진 원래 항목 인덱스들
+        latest, owners = {}, {}
+        for i, (k, v) in enumerate(items):
+            latest[k] = max(v, latest.get(k, 0))
+            owners.setdefault(k, []).append(i)
+        keys = list(latest)
+        ts = int(time.time() * 1000)
+        reqs = [UpdateOne({"k": k}, {"$max": {"v": latest[k]}, "$set": {"ts": ts}}, upsert=True) for k in keys]
+        try:
+            self.coll_w.bulk_write(reqs, ordered=False)
+        except BulkWriteError as e:
+            # writeErrors 의 index 는 reqs 기준 → 그 키를 가진 원래 항목 전부를 실패로 본다
+            failed = []
+            for err in e.details.get("writeErrors", []):
+                failed.extend(owners[keys[err["index"]]])
+            # write concern 에러는 특정 문서가 아니라 배치 전체의 내구성 문제
+            if e.details.get("writeConcernErrors"):
+                return list(range(len(items)))
+            return failed
+        return []
+
+    def read_many(self, keys):
+        # $in 한 번으로 여러 키를 읽어 {k: v} 로(문서가 없는 키는 빠짐 → 드라이버가 0으로 취급)
+        cur = self.coll_r.find({"k": {"$in": keys}}, projection={"_id": 0, "k": 1, "v": 1})
+        return {doc["k"]: doc.get("v", 0) for doc in cur}
+
+    # ---------- 지연 프로브용 ----------
+    def replicas(self):
+        """
+        URI 의 시드 주소마다 directConnection 클라이언트를 열어 멤버별로 직접 읽는다.
+        (rs.conf 의 호스트명(mongo1 등)은 도커 밖에서 안 풀릴 수 있어 URI 주소를 그대로 씀)
+        """
+        if not hasattr(self, "direct"):
+            self.direct = {}
+            for host, port in parse_uri(self.args.mongo_uri)["nodelist"]:
+                c = MongoClient(host, port, directConnection=True, serverSelectionTimeoutMS=8000)
+                role = "primary" if c.admin.command("hello").get("isWritablePrimary") else "secondary"
+                self.direct[f"{role}@{host}:{port}"] = c[self.args.db][self.args.coll]
+        return list(self.direct)
+
+    def read_at(self, replica, k):
+        doc = self.direct[replica].find_one({"k": k}, projection={"_id": 0, "v": 1})
+        return doc["v"] if doc and "v" in doc else 0
+
+    def close(self):
+        for coll in getattr(self, "direct", {}).values():
+            coll.database.client.close()
+        self.client.close()
+
 
 def run_mongo(args):
     """MongoDB Replica Set에서 리더 기반(ReadPreference, WriteConcern) 조합을 측정"""
-
-    # MongoClient 생성(URI에는 replicaSet=rs0 등을 포함)
-    client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=8000)
-    # 사용할 데이터베이스 핸들
-    db = client[args.db]
-    # 사용할 컬렉션 핸들
-    coll = db[args.coll]
-    # 키(k) 고유 인덱스 생성(없으면 생성, 있으면 그대로 통과)
-    coll.create_index("k", unique=True)
-
-    # 쓰기 컨센서스(1 또는 majority) 설정
-    wc = WriteConcern(w=args.write_concern if args.write_concern != "1" else 1)
-    # 쓰기 옵션이 적용된 컬렉션 핸들
-    coll_w = coll.with_options(write_concern=wc)
-
-    # 읽기 선호도(primary 또는 secondary) 설정
-    rp = ReadPreference.PRIMARY if args.read_from == "primary" else ReadPreference.SECONDARY
-    # 읽기 옵션이 적용된 컬렉션 핸들
-    coll_r = coll.with_options(read_preference=rp)
-
-    # 메트릭 집계기 생성
-    meter = Meter()
-    # 재현 가능한 난수 시드(테스트 재실행 시 동작 패턴 비슷하게)
-    rng = random.Random(42)
-
-    # 총 연산 수(ops)만큼 루프
-    for _ in range(args.ops):
-        # 쓰기/읽기 여부를 write_ratio에 따라 결정
-        is_write = rng.random() < args.write_ratio
-        # 접근할 키를 0..keys-1 범위에서 선택
-        k = rng.randrange(args.keys)
-
-        if is_write:
-            # 이 키의 현재 버전을 last_written에서 불러오고 +1 증가
-            v = meter.last_written.get(k, 0) + 1
-            # 지연 측정 시작 시각
-            t0 = time.perf_counter()
-            try:
-                # upsert로 문서 쓰기(없으면 생성, 있으면 v 갱신)
-                coll_w.update_one({"k": k}, {"$set": {"v": v, "ts": int(time.time() * 1000)}}, upsert=True)
-            except PyMongoError:
-                # 에러가 나면 해당 연산은 건너뜀(벤치 계속 진행)
-                continue
-            # (현재시각 - 시작시각)*1000 → 밀리초 지연 기록
-            meter.write_lat.append((time.perf_counter() - t0) * 1000)
-            # 쓰기 카운트 증가
-            meter.writes += 1
-            # 이 키의 마지막 쓴 버전을 기록
-            meter.last_written[k] = v
-        else:
-            # 읽기 지연 측정 시작
-            t0 = time.perf_counter()
-            # 읽기 수행(프로젝션으로 _id 제외, v만)
-            doc = coll_r.find_one({"k": k}, projection={"_id": 0, "v": 1})
-            # 읽기 지연 기록
-            meter.read_lat.append((time.perf_counter() - t0) * 1000)
-            # 읽기 카운트 증가
-            meter.reads += 1
-            # 읽어서 본 값(문서 없으면 0으로 취급)
-            seen_v = doc["v"] if doc and "v" in doc else 0
-
-            # 내가 아는 "마지막 쓴 값"(최신)보다 작으면 stale로 간주
-            latest_known = meter.last_written.get(k, 0)
-            if seen_v < latest_known:
-                meter.stale += 1
-                # 최신이 존재하는데 못 봤으면 RYW 위반으로 처리
-                if latest_known:
-                    meter.ryw_violation += 1
-            # 단조 읽기 체크를 위해 last_seen 갱신(여기서는 통계만 사용)
-            meter.last_seen[k] = max(meter.last_seen.get(k, 0), seen_v)
-
-    # 결과 딕셔너리 반환(모델명에는 읽기쪽/쓰기 컨선이 드러나게)
-    return meter.report(model=f"mongo_{args.read_from}_w{args.write_concern}")
\ No newline at end of file
+    # 연산 목록을 --concurrency 워커(또는 --rate 오픈 루프)로 실행, 에러 난 연산은 건너뛰고 errors 로 셈
+    # --batch-size B 면 B개씩 bulk_write / $in 조회로 묶어 보냄
+    return run_backend(MongoBackend(args), args, skip_errors=(PyMongoError,))
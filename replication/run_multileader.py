@@ -0,0 +1,282 @@
+import heapq
+import random
+import threading
+import time
+
+from driver import REAL_CLOCK, VirtualClock, run_backend
+from run_sim import lag_sampler
+
+RESOLVERS = ["lww", "couch", "mv-register", "pn-counter"]
+
+
+def vv_compare(a: dict, b: dict) -> str:
+    """버전 벡터 비교: "eq" / "lt"(a 가 b 이전) / "gt" / "concurrent" """
+    lt = gt = False
+    for node in a.keys() | b.keys():
+        x, y = a.get(node, 0), b.get(node, 0)
+        if x < y:
+            lt = True
+        elif x > y:
+            gt = True
+        if lt and gt:
+            return "concurrent"
+    if lt:
+        return "lt"
+    return "gt" if gt else "eq"
+
+
+def vv_join(vvs) -> dict:
+    out = {}
+    for vv in vvs:
+        for node, c in vv.items():
+            if c > out.get(node, 0):
+                out[node] = c
+    return out
+
+
+class Version:
+    """
+    키 하나의 형제(sibling) 버전.
+    - vv: 버전 벡터(리더 → 그 리더에서 일어난 쓰기 수)
+    - value: 클라이언트가 쓴 버전 번호(pn-counter 에서는 쓰이지 않음)
+    - ts: 쓴 리더의 (시계 오차가 섞인) 타임스탬프, origin: 쓴 리더
+    - counts: pn-counter 의 리더별 증가량
+    """
+    __slots__ = ("vv", "value", "ts", "origin", "counts")
+
+    def __init__(self, vv, value, ts, origin, counts=None):
+        self.vv = vv
+        self.value = value
+        self.ts = ts
+        self.origin = origin
+        self.counts = counts
+
+
+class MultiLeaderSim:
+    """
+    다중 리더 복제 시뮬레이터.
+    - 리더 leaders 개가 각자 쓰기를 받고, 변경은 리더별 change feed 에 쌓였다가
+      feed_interval_ms 마다 최대 feed_batch 건씩 묶여 다른 리더에 link_lag_ms(분포 link_lag_dist) 뒤 도착
+    - 인과 관계는 버전 벡터로 추적: 도착한 변경이 로컬 형제들보다 이전이면 버림, 이후면 교체, 동시(concurrent)면 충돌
+    - 충돌 해소(resolver)
+      - lww: 타임스탬프(리더별 시계 오차 clock_skew_ms 포함)가 큰 쪽만 남김 → 나머지는 lost_writes
+      - couch: 편집 깊이(버전 벡터 합)가 크고, 같으면 해시가 큰 쪽이 결정적 승자. 진 쪽은 형제로 남아 _conflicts 처럼 보존
+      - mv-register: 동시 값들을 모두 형제로 보존하고 읽을 때 최댓값(애플리케이션 병합)
+      - pn-counter: 리더별 증가량의 원소별 최댓값으로 병합(CRDT, 잃는 쓰기 없음). 읽은 값 = 합 = 반영된 쓰기 수
+    - 측정이 끝나면(close) 남은 feed 를 모두 흘려 보내 모든 리더가 같아질 때까지의 시뮬레이션 시간을 convergence_ms 로 보고
+    """
+    def __init__(self, leaders: int = 2, resolver: str = "lww", write_to: str = "any", read_from: str = "0",
+                 feed_interval_ms: float = 10.0, feed_batch: int = 100, link_lag_dist: str = "exp",
+                 link_lag_ms: float = 5.0, clock_skew_ms: float = 0.0, rtt_ms: float = 0.5,
+                 clock=REAL_CLOCK, seed: int = 42):
+        if resolver not in RESOLVERS:
+            raise ValueError(f"unknown resolver: {resolver}")
+        self.n = leaders
+        self.resolver = resolver
+        self.write_to = write_to
+        self.read_from = read_from
+        self.interval = feed_interval_ms / 1000.0
+        self.feed_batch = feed_batch
+        self.rtt = rtt_ms / 1000.0
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self._lag = lag_sampler(link_lag_dist, link_lag_ms, self.rng)
+        # 리더별 시계 오차(초)
+        self.skew = [self.rng.uniform(-clock_skew_ms, clock_skew_ms) / 1000.0 for _ in range(leaders)]
+        self._lock = threading.Lock()
+        # 리더별 {k: [Version...]}
+        self.stores = [dict() for _ in range(leaders)]
+        # 리더별 아직 내보내지 않은 변경 [(k, Version)]
+        self.outbox = [[] for _ in range(leaders)]
+        # 도착 예정 배치 힙 (도착 시각, 순번, 받는 리더, [(k, Version)])
+        self._inbox = []
+        self._seq = 0
+        self._next_tick = clock.now() + self.interval
+        self._merge_ns = 0
+        self.stats = {
+            "batches_shipped": 0, "changes_shipped": 0, "changes_applied": 0, "obsolete": 0,
+            "conflicts": 0, "lost_writes": 0,
+        }
+        self.model = f"multileader_{resolver}_L{leaders}_feed{feed_interval_ms:g}ms_lag{link_lag_ms:g}ms"
+        if clock_skew_ms:
+            self.model += f"_skew{clock_skew_ms:g}ms"
+
+    # ---------- 복제(change feed) ----------
+    def _ship(self, t: float):
+        """시각 t 의 feed 틱: 리더마다 쌓인 변경을 최대 feed_batch 건 묶어 다른 리더들로 보냄"""
+        for src in range(self.n):
+            batch = self.outbox[src][:self.feed_batch]
+            if not batch:
+                continue
+            del self.outbox[src][:self.feed_batch]
+            self.stats["batches_shipped"] += 1
+            self.stats["changes_shipped"] += len(batch)
+            for dst in range(self.n):
+                if dst != src:
+                    self._seq += 1
+                    heapq.heappush(self._inbox, (t + self._lag(), self._seq, dst, batch))
+
+    def _advance(self, now: float):
+        """now 까지의 feed 틱과 배치 도착을 시각 순으로 처리"""
+        while True:
+            next_arrival = self._inbox[0][0] if self._inbox else float("inf")
+            if self._next_tick <= now and self._next_tick <= next_arrival:
+                self._ship(self._next_tick)
+                self._next_tick += self.interval
+            elif next_arrival <= now:
+                _, _, dst, batch = heapq.heappop(self._inbox)
+                t0 = time.perf_counter_ns()
+                for k, ver in batch:
+                    self._apply_remote(dst, k, ver)
+                self._merge_ns += time.perf_counter_ns() - t0
+            else:
+                return
+
+    def _apply_remote(self, node: int, k: int, inc: Version):
+        store = self.stores[node]
+        sibs = store.get(k)
+        self.stats["changes_applied"] += 1
+        if not sibs:
+            store[k] = [inc]
+            return
+        # 이미 같거나 더 새로운 형제가 있으면 버림
+        if any(vv_compare(inc.vv, s.vv) in ("lt", "eq") for s in sibs):
+            self.stats["obsolete"] += 1
+            return
+        # 도착한 변경보다 이전인 형제는 대체되고, 남는 형제가 있으면 동시 쓰기 → 충돌
+        keep = [s for s in sibs if vv_compare(s.vv, inc.vv) != "lt"]
+        if not keep:
+            store[k] = [inc]
+            return
+        self.stats["conflicts"] += 1
+        store[k] = self._resolve(keep + [inc])
+
+    def _resolve(self, sibs):
+        if self.resolver == "lww":
+            winner = max(sibs, key=lambda s: (s.ts, s.origin))
+            # 승자의 벡터는 모두를 합친 것(같은 충돌이 다른 리더에서 다시 나지 않게)
+            self.stats["lost_writes"] += len(sibs) - 1
+            return [Version(vv_join(s.vv for s in sibs), winner.value, winner.ts, winner.origin)]
+        if self.resolver == "couch":
+            # 편집 깊이 → 해시 순으로 결정적 승자를 맨 앞에, 진 쪽은 형제로 보존
+            return sorted(sibs, key=lambda s: (sum(s.vv.values()), hash(tuple(sorted(s.vv.items())))), reverse=True)
+        if self.resolver == "mv-register":
+            return sibs
+        # pn-counter: 리더별 증가량 원소별 최댓값
+        counts = vv_join(s.counts for s in sibs)
+        return [Version(vv_join(s.vv for s in sibs), 0, 0.0, -1, counts)]
+
+    @property
+    def conflicts(self) -> int:
+        """복제 중 감지한 동시 쓰기 수(보고서 conflicts 열)"""
+        return self.stats["conflicts"]
+
+    # ---------- 읽기 값 ----------
+    def _value(self, sibs) -> int:
+        if not sibs:
+            return 0
+        if self.resolver == "pn-counter":
+            return sum(sibs[0].counts.values())
+        if self.resolver == "mv-register":
+            return max(s.value for s in sibs)
+        # lww 는 형제가 하나, couch 는 맨 앞이 승자
+        return sibs[0].value
+
+    def _pick(self, spec: str) -> int:
+        return self.rng.randrange(self.n) if spec == "any" else int(spec)
+
+    # ---------- Backend ----------
+    def setup(self):
+        pass
+
+    def write(self, k: int, v: int):
+        self._write_at(self._pick(self.write_to), k, v)
+
+    def _write_at(self, node: int, k: int, v: int):
+        """리더 node 에 쓴다(write 와 지연 프로브 마커가 함께 씀)"""
+        with self._lock:
+            t0 = self.clock.now()
+            t = t0 + self.rtt / 2
+            self._advance(t)
+            sibs = self.stores[node].get(k, [])
+            # 로컬 형제를 모두 본 뒤의 쓰기 → 형제 벡터를 합치고 자기 칸을 올림
+            vv = vv_join(s.vv for s in sibs)
+            vv[node] = vv.get(node, 0) + 1
+            counts = None
+            if self.resolver == "pn-counter":
+                counts = dict(sibs[0].counts) if sibs else {}
+                counts[node] = counts.get(node, 0) + 1
+            # 같은 리더에 v6 이 v5 보다 먼저 도착했으면 v6 을 유지(리더 안에서는 버전 기준 max 반영)
+            ver = Version(vv, max(v, self._value(sibs)) if counts is None else v, t + self.skew[node], node, counts)
+            self.stores[node][k] = [ver]
+            self.outbox[node].append((k, ver))
+        self.clock.sleep(t0 + self.rtt - self.clock.now())
+
+    def read(self, k: int) -> int:
+        node = self._pick(self.read_from)
+        with self._lock:
+            t0 = self.clock.now()
+            self._advance(t0 + self.rtt / 2)
+            seen = self._value(self.stores[node].get(k))
+        self.clock.sleep(t0 + self.rtt - self.clock.now())
+        return seen
+
+    def _diverged(self) -> int:
+        """리더끼리 읽기 값이 다른 키 수"""
+        keys = set().union(*self.stores)
+        return sum(len({self._value(st.get(k)) for st in self.stores}) > 1 for k in keys)
+
+    def close(self):
+        """남은 feed 를 시뮬레이션 시간으로 흘려 보내며 모든 리더가 같아질 때까지의 시간을 잰다"""
+        with self._lock:
+            t_end = self.clock.now()
+            self._advance(t_end)
+            self.stats["divergent_keys_at_end"] = self._diverged()
+            t = t_end
+            while any(self.outbox) or self._inbox:
+                t = min(self._next_tick, self._inbox[0][0] if self._inbox else float("inf"))
+                self._advance(t)
+            self.stats["convergence_ms"] = round((t - t_end) * 1000, 3)
+            self.stats["divergent_keys_after_drain"] = self._diverged()
+            applied = self.stats["changes_applied"]
+            self.stats["conflict_rate"] = round(self.stats["conflicts"] / applied, 4) if applied else 0.0
+            self.stats["merge_us_per_change"] = round(self._merge_ns / 1000 / applied, 3) if applied else 0.0
+            self.stats["siblings_after_drain"] = sum(len(s) for st in self.stores for s in st.values())
+
+    # ---------- 지연 프로브용 ----------
+    def replicas(self):
+        return [f"leader{i}" for i in range(self.n)]
+
+    def write_marker(self, k: int, v: int):
+        # 마커는 항상 0번 리더에 쓴다
+        self._write_at(0, k, v)
+
+    def read_at(self, replica: str, k: int) -> int:
+        with self._lock:
+            now = self.clock.now()
+            self._advance(now)
+            return self._value(self.stores[int(replica[len("leader"):])].get(k))
+
+
+def make_multileader(args, clock=REAL_CLOCK) -> MultiLeaderSim:
+    """인자로 MultiLeaderSim 을 만든다(run_multileader 와 지연 프로브가 함께 씀)"""
+    return MultiLeaderSim(
+        leaders=args.leaders,
+        resolver=args.resolver,
+        write_to=args.write_to,
+        read_from=args.read_from,
+        feed_interval_ms=args.feed_interval_ms,
+        feed_batch=args.feed_batch,
+        link_lag_dist=args.link_lag_dist,
+        link_lag_ms=args.link_lag_ms,
+        clock_skew_ms=args.clock_skew_ms,
+        rtt_ms=args.rtt_ms,
+        clock=clock,
+        seed=args.seed,
+    )
+
+
+def run_multileader(args):
+    """다중 리더 + 버전 벡터 + 충돌 해소 전략별로 실행(충돌률/병합 비용/수렴 시간은 backend_stats)"""
+    clock = VirtualClock() if args.clock == "virtual" else REAL_CLOCK
+    return run_backend(make_multileader(args, clock), args, clock=clock)
@@ -0,0 +1,161 @@
+import math
+import random
+import threading
+from bisect import bisect_right
+
+from driver import REAL_CLOCK, VirtualClock, run_backend
+
+
+def lag_sampler(dist: str, mean_ms: float, rng: random.Random):
+    """평균 mean_ms 인 복제 지연(초)을 뽑는 함수"""
+    mean = mean_ms / 1000.0
+    if mean <= 0 or dist == "const":
+        return lambda: mean
+    if dist == "uniform":
+        return lambda: rng.uniform(0, 2 * mean)
+    if dist == "exp":
+        return lambda: rng.expovariate(1 / mean)
+    if dist == "lognormal":
+        # sigma=1 일 때 평균이 mean 이 되도록 mu 를 맞춤(긴 꼬리)
+        mu = math.log(mean) - 0.5
+        return lambda: rng.lognormvariate(mu, 1.0)
+    raise ValueError(f"unknown lag distribution: {dist}")
+
+
+class SimReplicaSet:
+    """
+    프로세스 안에서 도는 리더/팔로워 복제 시뮬레이터(Docker 없이 벤치 파이프라인 전체를 돌리기 위한 백엔드).
+    - 쓰기는 리더에 도착한 시각 t 에 반영되고, 팔로워 i 에는 t + lag_i 에 반영된다
+      (팔로워는 복제 로그를 순서대로 적용하므로 반영 시각은 팔로워마다 단조 증가)
+    - write_concern: "1"(리더만) / "majority"(리더 포함 과반) / "all" 이 반영될 때까지 쓰기 응답을 늦춘다
+    - read_from: "primary"(리더) / "secondary"(임의의 팔로워) / "nearest"(임의의 노드)
+    - 키마다 노드별로 (반영 시각, 버전) 이력을 두고, 읽기 시각 기준으로 이미 반영된 마지막 버전을 돌려준다
+    """
+    def __init__(self, followers: int = 2, lag_dist: str = "exp", lag_ms: float = 5.0, rtt_ms: float = 0.5,
+                 write_concern: str = "1", read_from: str = "secondary", clock=REAL_CLOCK, seed: int = 42):
+        self.n = followers + 1
+        self.write_concern = write_concern
+        self.read_from = read_from
+        self.rtt = rtt_ms / 1000.0
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self._lag = lag_sampler(lag_dist, lag_ms, self.rng)
+        self._lock = threading.Lock()
+        # 노드별 {k: ([반영 시각...], [버전...])}, 0번이 리더
+        self._history = [dict() for _ in range(self.n)]
+        # 팔로워별 마지막 반영 시각(복제 로그 순서 유지)
+        self._tail = [0.0] * self.n
+        self.model = f"sim_{read_from}_w{write_concern}_{lag_dist}{lag_ms:g}ms_F{followers}"
+
+    def _acks_needed(self) -> int:
+        # 리더 말고 몇 개의 팔로워가 반영해야 응답하는지
+        if self.write_concern == "majority":
+            return self.n // 2
+        if self.write_concern == "all":
+            return self.n - 1
+        return 0
+
+    def _append(self, node: int, k: int, at: float, v: int, now: float):
+        times, versions = self._history[node].setdefault(k, ([], []))
+        times.append(at)
+        # 버전이 큰 쓰기가 먼저 도착했으면 늦게 온 작은 버전은 덮어쓰지 않음(버전 기준 max 반영)
+        versions.append(max(v, versions[-1]) if versions else v)
+        # 이미 지난 반영 이력은 마지막 하나만 남기고 버림(메모리 고정)
+        i = bisect_right(times, now) - 1
+        if i > 0:
+            del times[:i]
+            del versions[:i]
+
+    def setup(self):
+        pass
+
+    def _apply(self, k: int, v: int, t: float, now: float) -> float:
+        """리더 도착 시각 t 의 쓰기를 모든 노드 이력에 넣고, write concern 이 충족되는 시각을 돌려준다"""
+        self._append(0, k, t, v, now)
+        acks = []
+        for i in range(1, self.n):
+            at = max(self._tail[i], t + self._lag())
+            self._tail[i] = at
+            self._append(i, k, at, v, now)
+            acks.append(at)
+        need = self._acks_needed()
+        return sorted(acks)[need - 1] if need else t
+
+    def write(self, k: int, v: int):
+        self.write_batch([(k, v)])
+
+    def write_batch(self, items):
+        """(k, v) 여러 개를 한 번의 왕복으로 쓴다(응답은 가장 늦게 충족된 쓰기 기준)"""
+        with self._lock:
+            # 이력이 시각 순으로 쌓이도록 시각도 락 안에서 잡는다
+            t0 = self.clock.now()
+            # 리더 도착 시각(왕복의 절반)
+            t = t0 + self.rtt / 2
+            done = max(self._apply(k, v, t, t0) for k, v in items)
+        # write concern 을 만족한 뒤 응답이 돌아오는 시각까지 대기
+        self.clock.sleep(done + self.rtt / 2 - self.clock.now())
+
+    def write_many(self, items):
+        # bulk 쓰기는 실패가 없으므로 실패 인덱스는 항상 비어 있음
+        self.write_batch(items)
+        return []
+
+    def _pick_node(self) -> int:
+        if self.read_from == "primary":
+            return 0
+        if self.read_from == "secondary" and self.n > 1:
+            return self.rng.randrange(1, self.n)
+        return self.rng.randrange(self.n)
+
+    def _seen(self, node: int, k: int, t: float) -> int:
+        # 노드 도착 시각 t 기준으로 이미 반영된 마지막 버전
+        times, versions = self._history[node].get(k, ((), ()))
+        i = bisect_right(times, t) - 1
+        return versions[i] if i >= 0 else 0
+
+    def read(self, k: int) -> int:
+        return self.read_many([k]).get(k, 0)
+
+    def read_many(self, keys, node=None) -> dict:
+        """여러 키를 한 노드에서 한 번의 왕복으로 읽는다({k: 본 버전})"""
+        if node is None:
+            node = self._pick_node()
+        with self._lock:
+            # 쓰기와 같이 시각을 락 안에서 잡는다(락을 기다리는 사이 다른 쓰기가 이 시각 이전 이력을 정리할 수 있음)
+            t0 = self.clock.now()
+            t = t0 + self.rtt / 2
+            seen = {k: self._seen(node, k, t) for k in keys}
+        self.clock.sleep(t0 + self.rtt - self.clock.now())
+        return seen
+
+    # ---------- 지연 프로브용 ----------
+    def replicas(self):
+        return ["leader"] + [f"follower{i}" for i in range(1, self.n)]
+
+    def read_at(self, replica: str, k: int) -> int:
+        node = 0 if replica == "leader" else int(replica[len("follower"):])
+        return self.read_many([k], node=node).get(k, 0)
+
+    def close(self):
+        pass
+
+
+def make_sim(args, clock=REAL_CLOCK) -> SimReplicaSet:
+    """인자로 SimReplicaSet 을 만든다(run_sim 과 지연 프로브가 함께 씀)"""
+    return SimReplicaSet(
+        followers=args.followers,
+        lag_dist=args.lag_dist,
+        lag_ms=args.lag_ms,
+        rtt_ms=args.rtt_ms,
+        write_concern=args.write_concern,
+        read_from=args.read_from,
+        clock=clock,
+        seed=args.seed,
+    )
+
+
+def run_sim(args):
+    """Docker 없이 프로세스 안 복제 시뮬레이터로 같은 벤치 파이프라인을 실행"""
+    clock = VirtualClock() if args.clock == "virtual" else REAL_CLOCK
+    backend = make_sim(args, clock)
+    return run_backend(backend, args, clock=clock)
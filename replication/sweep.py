@@ -0,0 +1,143 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+from bench import build_parser, run
+
+# 반복 실행 결과 CSV 에서 셀/반복/구간 열 뒤에 붙는 지표 열
+METRICS = [
+    "model",
+    "reads",
+    "writes",
+    "ops",
+    "ops_per_s",
+    "avg_read_ms",
+    "p99_read_ms",
+    "avg_write_ms",
+    "p99_write_ms",
+    "stale_read_rate",
+    "ryw_violation_rate",
+    "monotonic_read_violation_rate",
+    "prefix_violation_rate",
+    "wfr_violation_rate",
+    "conflicts",
+    "errors",
+    "preload_s",
+    "preload_keys_per_s",
+    "p50_ms",
+    "p99_ms",
+]
+
+# 반복 평균을 낼 지표
+AVERAGED = ["ops_per_s", "avg_read_ms", "p99_read_ms", "avg_write_ms", "p99_write_ms",
+            "stale_read_rate", "ryw_violation_rate", "monotonic_read_violation_rate", "prefix_violation_rate",
+            "wfr_violation_rate"]
+
+
+def parse_grid(specs):
+    """["write-cl=ONE,QUORUM", ...] → [("--write-cl", ["ONE", "QUORUM"]), ...]"""
+    grid = []
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        if not values:
+            raise SystemExit(f"sweep: bad --grid '{spec}' (expected name=v1,v2,...)")
+        flag = "--" + name.lstrip("-").replace("_", "-")
+        grid.append((flag, values.split(",")))
+    return grid
+
+
+def cell_argv(base_argv, cell):
+    """기본 인자 뒤에 셀의 옵션을 덧붙임(argparse 는 나중 값이 이긴다)"""
+    argv = list(base_argv)
+    for flag, value in cell:
+        argv += [flag, value]
+    return argv
+
+
+def window_rows(res):
+    """보고서의 초 단위 구간을 CSV 행으로(처리량은 구간의 실제 길이로 나눠 짧은 마지막 구간도 같은 단위로)"""
+    for w in res.get("windows", []):
+        s = w.get("s") or 1.0
+        yield {"window": w["t"], "ops": w["ops"], "ops_per_s": round(w["ops"] / s, 1),
+               "p50_ms": w["p50_ms"], "p99_ms": w["p99_ms"]}
+
+
+def sweep(base_argv, grid, repeat, warmup_ops, pause_s, log=sys.stderr):
+    """
+    grid 의 모든 조합(셀)마다 같은 설정으로 repeat 번 측정해 보고서를 모은다.
+    warmup_ops > 0 이면 측정 실행마다 --warmup-ops 로 넘겨, 같은 연결 안에서 측정 직전에 예열한다
+    (따로 한 번 돌려 버리는 실행은 연결/캐시가 측정 실행으로 이어지지 않음, 0이면 bench 인자 그대로)
+    """
+    parser = build_parser()
+    names = [flag.lstrip("-") for flag, _ in grid]
+    cells = []
+    for values in itertools.product(*(vals for _, vals in grid)):
+        cell = list(zip((flag for flag, _ in grid), values))
+        argv = cell_argv(base_argv, cell)
+        if warmup_ops > 0:
+            argv += ["--warmup-ops", str(warmup_ops)]
+        params = dict(zip(names, values))
+        runs = []
+        for rep in range(repeat):
+            res = run(parser.parse_args(argv), parser)
+            runs.append(res)
+            print(f"{params} rep={rep} ops/s={res.get('ops_per_s')} stale={res.get('stale_read_rate')}", file=log)
+            if pause_s:
+                time.sleep(pause_s)
+        summary = {m: round(sum(r.get(m, 0) for r in runs) / len(runs), 4) for m in AVERAGED}
+        cells.append({"params": params, "runs": runs, "mean": summary})
+    return names, cells
+
+
+def write_csv(path, names, cells):
+    """셀 × 반복 × (전체 + 초 단위 구간) 을 한 CSV 로. window 열이 'all' 이면 전체 합계 행"""
+    with open(path, "w", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=names + ["rep", "window"] + METRICS, extrasaction="ignore")
+        w.writeheader()
+        for cell in cells:
+            for rep, res in enumerate(cell["runs"]):
+                base = dict(cell["params"], rep=rep, model=res.get("model"))
+                total = dict(res, ops=res.get("reads", 0) + res.get("writes", 0))
+                w.writerow(dict(base, window="all", **{m: total.get(m, "") for m in METRICS if m != "model"}))
+                for row in window_rows(res):
+                    w.writerow(dict(base, **row))
+
+
+def main():
+    """
+    bench.py 의 한 모드를 파라미터 격자로 돌린다. '--' 뒤는 bench.py 에 그대로 넘길 기본 인자.
+    ex) python sweep.py --grid write-cl=ONE,QUORUM,ALL --grid read-cl=ONE,QUORUM --repeat 3 \\
+            --out cl_sweep -- cassandra --stub --ops 5000
+    """
+    argv = sys.argv[1:]
+    if "--" not in argv:
+        raise SystemExit("usage: sweep.py [options] -- <bench.py mode and options>")
+    cut = argv.index("--")
+    p = argparse.ArgumentParser(description="bench.py 파라미터 격자 실행")
+    # name=v1,v2,... (bench.py 의 옵션 이름, 여러 번 지정하면 곱집합)
+    p.add_argument("--grid", action="append", default=[], required=True)
+    # 셀마다 측정 반복 횟수
+    p.add_argument("--repeat", type=int, default=3)
+    # 측정 실행마다 bench 의 --warmup-ops 로 넘길 예열 연산 수(0이면 bench 인자에 맡김)
+    p.add_argument("--warmup-ops", type=int, default=500)
+    # 실행 사이 휴지 시간(초, 복제/컴팩션이 가라앉게)
+    p.add_argument("--pause-s", type=float, default=0.0)
+    # 결과 파일 접두어 → <out>.json, <out>.csv
+    p.add_argument("--out", default="sweep")
+    opts = p.parse_args(argv[:cut])
+
+    names, cells = sweep(argv[cut + 1:], parse_grid(opts.grid), opts.repeat, opts.warmup_ops, opts.pause_s)
+    with open(f"{opts.out}.json", "w") as f:
+        json.dump({"base_argv": argv[cut + 1:], "grid": names, "cells": cells}, f, indent=2)
+    write_csv(f"{opts.out}.csv", names, cells)
+    # 셀별 반복 평균을 표준출력에 요약
+    print(",".join(names + AVERAGED))
+    for cell in cells:
+        print(",".join([str(cell["params"][n]) for n in names] + [str(cell["mean"][m]) for m in AVERAGED]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 from .sqlite_transfer import sqlite_transfer
 from .naive_kv_transfer import naive_kv_transfer
-from .single_doc_transfer import single_document_transfer
\ No newline at end of file
+from .single_doc_transfer import single_document_transfer
+from .sharded_doc_store import sharded_document_transfer
\ No newline at end of file
@@ -0,0 +1,650 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .naive_kv_transfer import LockedKVStore
+from .sharded_doc_store import ShardedDocumentStore, TxnConflict
+from .single_doc_transfer import SingleDocumentStore, UpdateConflict
+from .sqlite_engine import SQLiteTransferEngine, WriterQueue, _is_busy, open_reader
+
+
+class _CopyingDocumentStore:
+    """
+    비교용 기준선: 업데이트마다 문서를 통째로 얕은 복사(doc.copy())한 뒤 교체하는 방식.
+    - 비용이 문서 크기 O(n)에 비례한다.
+    """
+    def __init__(self, doc: dict):
+        self.doc = doc
+        self._lock = threading.Lock()
+
+    def atomic_update(self, transform):
+        with self._lock:
+            new_doc = transform(self.doc.copy())
+            self.doc = new_doc
+
+
+DOC_STORES = {"copy": _CopyingDocumentStore, "persistent": SingleDocumentStore}
+
+
+def _transfer(src: str, dst: str, amount: int):
+    # 한 문서 안의 두 필드를 고치는 송금 transform
+    def transform(doc):
+        doc[src] -= amount
+        doc[dst] += amount
+        return doc
+    return transform
+
+
+def _run_docsize_workload(store_name: str, size: int, args):
+    """
+    계좌 size 개를 한 문서에 담고 임의의 두 계좌 사이 송금을 반복한다.
+    - 업데이트 한 번이 고치는 필드는 2개로 고정 → 문서 크기에 따른 비용 차이만 드러난다.
+    """
+    rng = random.Random(args.seed)
+    keys = [f"acct{i}" for i in range(size)]
+    store = DOC_STORES[store_name]({k: args.initial for k in keys})
+
+    t0 = time.perf_counter()
+    for _ in range(args.updates):
+        src, dst = rng.sample(keys, 2)
+        store.atomic_update(_transfer(src, dst, 1))
+    elapsed = time.perf_counter() - t0
+
+    doc = store.doc
+    total = sum(v for _, v in doc.items())
+    return {
+        "store": store_name,
+        "doc_size": size,
+        "updates": args.updates,
+        "updates_per_s": round(args.updates / elapsed, 1) if elapsed else 0.0,
+        "avg_update_us": round(elapsed / args.updates * 1e6, 2),
+        "balance_conserved": total == size * args.initial,
+    }
+
+
+def bench_docsize(args):
+    """문서 크기별 업데이트 처리량: 통째 복사 vs 불변 맵(path copying)"""
+    return [
+        _run_docsize_workload(s, n, args)
+        for n in args.sizes
+        for s in args.stores
+    ]
+
+
+def _pct(sorted_samples, q: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(q * len(sorted_samples)))]
+
+
+def _run_contention_workload(mode: str, threads: int, args):
+    """
+    쓰기 스레드 threads 개가 한 문서에 송금을 동시에 반영하고, 읽기 스레드가 옆에서 계속 읽는다.
+    - transform 안에서 work_us 만큼 머문다(느린 transform 흉내)
+    - locked: transform 동안 락을 쥐고 있으므로 쓰기끼리, 그리고 읽기도 그 뒤에서 대기
+    - optimistic: transform 은 병렬로 돌고 CAS 에서 진 쪽만 재시도, 읽기는 락 없이 스냅샷을 읽음
+    """
+    keys = [f"acct{i}" for i in range(args.accounts)]
+    store = SingleDocumentStore({k: args.initial for k in keys}, mode=mode)
+    work = args.work_us / 1e6
+    counts = {"failed": 0}
+    counter_lock = threading.Lock()
+    read_lat = []
+    done = threading.Event()
+
+    def transfer(src, dst):
+        def transform(doc):
+            doc[src] -= 1
+            doc[dst] += 1
+            if work:
+                time.sleep(work)
+            return doc
+        return transform
+
+    def writer(wid: int):
+        rng = random.Random(args.seed + wid)
+        for _ in range(args.updates_per_thread):
+            src, dst = rng.sample(keys, 2)
+            try:
+                store.atomic_update(transfer(src, dst))
+            except UpdateConflict:
+                with counter_lock:
+                    counts["failed"] += 1
+
+    def reader(rid: int):
+        rng = random.Random(args.seed - rid - 1)
+        lat = []
+        while not done.is_set():
+            t = time.perf_counter()
+            store.read(rng.choice(keys))
+            lat.append(time.perf_counter() - t)
+            # 읽기 루프가 GIL 을 독점하지 않도록 잠깐 쉰다
+            time.sleep(args.read_interval_us / 1e6)
+        with counter_lock:
+            read_lat.extend(lat)
+
+    writers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    readers = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    for th in readers:
+        th.start()
+    t0 = time.perf_counter()
+    for th in writers:
+        th.start()
+    for th in writers:
+        th.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    for th in readers:
+        th.join()
+
+    read_lat.sort()
+    commits = store.stats["commits"]
+    total = sum(v for _, v in store.doc.items())
+    return {
+        "mode": mode,
+        "threads": threads,
+        "commits": commits,
+        "failed": counts["failed"],
+        "conflicts": store.stats["conflicts"],
+        "commits_per_s": round(commits / elapsed, 1) if elapsed else 0.0,
+        "reads_per_s": round(len(read_lat) / elapsed, 1) if elapsed else 0.0,
+        "read_p50_us": round(_pct(read_lat, 0.50) * 1e6, 1),
+        "read_p99_us": round(_pct(read_lat, 0.99) * 1e6, 1),
+        "balance_conserved": total == args.accounts * args.initial,
+    }
+
+
+def bench_contention(args):
+    """스레드 수별 락 모드 vs 낙관적(CAS) 모드"""
+    return [
+        _run_contention_workload(m, t, args)
+        for t in args.threads
+        for m in args.modes
+    ]
+
+
+def _run_shards_workload(mode: str, threads: int, args):
+    """
+    계좌 하나 = 문서 하나. 쓰기 스레드들이 임의의 두 계좌 사이 송금을 다중 문서 트랜잭션으로 반영한다.
+    - single: 모든 계좌를 한 문서에 담은 SingleDocumentStore(locked) → 송금끼리 전부 직렬화
+    - ordered / occ: ShardedDocumentStore → 계좌가 겹치지 않는 송금은 서로 막지 않는다
+    - transform 안에서 work_us 만큼 머문다(GIL 을 놓는 작업 흉내)
+    """
+    keys = [f"acct{i}" for i in range(args.accounts)]
+    if mode == "single":
+        store = SingleDocumentStore({k: args.initial for k in keys})
+    else:
+        store = ShardedDocumentStore(
+            {k: {"balance": args.initial} for k in keys}, n_shards=args.shards, mode=mode,
+        )
+    work = args.work_us / 1e6
+    counts = {"failed": 0}
+    counter_lock = threading.Lock()
+
+    def single_transfer(src, dst):
+        def transform(doc):
+            doc[src] -= 1
+            doc[dst] += 1
+            if work:
+                time.sleep(work)
+            return doc
+        return transform
+
+    def sharded_transfer(src, dst):
+        def transform(docs):
+            docs[src]["balance"] -= 1
+            docs[dst]["balance"] += 1
+            if work:
+                time.sleep(work)
+        return transform
+
+    def worker(wid: int):
+        rng = random.Random(args.seed + wid)
+        for _ in range(args.txns_per_thread):
+            src, dst = rng.sample(keys, 2)
+            try:
+                if mode == "single":
+                    store.atomic_update(single_transfer(src, dst))
+                else:
+                    store.transact([src, dst], sharded_transfer(src, dst))
+            except TxnConflict:
+                with counter_lock:
+                    counts["failed"] += 1
+
+    ths = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for th in ths:
+        th.start()
+    for th in ths:
+        th.join()
+    elapsed = time.perf_counter() - t0
+
+    if mode == "single":
+        total = sum(v for _, v in store.doc.items())
+    else:
+        total = sum(doc["balance"] for doc in store.snapshot(keys).values())
+    commits = store.stats["commits"]
+    return {
+        "mode": mode,
+        "threads": threads,
+        "commits": commits,
+        "failed": counts["failed"],
+        "conflicts": store.stats["conflicts"],
+        "commits_per_s": round(commits / elapsed, 1) if elapsed else 0.0,
+        "balance_conserved": total == args.accounts * args.initial,
+    }
+
+
+def bench_shards(args):
+    """한 문서 vs 문서 여러 개 + 다중 문서 트랜잭션(정렬 락 / OCC)"""
+    return [
+        _run_shards_workload(m, t, args)
+        for t in args.threads
+        for m in args.modes
+    ]
+
+
+def _run_sqlite_workload(durability: str, batch: int, args):
+    """
+    영속 DB 파일 하나에 송금 args.transfers 건을 batch 건씩 한 트랜잭션으로 반영.
+    - durability 는 "journal_mode:synchronous" 형식(예: WAL:NORMAL)
+    """
+    journal_mode, synchronous = durability.split(":")
+    rng = random.Random(args.seed)
+    keys = [f"acct{i}" for i in range(args.accounts)]
+    workdir = tempfile.mkdtemp(prefix="sqlite_bench_")
+    engine = SQLiteTransferEngine(
+        os.path.join(workdir, "bank.sqlite"),
+        pool_size=1,
+        synchronous=synchronous,
+        journal_mode=journal_mode,
+        wal_autocheckpoint=args.wal_autocheckpoint,
+    )
+    try:
+        engine.setup({k: args.initial for k in keys})
+        transfers = [(*rng.sample(keys, 2), 1) for _ in range(args.transfers)]
+
+        t0 = time.perf_counter()
+        for i in range(0, len(transfers), batch):
+            engine.transfer_batch(transfers[i:i + batch])
+        elapsed = time.perf_counter() - t0
+
+        total = engine.total_balance()
+    finally:
+        engine.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "durability": durability,
+        "batch": batch,
+        "transfers": args.transfers,
+        "commits": -(-args.transfers // batch),
+        "transfers_per_s": round(args.transfers / elapsed, 1) if elapsed else 0.0,
+        "balance_conserved": total == args.accounts * args.initial,
+    }
+
+
+def bench_sqlite(args):
+    """내구성 설정 x 배치 크기별 SQLite 송금 처리량"""
+    return [
+        _run_sqlite_workload(d, b, args)
+        for d in args.durability
+        for b in args.batches
+    ]
+
+
+def _sqlite_reader_proc(path: str, expected: int, stop, out):
+    """
+    읽기 프로세스: 스냅샷 하나에서 총 잔고를 읽는 일을 stop 될 때까지 반복.
+    - 송금은 총 잔고를 바꾸지 않으므로 expected 와 다르면 스냅샷이 찢어진 것
+    """
+    conn = open_reader(path)
+    reads = violations = errors = 0
+    while not stop.is_set():
+        try:
+            if SQLiteTransferEngine.snapshot_total(conn) != expected:
+                violations += 1
+            reads += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    conn.close()
+    out.put((reads, violations, errors))
+
+
+def _run_writers_workload(strategy: str, writers: int, args):
+    """
+    DB 파일 하나에 쓰기 스레드 writers 개 + 읽기 프로세스 args.readers 개.
+    - naive: busy-timeout 0, 재시도 없음 → BEGIN IMMEDIATE 가 SQLITE_BUSY 로 실패하면 그대로 실패
+    - backoff: 짧은 busy-timeout + 지터를 준 지수 backoff 재시도
+    - queue: 쓰기 스레드들은 WriterQueue 에 넣고 기다리기만, 실제 쓰기는 한 스레드가 그룹 커밋
+    """
+    rng = random.Random(args.seed)
+    keys = [f"acct{i}" for i in range(args.accounts)]
+    workdir = tempfile.mkdtemp(prefix="sqlite_bench_")
+    path = os.path.join(workdir, "bank.sqlite")
+    if strategy == "naive":
+        engine = SQLiteTransferEngine(path, pool_size=writers, synchronous=args.synchronous,
+                                      timeout=0, busy_retries=0)
+    elif strategy == "backoff":
+        engine = SQLiteTransferEngine(path, pool_size=writers, synchronous=args.synchronous,
+                                      timeout=args.busy_timeout_ms / 1000)
+    else:
+        engine = SQLiteTransferEngine(path, pool_size=1, synchronous=args.synchronous)
+    queue = WriterQueue(engine, max_batch=args.max_batch) if strategy == "queue" else None
+    counts = {"failed": 0}
+    counter_lock = threading.Lock()
+    expected = args.accounts * args.initial
+
+    def writer(wid: int):
+        w_rng = random.Random(args.seed + wid)
+        for _ in range(args.transfers_per_writer):
+            src, dst = w_rng.sample(keys, 2)
+            try:
+                if queue is not None:
+                    queue.submit(src, dst, 1).result()
+                else:
+                    engine.transfer(src, dst, 1)
+            except sqlite3.OperationalError:
+                with counter_lock:
+                    counts["failed"] += 1
+
+    try:
+        engine.setup({k: args.initial for k in keys})
+        stop = mp.Event()
+        out = mp.Queue()
+        procs = [
+            mp.Process(target=_sqlite_reader_proc, args=(path, expected, stop, out))
+            for _ in range(args.readers)
+        ]
+        for pr in procs:
+            pr.start()
+
+        ths = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        t0 = time.perf_counter()
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+        elapsed = time.perf_counter() - t0
+
+        stop.set()
+        reads = violations = read_errors = 0
+        for _ in procs:
+            r, v, e = out.get()
+            reads += r
+            violations += v
+            read_errors += e
+        for pr in procs:
+            pr.join()
+        if queue is not None:
+            queue.close()
+        total = engine.total_balance()
+    finally:
+        engine.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    attempted = writers * args.transfers_per_writer
+    done = attempted - counts["failed"]
+    return {
+        "strategy": strategy,
+        "writers": writers,
+        "readers": args.readers,
+        "transfers": done,
+        "failed": counts["failed"],
+        "busy_retries": engine.stats["busy_retries"],
+        "commits": engine.stats["commits"],
+        "transfers_per_s": round(done / elapsed, 1) if elapsed else 0.0,
+        "reads_per_s": round(reads / elapsed, 1) if elapsed else 0.0,
+        "snapshot_violations": violations,
+        "read_errors": read_errors,
+        "balance_conserved": total == expected,
+    }
+
+
+def bench_writers(args):
+    """쓰기 스레드 N개 + 읽기 프로세스 M개: 경합 처리 전략별 처리량"""
+    return [
+        _run_writers_workload(s, w, args)
+        for w in args.writers
+        for s in args.strategies
+    ]
+
+
+TRANSFER_ENGINES = ["sqlite", "doc", "sharded", "kv"]
+
+
+def _make_transfer_engine(engine: str, keys, args, workdir: str):
+    """
+    엔진별로 (transfer(src, dst, amount), total_balance(), close()) 를 돌려준다.
+    - sqlite: SQLiteTransferEngine(커넥션 풀, 송금 1건 = 트랜잭션 1개)
+    - doc: 모든 계좌를 한 문서에 담은 SingleDocumentStore
+    - sharded: 계좌마다 문서 하나인 ShardedDocumentStore(정렬 락)
+    - kv: 키마다 락을 둔 LockedKVStore
+    """
+    initial = {k: args.initial for k in keys}
+    if engine == "sqlite":
+        store = SQLiteTransferEngine(os.path.join(workdir, "bank.sqlite"), pool_size=args.threads,
+                                     synchronous=args.synchronous)
+        store.setup(initial)
+        return store.transfer, store.total_balance, store.close
+
+    if engine == "doc":
+        store = SingleDocumentStore(initial)
+
+        def transfer(src, dst, amount):
+            def transform(doc):
+                doc[src] -= amount
+                doc[dst] += amount
+                return doc
+            store.atomic_update(transform)
+        return transfer, lambda: sum(v for _, v in store.doc.items()), lambda: None
+
+    if engine == "sharded":
+        store = ShardedDocumentStore({k: {"balance": v} for k, v in initial.items()})
+
+        def transfer(src, dst, amount):
+            def transform(docs):
+                docs[src]["balance"] -= amount
+                docs[dst]["balance"] += amount
+            store.transact([src, dst], transform)
+        return (
+            transfer,
+            lambda: sum(d["balance"] for d in store.snapshot(keys).values()),
+            lambda: None,
+        )
+
+    store = LockedKVStore(initial)
+    return store.transfer, lambda: sum(store.kv.values()), lambda: None
+
+
+def _pick_pair(rng: random.Random, keys, args):
+    # hot_prob 확률로 앞쪽 hot_accounts 개 안에서만 두 계좌를 고른다(핫 계좌 쏠림)
+    if args.hot_accounts >= 2 and rng.random() < args.hot_prob:
+        return rng.sample(keys[:args.hot_accounts], 2)
+    return rng.sample(keys, 2)
+
+
+def _run_transfer_workload(engine: str, args):
+    """
+    같은 무작위 송금 워크로드를 여러 스레드로 한 엔진에 돌린다.
+    - 스레드마다 시드가 고정된 난수로 송금 쌍을 고르므로 엔진끼리 같은 요청 순서를 받는다
+    - 송금 한 건의 지연을 모두 모아 백분위수를 계산
+    - 끝나면 총 잔고가 보존됐는지 확인(송금은 총합을 바꾸지 않음)
+    - failed 는 경합 실패(CAS/검증 재시도 소진, SQLite BUSY)만. 그 밖의 예외는 스레드가 끝난 뒤 그대로 다시 던짐
+    """
+    keys = [f"acct{i}" for i in range(args.accounts)]
+    workdir = tempfile.mkdtemp(prefix="transfer_bench_")
+    transfer, total_balance, close = _make_transfer_engine(engine, keys, args, workdir)
+    latencies = []
+    counts = {"failed": 0}
+    errors = []
+    counter_lock = threading.Lock()
+
+    def worker(wid: int):
+        rng = random.Random(args.seed + wid)
+        lat = []
+        failed = 0
+        try:
+            for _ in range(args.transfers_per_thread):
+                src, dst = _pick_pair(rng, keys, args)
+                t = time.perf_counter()
+                try:
+                    transfer(src, dst, 1)
+                except (UpdateConflict, TxnConflict):
+                    failed += 1
+                    continue
+                except sqlite3.OperationalError as e:
+                    if not _is_busy(e):
+                        raise
+                    failed += 1
+                    continue
+                lat.append(time.perf_counter() - t)
+        except Exception as e:
+            # 프로그래밍 오류 등은 실패 건수로 숨기지 않고 메인 스레드에서 다시 던진다
+            with counter_lock:
+                errors.append(e)
+        with counter_lock:
+            latencies.extend(lat)
+            counts["failed"] += failed
+
+    try:
+        ths = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        t0 = time.perf_counter()
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+        elapsed = time.perf_counter() - t0
+        if errors:
+            raise errors[0]
+        total = total_balance()
+    finally:
+        close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies.sort()
+    return {
+        "engine": engine,
+        "threads": args.threads,
+        "accounts": args.accounts,
+        "hot_prob": args.hot_prob,
+        "transfers": len(latencies),
+        "failed": counts["failed"],
+        "transfers_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(_pct(latencies, 0.50) * 1e6, 1),
+        "p99_us": round(_pct(latencies, 0.99) * 1e6, 1),
+        "p999_us": round(_pct(latencies, 0.999) * 1e6, 1),
+        "balance_conserved": total == args.accounts * args.initial,
+    }
+
+
+def bench_transfer(args):
+    """같은 송금 워크로드: SQLite vs 한 문서 vs 샤딩된 문서 vs 키별 락 KV"""
+    return [_run_transfer_workload(e, args) for e in args.engines]
+
+
+def _print_csv(rows):
+    # 결과를 CSV로 표준출력(replication/bench.py 와 같은 형식)
+    headers = list(rows[0].keys())
+    print(",".join(headers))
+    for row in rows:
+        print(",".join(str(row.get(h, "")) for h in headers))
+
+
+def main():
+    """명령행 인자를 파싱하고 각 벤치마크를 실행"""
+    p = argparse.ArgumentParser(description="관계형 vs 문서형 송금 벤치마크")
+    sub = p.add_subparsers(dest="mode", required=True)
+
+    # ---------------- 문서 크기 vs 업데이트 처리량 ----------------
+    pd = sub.add_parser("docsize")
+    pd.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    pd.add_argument("--stores", nargs="+", default=list(DOC_STORES), choices=list(DOC_STORES))
+    pd.add_argument("--updates", type=int, default=2000)
+    pd.add_argument("--initial", type=int, default=100)
+    pd.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 락 모드 vs 낙관적(CAS) 모드 ----------------
+    pc = sub.add_parser("contention")
+    pc.add_argument("--modes", nargs="+", default=["locked", "optimistic"], choices=["locked", "optimistic"])
+    pc.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    pc.add_argument("--readers", type=int, default=2)
+    pc.add_argument("--read-interval-us", type=float, default=100.0)
+    pc.add_argument("--accounts", type=int, default=1000)
+    pc.add_argument("--initial", type=int, default=100)
+    pc.add_argument("--updates-per-thread", type=int, default=500)
+    pc.add_argument("--work-us", type=float, default=50.0)
+    pc.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 한 문서 vs 샤딩된 문서 + 다중 문서 트랜잭션 ----------------
+    ps = sub.add_parser("shards")
+    ps.add_argument("--modes", nargs="+", default=["single", "ordered", "occ"], choices=["single", "ordered", "occ"])
+    ps.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    ps.add_argument("--shards", type=int, default=16)
+    ps.add_argument("--accounts", type=int, default=1000)
+    ps.add_argument("--initial", type=int, default=100)
+    ps.add_argument("--txns-per-thread", type=int, default=500)
+    ps.add_argument("--work-us", type=float, default=50.0)
+    ps.add_argument("--seed", type=int, default=42)
+
+    # ---------------- SQLite 송금 엔진: 내구성 설정 x 배치 ----------------
+    pq = sub.add_parser("sqlite")
+    pq.add_argument("--durability", nargs="+", default=["WAL:OFF", "WAL:NORMAL", "WAL:FULL", "DELETE:FULL"])
+    pq.add_argument("--batches", type=int, nargs="+", default=[1, 100])
+    pq.add_argument("--wal-autocheckpoint", type=int, default=1000)
+    pq.add_argument("--accounts", type=int, default=1000)
+    pq.add_argument("--initial", type=int, default=100)
+    pq.add_argument("--transfers", type=int, default=5000)
+    pq.add_argument("--seed", type=int, default=42)
+
+    # ---------------- SQLite 다중 쓰기: BUSY 처리 전략 ----------------
+    pw = sub.add_parser("writers")
+    pw.add_argument("--strategies", nargs="+", default=["naive", "backoff", "queue"], choices=["naive", "backoff", "queue"])
+    pw.add_argument("--writers", type=int, nargs="+", default=[1, 4, 8])
+    pw.add_argument("--readers", type=int, default=2)
+    pw.add_argument("--synchronous", default="NORMAL")
+    pw.add_argument("--busy-timeout-ms", type=float, default=1.0)
+    pw.add_argument("--max-batch", type=int, default=256)
+    pw.add_argument("--accounts", type=int, default=1000)
+    pw.add_argument("--initial", type=int, default=100)
+    pw.add_argument("--transfers-per-writer", type=int, default=500)
+    pw.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 같은 송금 워크로드로 모델 비교 ----------------
+    pf = sub.add_parser("transfer")
+    pf.add_argument("--engines", nargs="+", default=TRANSFER_ENGINES, choices=TRANSFER_ENGINES)
+    pf.add_argument("--threads", type=int, default=4)
+    pf.add_argument("--accounts", type=int, default=1000)
+    pf.add_argument("--hot-accounts", type=int, default=10)
+    pf.add_argument("--hot-prob", type=float, default=0.0)
+    pf.add_argument("--initial", type=int, default=100)
+    pf.add_argument("--transfers-per-thread", type=int, default=2000)
+    pf.add_argument("--synchronous", default="NORMAL")
+    pf.add_argument("--seed", type=int, default=42)
+
+    args = p.parse_args()
+
+    if args.mode == "docsize":
+        rows = bench_docsize(args)
+    elif args.mode == "contention":
+        rows = bench_contention(args)
+    elif args.mode == "shards":
+        rows = bench_shards(args)
+    elif args.mode == "sqlite":
+        rows = bench_sqlite(args)
+    elif args.mode == "writers":
+        rows = bench_writers(args)
+    else:
+        rows = bench_transfer(args)
+
+    _print_csv(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from .sqlite_transfer import sqlite_transfer
 from .naive_kv_transfer import naive_kv_transfer
 from .single_doc_transfer import single_document_transfer
+from .sharded_doc_store import sharded_document_transfer
 
 def run():
     print("=== 관계형 vs 문서형 모델에서의 트랜잭션 ===")
@@ -15,5 +16,8 @@ def run():
     print("[단일 문서 원자 교체: 커밋 전에 예외 → 원본 유지]")
     print(" ->", single_document_transfer(crash_before_commit=True))
 
+    print("[문서 여러 개 + 다중 문서 트랜잭션: 커밋 전에 예외 → 두 문서 모두 원본 유지]")
+    print(" ->", sharded_document_transfer(crash_before_commit=True))
+
 if __name__ == "__main__":
     run()
\ No newline at end of file
@@ -1,3 +1,5 @@
+from threading import Lock
+
 def naive_kv_transfer(crash_midway: bool = False):
     """
     '두 문서(A, B)를 따로 저장하는' 순진한 KV 모델을 흉내.
@@ -16,3 +18,28 @@ def naive_kv_transfer(crash_midway: bool = False):
         # 트랜잭션/롤백 부재 → 손실 상태를 그대로 방치
         pass
     return kv
+
+
+class LockedKVStore:
+    """
+    키마다 락을 따로 둔 KV 모델(문서 = 계좌 하나).
+    - 여러 키를 고칠 때는 키 정렬 순서로 락을 잡는다 → 교착 없음
+    - 락만 있고 롤백은 없으므로, 중간에 예외가 나면 그때까지 고친 키는 그대로 남는다
+    """
+    def __init__(self, kv: dict):
+        self.kv = dict(kv)
+        self._locks = {k: Lock() for k in self.kv}
+
+    def get(self, key):
+        return self.kv[key]
+
+    def transfer(self, src: str, dst: str, amount: int):
+        keys = sorted({src, dst})
+        for k in keys:
+            self._locks[k].acquire()
+        try:
+            self.kv[src] -= amount
+            self.kv[dst] += amount
+        finally:
+            for k in reversed(keys):
+                self._locks[k].release()
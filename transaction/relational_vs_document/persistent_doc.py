@@ -0,0 +1,326 @@
+from collections.abc import Mapping, MutableMapping
+
+# HAMT(Hash Array Mapped Trie) 파라미터: 해시를 5비트씩 잘라 32갈래 트라이를 내려간다
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+
+def _hash(key) -> int:
+    return hash(key) & _HASH_MASK
+
+
+class _Node:
+    """
+    비트맵 압축 노드.
+    - bitmap 의 i번째 비트가 켜져 있으면 i번째 칸이 존재하고, entries 에 빽빽하게 들어 있다.
+    - 칸은 (key, value) 튜플(리프)이거나 하위 노드.
+    - 절대 제자리에서 고치지 않는다: 바뀌는 경로의 노드만 새로 만들고 나머지는 공유(path copying).
+    """
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def _index(self, bit: int) -> int:
+        return (self.bitmap & (bit - 1)).bit_count()
+
+    def get(self, h: int, shift: int, key, default):
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return default
+        e = self.entries[self._index(bit)]
+        if type(e) is tuple:
+            return e[1] if e[0] == key else default
+        return e.get(h, shift + _BITS, key, default)
+
+    def assoc(self, h: int, shift: int, key, value):
+        """key=value 를 반영한 새 노드와 '키가 새로 생겼는지' 여부"""
+        bit = 1 << ((h >> shift) & _MASK)
+        idx = self._index(bit)
+        if not self.bitmap & bit:
+            entries = self.entries[:idx] + ((key, value),) + self.entries[idx:]
+            return _Node(self.bitmap | bit, entries), True
+        e = self.entries[idx]
+        if type(e) is tuple:
+            if e[0] == key:
+                if e[1] is value:
+                    return self, False
+                new, added = (key, value), False
+            else:
+                new, added = _pair(e[0], e[1], _hash(e[0]), key, value, h, shift + _BITS), True
+        else:
+            new, added = e.assoc(h, shift + _BITS, key, value)
+            if new is e:
+                return self, False
+        return _Node(self.bitmap, self.entries[:idx] + (new,) + self.entries[idx + 1:]), added
+
+    def without(self, h: int, shift: int, key):
+        """key 를 뺀 새 노드(비면 None)와 '실제로 지웠는지' 여부"""
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self, False
+        idx = self._index(bit)
+        e = self.entries[idx]
+        if type(e) is tuple:
+            if e[0] != key:
+                return self, False
+            new = None
+        else:
+            new, removed = e.without(h, shift + _BITS, key)
+            if not removed:
+                return self, False
+        if new is None:
+            if self.bitmap == bit:
+                return None, True
+            return _Node(self.bitmap ^ bit, self.entries[:idx] + self.entries[idx + 1:]), True
+        return _Node(self.bitmap, self.entries[:idx] + (new,) + self.entries[idx + 1:]), True
+
+    def items(self):
+        for e in self.entries:
+            if type(e) is tuple:
+                yield e
+            else:
+                yield from e.items()
+
+
+class _Collision:
+    """해시 64비트가 모두 같은 키들을 모아 두는 노드(선형 탐색)"""
+    __slots__ = ("pairs",)
+
+    def __init__(self, pairs: tuple):
+        self.pairs = pairs
+
+    def get(self, h, shift, key, default):
+        for k, v in self.pairs:
+            if k == key:
+                return v
+        return default
+
+    def assoc(self, h, shift, key, value):
+        for i, (k, v) in enumerate(self.pairs):
+            if k == key:
+                if v is value:
+                    return self, False
+                return _Collision(self.pairs[:i] + ((key, value),) + self.pairs[i + 1:]), False
+        return _Collision(self.pairs + ((key, value),)), True
+
+    def without(self, h, shift, key):
+        for i, (k, _) in enumerate(self.pairs):
+            if k == key:
+                rest = self.pairs[:i] + self.pairs[i + 1:]
+                return (_Collision(rest) if rest else None), True
+        return self, False
+
+    def items(self):
+        yield from self.pairs
+
+
+def _pair(k1, v1, h1: int, k2, v2, h2: int, shift: int):
+    # 같은 칸에 떨어진 두 리프를 갈라 줄 하위 노드(해시 비트가 다 떨어지면 충돌 노드)
+    if shift >= _HASH_BITS:
+        return _Collision(((k1, v1), (k2, v2)))
+    i1, i2 = (h1 >> shift) & _MASK, (h2 >> shift) & _MASK
+    if i1 == i2:
+        return _Node(1 << i1, (_pair(k1, v1, h1, k2, v2, h2, shift + _BITS),))
+    if i1 < i2:
+        return _Node((1 << i1) | (1 << i2), ((k1, v1), (k2, v2)))
+    return _Node((1 << i1) | (1 << i2), ((k2, v2), (k1, v1)))
+
+
+_EMPTY_NODE = _Node(0, ())
+
+
+class PersistentMap(Mapping):
+    """
+    불변(persistent) 맵. 문서(aggregate)를 복사 없이 공유하기 위한 표현.
+    - set()/delete() 는 원본을 그대로 두고 새 맵을 돌려준다.
+    - 바뀐 키가 지나는 경로(깊이 O(log32 n))의 노드만 새로 만든다 → 필드 k개 수정은 O(k log n).
+    - 중첩 dict 는 from_dict() 에서 함께 불변 맵으로, list 는 tuple 로, set 은 frozenset 으로 얼린다
+      (중첩 구조를 제자리에서 고칠 수 없음).
+    """
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, root: _Node = _EMPTY_NODE, size: int = 0):
+        self._root = root
+        self._size = size
+
+    @classmethod
+    def from_dict(cls, d: Mapping) -> "PersistentMap":
+        if isinstance(d, PersistentMap):
+            return d
+        m = cls()
+        for k, v in d.items():
+            m = m.set(k, freeze(v))
+        return m
+
+    def to_dict(self) -> dict:
+        return {k: thaw(v) for k, v in self.items()}
+
+    def __getitem__(self, key):
+        v = self._root.get(_hash(key), 0, key, _MISSING)
+        if v is _MISSING:
+            raise KeyError(key)
+        return v
+
+    def get(self, key, default=None):
+        return self._root.get(_hash(key), 0, key, default)
+
+    def __contains__(self, key) -> bool:
+        return self._root.get(_hash(key), 0, key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        for k, _ in self._root.items():
+            yield k
+
+    def items(self):
+        return self._root.items()
+
+    def set(self, key, value) -> "PersistentMap":
+        root, added = self._root.assoc(_hash(key), 0, key, value)
+        if root is self._root:
+            return self
+        return PersistentMap(root, self._size + added)
+
+    def delete(self, key) -> "PersistentMap":
+        root, removed = self._root.without(_hash(key), 0, key)
+        if not removed:
+            raise KeyError(key)
+        return PersistentMap(root or _EMPTY_NODE, self._size - 1)
+
+    def __repr__(self) -> str:
+        return f"PersistentMap({self.to_dict()!r})"
+
+
+_MISSING = object()  # '키 없음' 표시
+_DELETED = object()  # DocView 에서 '지워진 필드' 표시
+
+
+def freeze(value):
+    """
+    문서에 넣을 값을 불변 형태로: dict → PersistentMap, DocView → 반영된 맵,
+    list/tuple → 원소까지 얼린 tuple, set → frozenset
+    """
+    if isinstance(value, DocView):
+        return value.commit()
+    if isinstance(value, PersistentMap):
+        return value
+    if isinstance(value, dict):
+        return PersistentMap.from_dict(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(x) for x in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+def thaw(value):
+    """freeze() 의 반대(to_dict 용): PersistentMap → dict, tuple → list, frozenset → set"""
+    if isinstance(value, PersistentMap):
+        return value.to_dict()
+    if isinstance(value, tuple):
+        return [thaw(x) for x in value]
+    if isinstance(value, frozenset):
+        return set(value)
+    return value
+
+
+def _mutable(value):
+    """
+    얼린 리스트/집합을 transform 이 고칠 수 있는 형태로: tuple → list(원소도 재귀), frozenset → set,
+    리스트 안의 맵 → 하위 DocView(복사 없이 원본 위에 얹음, commit 때 바뀐 것만 반영)
+    """
+    if isinstance(value, PersistentMap):
+        return DocView(value)
+    if isinstance(value, tuple):
+        return [_mutable(x) for x in value]
+    if isinstance(value, frozenset):
+        return set(value)
+    return value
+
+
+class DocView(MutableMapping):
+    """
+    transform 에 넘겨주는 '고칠 수 있는 문서 뷰'.
+    - 읽기는 원본(불변 맵)을 그대로 보고, 쓰기는 바뀐 필드만 따로 모아 둔다(원본은 절대 안 바뀜).
+    - 중첩 맵을 꺼내면 그 하위 뷰를 돌려주므로 doc["accounts"]["A"] -= 50 같은 중첩 수정도 안전.
+    - 얼린 리스트/집합(tuple/frozenset)을 꺼내면 이 뷰만의 list/set 복사본을 준다(copy-on-read)
+      → doc["tags"].append(...) 후 transform 이 실패해도 원본 문서의 리스트는 그대로.
+      리스트 안의 맵은 하위 뷰로 바꿔 담으므로 doc["items"][0]["x"] = 1 도 된다.
+    - commit() 은 바뀐 필드만 path copying 으로 반영한 새 불변 맵을 만든다.
+    """
+    def __init__(self, base: PersistentMap):
+        self._base = base
+        self._changes = {}   # key -> 새 값 or _DELETED
+        self._children = {}  # key -> 중첩 맵에 대한 하위 DocView
+        self._copies = {}    # key -> 얼린 리스트/집합에서 꺼내 준 가변 복사본
+
+    def __getitem__(self, key):
+        if key in self._changes:
+            v = self._changes[key]
+            if v is _DELETED:
+                raise KeyError(key)
+            return v
+        child = self._children.get(key)
+        if child is not None:
+            return child
+        copy = self._copies.get(key)
+        if copy is not None:
+            return copy
+        v = self._base[key]
+        if isinstance(v, PersistentMap):
+            child = self._children[key] = DocView(v)
+            return child
+        if isinstance(v, (tuple, frozenset)):
+            copy = self._copies[key] = _mutable(v)
+            return copy
+        return v
+
+    def __setitem__(self, key, value):
+        self._children.pop(key, None)
+        self._copies.pop(key, None)
+        self._changes[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._children.pop(key, None)
+        self._copies.pop(key, None)
+        self._changes[key] = _DELETED
+
+    def __contains__(self, key) -> bool:
+        if key in self._changes:
+            return self._changes[key] is not _DELETED
+        return key in self._base
+
+    def __iter__(self):
+        for k in self._base:
+            if self._changes.get(k, None) is not _DELETED:
+                yield k
+        for k, v in self._changes.items():
+            if v is not _DELETED and k not in self._base:
+                yield k
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def commit(self) -> PersistentMap:
+        m = self._base
+        for k, child in self._children.items():
+            m = m.set(k, child.commit())
+        for k, copy in self._copies.items():
+            # 꺼내 가기만 하고 안 고친 리스트/집합은 원래 객체를 그대로 공유
+            frozen = freeze(copy)
+            if frozen != m[k]:
+                m = m.set(k, frozen)
+        for k, v in self._changes.items():
+            if v is not _DELETED:
+                m = m.set(k, freeze(v))
+            elif k in m:
+                m = m.delete(k)
+        return m
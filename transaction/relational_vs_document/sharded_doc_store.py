@@ -0,0 +1,171 @@
+import random
+import time
+from threading import Lock
+
+from .persistent_doc import DocView, PersistentMap
+
+
+class TxnConflict(Exception):
+    """OCC 모드에서 재시도 한도 안에 검증을 끝내 통과하지 못함"""
+
+
+class _DocSlot:
+    """문서 하나: 버전 락 + (버전, 불변 문서). 교체는 lock 을 쥔 채로만 한다."""
+    __slots__ = ("lock", "state")
+
+    def __init__(self, doc: PersistentMap):
+        self.lock = Lock()
+        self.state = (0, doc)
+
+
+class ShardedDocumentStore:
+    """
+    문서를 여러 개로 쪼개 저장하고, 여러 문서를 한 번에 원자적으로 고치는 트랜잭션을 제공하는 모델.
+    - 문서마다 버전과 락을 따로 둔다 → 서로 다른 문서를 고치는 트랜잭션은 서로 막지 않는다.
+    - 문서 테이블은 doc_id 해시로 샤드에 나누고, 샤드 래치는 '문서 슬롯 생성'에만 쓴다.
+
+    mode
+    - "ordered": 관련 문서 락을 doc_id 정렬 순서로 모두 잡은 뒤 transform 실행(전역 순서라 교착 없음)
+    - "occ": 락 없이 스냅샷 위에서 transform 실행 → 쓸 문서만 정렬 순서로 잠그고,
+      읽은 문서들의 버전이 그대로인지(그리고 남이 잠그고 있지 않은지) 검증한 뒤 교체.
+      검증 실패 시 backoff 후 재시도하므로 transform 은 부작용이 없어야 한다.
+    """
+    def __init__(self, docs: dict = None, n_shards: int = 16, mode: str = "ordered",
+                 max_retries: int = 100, backoff_base: float = 0.00005, backoff_cap: float = 0.005):
+        if mode not in ("ordered", "occ"):
+            raise ValueError(f"unknown mode: {mode}")
+        self.mode = mode
+        self._shards = [({}, Lock()) for _ in range(n_shards)]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._rng = random.Random()
+        self._stats_lock = Lock()
+        self.stats = {"commits": 0, "conflicts": 0}
+        for doc_id, doc in (docs or {}).items():
+            self._slot(doc_id).state = (0, PersistentMap.from_dict(doc))
+
+    def _slot(self, doc_id) -> _DocSlot:
+        slots, latch = self._shards[hash(doc_id) % len(self._shards)]
+        slot = slots.get(doc_id)
+        if slot is None:
+            with latch:
+                slot = slots.get(doc_id)
+                if slot is None:
+                    # 없는 문서는 빈 문서(버전 0)로 만들어 둔다
+                    slot = slots[doc_id] = _DocSlot(PersistentMap())
+        return slot
+
+    def get(self, doc_id) -> PersistentMap:
+        """문서 하나의 현재 버전(락 없음)"""
+        return self._slot(doc_id).state[1]
+
+    def version(self, doc_id) -> int:
+        return self._slot(doc_id).state[0]
+
+    def doc_ids(self):
+        for slots, _ in self._shards:
+            yield from list(slots)
+
+    def snapshot(self, doc_ids) -> dict:
+        """
+        여러 문서를 락 없이 '같은 시점'으로 읽는다.
+        - 한 번 읽고 나서 버전이 그대로이고 아무도 잠그고 있지 않은지 다시 확인, 아니면 재시도
+        """
+        slots = {d: self._slot(d) for d in doc_ids}
+        while True:
+            states = {d: s.state for d, s in slots.items()}
+            if all(s.state is states[d] and not s.lock.locked() for d, s in slots.items()):
+                return {d: st[1] for d, st in states.items()}
+            time.sleep(0)
+
+    def transact(self, doc_ids, transform) -> dict:
+        """
+        transform(views) 로 여러 문서를 한 번에 고친다. views 는 doc_id → DocView.
+        - transform 이 예외를 내면 아무 문서도 바뀌지 않는다.
+        - 반환: 실제로 바뀐 문서들의 새 버전 {doc_id: version}
+        """
+        ids = sorted(set(doc_ids))
+        if self.mode == "occ":
+            return self._transact_occ(ids, transform)
+        slots = [self._slot(d) for d in ids]
+        for s in slots:
+            s.lock.acquire()
+        try:
+            views = {d: DocView(s.state[1]) for d, s in zip(ids, slots)}
+            transform(views)
+            installed = {}
+            for d, s in zip(ids, slots):
+                version, doc = s.state
+                new_doc = views[d].commit()
+                if new_doc is not doc:
+                    s.state = (version + 1, new_doc)
+                    installed[d] = version + 1
+        finally:
+            for s in reversed(slots):
+                s.lock.release()
+        with self._stats_lock:
+            self.stats["commits"] += 1
+        return installed
+
+    def _transact_occ(self, ids, transform) -> dict:
+        slots = {d: self._slot(d) for d in ids}
+        for attempt in range(self.max_retries + 1):
+            # 1) 읽기: 락 없이 스냅샷
+            read = {d: s.state for d, s in slots.items()}
+            views = {d: DocView(st[1]) for d, st in read.items()}
+            transform(views)
+            writes = {}
+            for d in ids:
+                new_doc = views[d].commit()
+                if new_doc is not read[d][1]:
+                    writes[d] = new_doc
+
+            # 2) 검증: 쓸 문서만 정렬 순서로 잠그고, 읽은 문서 전부가 그대로인지 확인
+            locked = [slots[d] for d in ids if d in writes]
+            for s in locked:
+                s.lock.acquire()
+            try:
+                valid = all(
+                    slots[d].state is read[d] and (d in writes or not slots[d].lock.locked())
+                    for d in ids
+                )
+                # 3) 쓰기: 락을 쥔 채로 교체
+                if valid:
+                    installed = {}
+                    for d, new_doc in writes.items():
+                        version = read[d][0] + 1
+                        slots[d].state = (version, new_doc)
+                        installed[d] = version
+            finally:
+                for s in reversed(locked):
+                    s.lock.release()
+
+            if valid:
+                with self._stats_lock:
+                    self.stats["commits"] += 1
+                return installed
+            with self._stats_lock:
+                self.stats["conflicts"] += 1
+            delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+            time.sleep(self._rng.uniform(0, delay))
+        raise TxnConflict(f"validation failed after {self.max_retries} retries")
+
+
+def sharded_document_transfer(crash_before_commit: bool = False, mode: str = "ordered"):
+    """
+    계좌마다 문서를 따로 두고, 두 문서에 걸친 송금을 하나의 트랜잭션으로 처리:
+    - transform 안에서 A-50, B+50을 모두 적용
+    - 커밋 직전에 예외가 나면 어느 문서도 바뀌지 않음
+    """
+    store = ShardedDocumentStore({"A": {"balance": 100}, "B": {"balance": 100}}, mode=mode)
+    try:
+        def transform(docs):
+            docs["A"]["balance"] -= 50
+            docs["B"]["balance"] += 50
+            if crash_before_commit:
+                raise RuntimeError("boom before commit")
+        store.transact(["A", "B"], transform)
+    except Exception:
+        pass
+    return {d: doc["balance"] for d, doc in sorted(store.snapshot(["A", "B"]).items())}
@@ -1,27 +1,98 @@
+import random
+import time
 from threading import Lock
 
+from .persistent_doc import DocView, PersistentMap, freeze
+
+
+class UpdateConflict(Exception):
+    """낙관적 모드에서 재시도 한도 안에 CAS 에 끝내 성공하지 못함"""
+
+
 class SingleDocumentStore:
     """
     '한 문서(aggregate) 안에 A와 B를 함께 저장'하는 모델.
     - 많은 문서형 DB는 '한 문서' 단위의 원자 업데이트를 보장한다.
     - transform 함수가 끝까지 성공하면 새 문서로 '한 번에 교체'한다.
+    - 문서는 불변 맵(PersistentMap)으로 보관 → 업데이트마다 전체를 복사하지 않고,
+      바뀐 필드의 경로만 새로 만들어 나머지는 이전 버전과 공유한다.
+
+    mode
+    - "locked": transform 전체를 락 안에서 실행(느린 transform 하나가 다른 쓰기/읽기를 모두 막음)
+    - "optimistic": transform 은 락 밖에서 버전 스냅샷 위에 실행하고,
+      교체만 락 안에서 '버전이 그대로일 때만' 수행(compare-and-swap). 충돌 시 backoff 후 재시도.
+      transform 이 여러 번 불릴 수 있으므로 부작용이 없어야 한다.
     """
-    def __init__(self, doc: dict):
-        # 내부 상태를 복사해 보관
-        self.doc = doc.copy()
+    def __init__(self, doc: dict, mode: str = "locked", max_retries: int = 100,
+                 backoff_base: float = 0.00005, backoff_cap: float = 0.005):
+        if mode not in ("locked", "optimistic"):
+            raise ValueError(f"unknown mode: {mode}")
+        self.mode = mode
+        # (버전, 불변 문서)를 한 튜플로 보관 → 속성 읽기 한 번으로 일관된 스냅샷을 얻는다
+        self._state = (0, PersistentMap.from_dict(doc))
         # 교체 단위를 보호하기 위한 파이썬 Lock (진짜 DB의 원자성 대체)
         self._lock = Lock()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._rng = random.Random()
+        self.stats = {"commits": 0, "conflicts": 0}
+
+    @property
+    def doc(self) -> PersistentMap:
+        return self._state[1]
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def snapshot(self):
+        """
+        (버전, 문서) 스냅샷.
+        - locked: 쓰기와 같은 락을 잡고 읽는다 → transform 이 도는 동안 대기
+        - optimistic: 락 없이 현재 상태를 그대로 돌려준다(문서가 불변이라 안전)
+        """
+        if self.mode == "locked":
+            with self._lock:
+                return self._state
+        return self._state
+
+    def read(self, key, default=None):
+        return self.snapshot()[1].get(key, default)
 
     def atomic_update(self, transform):
         """
-        transform(doc_copy) → new_doc 을 만든 뒤, 락 안에서 '한 번에' 교체.
+        transform(doc_view) → new_doc 을 만든 뒤 '한 번에' 교체하고 새 버전을 돌려준다.
         transform 도중 예외가 나면 교체하지 않는다(즉, 커밋 자체가 없음).
+        - doc_view 는 원본을 건드리지 않는 수정용 뷰 → 중첩 필드를 고쳐도 원본 안전
+        - 비용은 문서 크기가 아니라 transform 이 고친 필드 수에 비례(O(k log n))
         """
+        if self.mode == "optimistic":
+            return self._update_optimistic(transform)
         with self._lock:
-            # 기존 문서를 복사해서 변환에 사용 (실패해도 원본 안전)
-            new_doc = transform(self.doc.copy())
+            version, doc = self._state
+            # 원본 위에 수정용 뷰를 얹어 변환에 사용 (실패해도 원본 안전)
+            new_doc = transform(DocView(doc))
             # transform 성공 시점에서만 교체
-            self.doc = new_doc
+            self._state = (version + 1, freeze(new_doc))
+            self.stats["commits"] += 1
+            return version + 1
+
+    def _update_optimistic(self, transform):
+        for attempt in range(self.max_retries + 1):
+            version, doc = self._state
+            # 락 밖에서 변환: 다른 쓰기/읽기를 막지 않는다
+            new_doc = freeze(transform(DocView(doc)))
+            with self._lock:
+                if self._state[0] == version:
+                    self._state = (version + 1, new_doc)
+                    self.stats["commits"] += 1
+                    return version + 1
+                self.stats["conflicts"] += 1
+            # 그새 다른 쓰기가 먼저 교체함 → 지터를 준 지수 backoff 후 새 스냅샷으로 재시도
+            delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+            time.sleep(self._rng.uniform(0, delay))
+        raise UpdateConflict(f"CAS failed after {self.max_retries} retries")
 
 def single_document_transfer(crash_before_commit: bool = False):
     """
@@ -42,4 +113,4 @@ def single_document_transfer(crash_before_commit: bool = False):
     except Exception:
         # 예외는 잡지만, 문서 교체는 이뤄지지 않음 → 원본 그대로
         pass
-    return store.doc
+    return store.doc.to_dict()
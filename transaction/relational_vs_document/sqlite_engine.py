@@ -0,0 +1,221 @@
+import random
+import sqlite3
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, Queue
+from threading import Lock, Thread
+
+# 같은 SQL 문자열을 재사용해야 sqlite3 모듈의 prepared statement 캐시에 걸린다
+_CREATE = "CREATE TABLE IF NOT EXISTS accounts(id TEXT PRIMARY KEY, balance INTEGER NOT NULL)"
+_UPSERT = "INSERT OR REPLACE INTO accounts(id, balance) VALUES(?, ?)"
+_DEBIT = "UPDATE accounts SET balance = balance - ? WHERE id = ?"
+_CREDIT = "UPDATE accounts SET balance = balance + ? WHERE id = ?"
+_TOTAL = "SELECT COALESCE(SUM(balance), 0) FROM accounts"
+_BALANCES = "SELECT id, balance FROM accounts ORDER BY id"
+
+
+class SQLiteTransferEngine:
+    """
+    영속 SQLite 파일 위에서 송금을 계속 처리하는 엔진(sqlite_transfer 의 '한 번 쓰고 버리는' 버전과 대비).
+    - 커넥션 풀: 커넥션/PRAGMA 설정 비용을 한 번만 낸다
+    - prepared statement 캐시: SQL 문자열을 모듈 상수로 고정해 매번 다시 파싱하지 않는다
+    - 배치: 송금 여러 건을 한 트랜잭션에 executemany 로 묶어 커밋(=fsync) 횟수를 줄인다
+
+    내구성 설정
+    - synchronous: OFF / NORMAL / FULL / EXTRA (커밋마다 fsync 를 얼마나 할지)
+    - journal_mode: WAL / DELETE / TRUNCATE / MEMORY / OFF ...
+    - wal_autocheckpoint: WAL 페이지가 이만큼 쌓이면 체크포인트(0이면 자동 체크포인트 끔)
+
+    쓰기 경합(SQLITE_BUSY)
+    - timeout: sqlite 자체 busy-timeout(초). 이 시간 안에 쓰기 락을 못 얻으면 BUSY
+    - BUSY 가 나면 지터를 준 지수 backoff 후 BEGIN IMMEDIATE 를 busy_retries 번까지 다시 시도
+    """
+    def __init__(self, path: str, pool_size: int = 4, synchronous: str = "NORMAL",
+                 journal_mode: str = "WAL", wal_autocheckpoint: int = 1000,
+                 cached_statements: int = 128, timeout: float = 5.0, busy_retries: int = 20,
+                 backoff_base: float = 0.001, backoff_cap: float = 0.05):
+        self.path = path
+        self.synchronous = synchronous
+        self.journal_mode = journal_mode
+        self.wal_autocheckpoint = wal_autocheckpoint
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.busy_retries = busy_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._rng = random.Random()
+        self._stats_lock = Lock()
+        self.stats = {"commits": 0, "busy_retries": 0}
+        self._pool = Queue()
+        self._conns = []
+        for _ in range(pool_size):
+            conn = self._connect()
+            self._conns.append(conn)
+            self._pool.put(conn)
+        with self.connection() as conn:
+            conn.execute(_CREATE)
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None → BEGIN/COMMIT 을 직접 제어, 풀에서 스레드 간에 넘겨 쓰므로 check_same_thread=False
+        conn = sqlite3.connect(
+            self.path,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            timeout=self.timeout,
+        )
+        conn.execute(f"PRAGMA journal_mode={self.journal_mode};")
+        conn.execute(f"PRAGMA synchronous={self.synchronous};")
+        conn.execute(f"PRAGMA wal_autocheckpoint={int(self.wal_autocheckpoint)};")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """풀에서 커넥션 하나를 빌렸다가 돌려준다(풀이 비어 있으면 대기)"""
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def _begin_immediate(self, conn: sqlite3.Connection):
+        """쓰기 락을 선점하는 BEGIN IMMEDIATE. BUSY 면 backoff 후 재시도"""
+        for attempt in range(self.busy_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE;")
+                return
+            except sqlite3.OperationalError as e:
+                if not _is_busy(e) or attempt == self.busy_retries:
+                    raise
+            with self._stats_lock:
+                self.stats["busy_retries"] += 1
+            delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+            time.sleep(self._rng.uniform(0, delay))
+
+    def reader(self) -> sqlite3.Connection:
+        """읽기 전용 커넥션(풀 밖, 호출한 쪽이 닫는다)"""
+        return open_reader(self.path)
+
+    def setup(self, accounts: dict):
+        """계좌 잔고를 한 트랜잭션으로 채워 넣는다"""
+        with self.connection() as conn:
+            self._begin_immediate(conn)
+            try:
+                conn.executemany(_UPSERT, accounts.items())
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+
+    def transfer(self, src: str, dst: str, amount: int):
+        self.transfer_batch([(src, dst, amount)])
+
+    def transfer_batch(self, transfers):
+        """
+        (src, dst, amount) 여러 건을 한 트랜잭션으로 반영.
+        - 차감/입금을 각각 executemany 로 보내고 COMMIT 한 번 → 전부 반영되거나 전부 취소
+        """
+        transfers = list(transfers)
+        with self.connection() as conn:
+            self._begin_immediate(conn)
+            try:
+                conn.executemany(_DEBIT, ((amt, src) for src, _, amt in transfers))
+                conn.executemany(_CREDIT, ((amt, dst) for _, dst, amt in transfers))
+                conn.execute("COMMIT;")
+            except Exception:
+                conn.execute("ROLLBACK;")
+                raise
+        with self._stats_lock:
+            self.stats["commits"] += 1
+
+    def total_balance(self) -> int:
+        with self.connection() as conn:
+            return conn.execute(_TOTAL).fetchone()[0]
+
+    @staticmethod
+    def snapshot_total(conn: sqlite3.Connection) -> int:
+        """읽기 트랜잭션 하나 안에서 총 잔고를 읽는다(스냅샷 일관성 확인용)"""
+        conn.execute("BEGIN;")
+        try:
+            return conn.execute(_TOTAL).fetchone()[0]
+        finally:
+            conn.execute("COMMIT;")
+
+    def balances(self) -> list:
+        with self.connection() as conn:
+            return conn.execute(_BALANCES).fetchall()
+
+    def close(self):
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+
+
+def open_reader(path: str) -> sqlite3.Connection:
+    """
+    DB 파일에 대한 읽기 전용 커넥션. 다른 프로세스에서도 엔진 없이 열 수 있다.
+    - WAL 에서는 읽기 트랜잭션이 시작 시점의 스냅샷을 보며 쓰기와 서로 막지 않는다
+    """
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, isolation_level=None, check_same_thread=False)
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    msg = str(e).lower()
+    return "locked" in msg or "busy" in msg
+
+
+class WriterQueue:
+    """
+    쓰기 전용 스레드 하나가 여러 생산자의 송금을 받아 그룹 커밋하는 큐.
+    - 생산자는 submit() 으로 넣고 Future 로 커밋 결과를 기다린다
+    - 쓰기 스레드는 큐에 쌓인 것을 max_batch 건까지 꺼내 한 트랜잭션으로 반영 → 쓰기 락 경합이 없고 fsync 도 묶인다
+    - 묶인 송금 중 하나라도 실패하면 그 그룹 전체가 롤백되고 모두 같은 예외를 받는다
+    """
+    def __init__(self, engine: SQLiteTransferEngine, max_batch: int = 256):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.stats = {"groups": 0, "transfers": 0}
+        self._q = Queue()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, src: str, dst: str, amount: int) -> Future:
+        fut = Future()
+        self._q.put(((src, dst, amount), fut))
+        return fut
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._q.get()
+            if item is None:
+                break
+            group = [item]
+            # 기다리지 않고 지금 쌓여 있는 만큼만 더 모은다
+            while len(group) < self.max_batch:
+                try:
+                    nxt = self._q.get_nowait()
+                except Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                group.append(nxt)
+            try:
+                self.engine.transfer_batch([t for t, _ in group])
+            except Exception as e:
+                for _, fut in group:
+                    fut.set_exception(e)
+            else:
+                for _, fut in group:
+                    fut.set_result(True)
+            self.stats["groups"] += 1
+            self.stats["transfers"] += len(group)
+
+    def close(self):
+        """남은 송금까지 반영한 뒤 쓰기 스레드를 멈춘다"""
+        self._q.put(None)
+        self._thread.join()
@@ -0,0 +1,510 @@
+import argparse
+import random
+import threading
+import time
+
+from .si import MVCCStore
+from .ssi import SSIStore
+from .two_phase_locking import KeyRangeLocker, LockManager, OrderedIndex, TwoPLStore, TxnAborted
+
+
+def _run_deadlock_workload(policy: str, periodic: bool, args):
+    """
+    락 매니저 위에서 동시 트랜잭션을 라운드로빈으로 한 단계씩 진행시키는 시뮬레이션.
+    - 트랜잭션마다 (키, S/X) 락 요청 목록(plan)을 순서대로 잡는다. 같은 키의 S→X 업그레이드도 섞인다.
+    - 락을 못 잡으면 다음 라운드에 재시도(=대기), 모두 잡으면 커밋(release_all).
+    - 어보트되면 잠시 쉬었다가 같은 plan을 원래 timestamp로 재시작(wait-die/wound-wait의 기아 방지).
+    """
+    rng = random.Random(args.seed)
+    lm = LockManager(policy=policy, periodic=periodic)
+    keys = [f"k{i}" for i in range(args.keys)]
+
+    def new_plan():
+        return [
+            (rng.choice(keys), "X" if rng.random() < args.write_ratio else "S")
+            for _ in range(args.locks_per_txn)
+        ]
+
+    active = {}  # t_id -> {"plan": [...], "pos": int, "ts": int, "sleep": int}
+    next_id = 0
+
+    def spawn(plan=None, ts=None, sleep=0):
+        nonlocal next_id
+        t_id = f"T{next_id}"
+        next_id += 1
+        ts = lm.begin(t_id, ts)
+        active[t_id] = {"plan": plan or new_plan(), "pos": 0, "ts": ts, "sleep": sleep}
+
+    for _ in range(args.mpl):
+        spawn()
+
+    commits = aborts = 0
+    t0 = time.perf_counter()
+    for step in range(args.steps):
+        for t_id in list(active):
+            st = active[t_id]
+            if st["sleep"]:
+                st["sleep"] -= 1
+                continue
+            name, mode = st["plan"][st["pos"]]
+            try:
+                ok = lm.try_acquire(name, mode, t_id)
+            except TxnAborted:
+                lm.release_all(t_id)
+                del active[t_id]
+                aborts += 1
+                spawn(st["plan"], st["ts"], sleep=rng.randint(1, args.mpl))
+                continue
+            if not ok:
+                continue
+            st["pos"] += 1
+            if st["pos"] == len(st["plan"]):
+                lm.release_all(t_id)
+                del active[t_id]
+                commits += 1
+                spawn()
+        if periodic and step % args.detect_every == 0:
+            lm.detect_deadlocks()
+    elapsed = time.perf_counter() - t0
+
+    s = lm.stats
+    return {
+        "policy": policy + ("_periodic" if periodic else ""),
+        "commits": commits,
+        "aborts": aborts,
+        "deadlocks": s["deadlocks"],
+        "false_abort_rate": round(s["false_aborts"] / s["aborts"], 4) if s["aborts"] else 0.0,
+        "avg_detect_us": round(s["detect_latency_sum"] / s["deadlocks"] * 1e6, 2) if s["deadlocks"] else 0.0,
+        "max_detect_us": round(s["detect_latency_max"] * 1e6, 2),
+        "commits_per_s": round(commits / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def bench_deadlock(args):
+    """교착 처리 정책별(점진 탐지/주기 탐지/wait-die/wound-wait) 결과 행 목록"""
+    return [
+        _run_deadlock_workload("detect", False, args),
+        _run_deadlock_workload("detect", True, args),
+        _run_deadlock_workload("wait-die", False, args),
+        _run_deadlock_workload("wound-wait", False, args),
+    ]
+
+
+def _run_locktable_workload(n_partitions: int, args):
+    """
+    여러 스레드가 아주 넓은 키 공간에서 락을 잡고 푸는 것을 반복(락 테이블 자체의 비용 측정).
+    - 트랜잭션마다 locks_per_txn 개 X 락 → 모두 해제(release_all)
+    - 충돌하면 기다리지 않고 바로 정리 후 다음 트랜잭션으로(테이블 경합만 보려는 목적)
+    """
+    lm = LockManager(n_partitions=n_partitions)
+    peak_live = 0
+    stop = threading.Event()
+
+    def worker(wid: int):
+        rng = random.Random(args.seed + wid)
+        for i in range(args.txns_per_thread):
+            t_id = f"W{wid}-{i}"
+            try:
+                for _ in range(args.locks_per_txn):
+                    if not lm.try_acquire(f"k{rng.randrange(args.keys)}", "X", t_id):
+                        break
+            except TxnAborted:
+                pass
+            lm.release_all(t_id)
+
+    def sampler():
+        # 살아 있는 락 객체 수를 주기적으로 샘플링(메모리 상한 확인용)
+        nonlocal peak_live
+        while not stop.is_set():
+            peak_live = max(peak_live, lm.lock_count())
+            time.sleep(0.005)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(args.threads)]
+    mon = threading.Thread(target=sampler)
+    mon.start()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    mon.join()
+
+    parts = lm.partition_stats()
+    requests = sum(p["requests"] for p in parts)
+    contended = sum(p["contended"] for p in parts)
+    lock_ops = args.threads * args.txns_per_thread * args.locks_per_txn
+    return {
+        "partitions": n_partitions,
+        "threads": args.threads,
+        "lock_ops_per_s": round(lock_ops / elapsed, 1) if elapsed else 0.0,
+        "contention_rate": round(contended / requests, 4) if requests else 0.0,
+        "max_partition_contended": max(p["contended"] for p in parts),
+        "allocs": sum(p["allocs"] for p in parts),
+        "peak_live_locks": peak_live,
+        "live_locks_after": lm.lock_count(),
+    }
+
+
+def bench_locktable(args):
+    """파티션 수별 락 테이블 처리량/경합/메모리(살아 있는 락 객체 수)"""
+    return [_run_locktable_workload(n, args) for n in args.partitions]
+
+
+def _run_granularity_workload(threshold: int, args):
+    """
+    벌크 트랜잭션 1개 스레드 + 포인트 트랜잭션 여러 스레드를 섞어 돌린다.
+    - 벌크: 테이블 t0 의 모든 로우를 S로 읽고 커밋(승격이 켜져 있으면 테이블 S 하나로 바뀜)
+    - 포인트: 임의 테이블(t0..)의 로우 하나를 X로 고치고 커밋(t0 에 가면 벌크와 충돌)
+    - 못 잡으면 기다리지 않고 전부 풀고 다시 시도(충돌 횟수로 셈)
+    """
+    lm = LockManager(escalation_threshold=threshold)
+    deadline = time.perf_counter() + args.seconds
+    result = {"bulk": 0, "bulk_locks": 0, "point": 0, "conflicts": 0}
+    counter_lock = threading.Lock()
+
+    def bulk_worker():
+        i = 0
+        while time.perf_counter() < deadline:
+            t_id = f"B{i}"
+            i += 1
+            ok = True
+            try:
+                for r in range(args.rows):
+                    if not lm.try_acquire_path(("t0", f"p{r // args.rows_per_page}", f"r{r}"), "S", t_id):
+                        ok = False
+                        break
+            except TxnAborted:
+                ok = False
+            held = len(lm.held.get(t_id, {}))
+            lm.release_all(t_id)
+            with counter_lock:
+                if ok:
+                    result["bulk"] += 1
+                    result["bulk_locks"] += held
+                else:
+                    result["conflicts"] += 1
+
+    def point_worker(wid: int):
+        rng = random.Random(args.seed + wid)
+        i = 0
+        while time.perf_counter() < deadline:
+            t_id = f"P{wid}-{i}"
+            i += 1
+            r = rng.randrange(args.rows)
+            path = (f"t{rng.randrange(args.tables)}", f"p{r // args.rows_per_page}", f"r{r}")
+            try:
+                ok = lm.try_acquire_path(path, "X", t_id)
+            except TxnAborted:
+                ok = False
+            lm.release_all(t_id)
+            with counter_lock:
+                result["point" if ok else "conflicts"] += 1
+
+    threads = [threading.Thread(target=bulk_worker)]
+    threads += [threading.Thread(target=point_worker, args=(w,)) for w in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        "escalation_threshold": threshold,
+        "bulk_txns_per_s": round(result["bulk"] / args.seconds, 1),
+        "avg_locks_per_bulk_txn": round(result["bulk_locks"] / result["bulk"], 1) if result["bulk"] else 0.0,
+        "point_txns_per_s": round(result["point"] / args.seconds, 1),
+        "conflicts": result["conflicts"],
+        "escalations": lm.stats["escalations"],
+    }
+
+
+def bench_granularity(args):
+    """승격 임계값별(0 = 승격 안 함) 벌크/포인트 트랜잭션 처리량과 벌크 트랜잭션의 락 개수"""
+    return [_run_granularity_workload(t, args) for t in args.thresholds]
+
+
+def _on_call_txn(mode: str, lm, ranges, index, t_id, me, undo):
+    """
+    당직 트랜잭션 하나(제너레이터). 막히면 yield 하고 스케줄러가 다음 라운드에 다시 깨운다.
+    - 내 근무조의 당직자 범위를 읽고
+      · 내가 당직이고 다른 당직자가 있으면 off(인덱스에서 삭제)
+      · 내가 당직이 아니면 on(인덱스에 삽입)
+    - mode: "predicate" = 전역 서술 잠금 하나(S→X 승격), "range" = 인덱스 범위 잠금,
+            "none" = 내 로우에만 X (읽은 범위 보호 없음 → write skew 가능)
+    """
+    shift = me[0]
+    lo, hi = (shift, ""), (shift, "\uffff")
+    if mode == "predicate":
+        while not lm.try_acquire("pred:on_call_exists", "S", t_id):
+            yield
+        seen = index.range(lo, hi)
+    elif mode == "range":
+        seen = ranges.scan(lo, hi, t_id)
+        while seen is None:
+            yield
+            seen = ranges.scan(lo, hi, t_id)
+    else:
+        seen = index.range(lo, hi)
+    # 읽기와 쓰기 사이에 다른 트랜잭션이 끼어들 틈
+    yield
+
+    if me in seen and len(seen) > 1:
+        op = "delete"
+    elif me not in seen:
+        op = "insert"
+    else:
+        return
+    if mode == "range":
+        apply = ranges.delete if op == "delete" else ranges.insert
+        while not apply(me, t_id):
+            yield
+    else:
+        lock = "pred:on_call_exists" if mode == "predicate" else f"row:{me!r}"
+        while not lm.try_acquire(lock, "X", t_id):
+            yield
+        if op == "delete":
+            index.delete(me)
+        else:
+            index.insert(me)
+    undo.append((op, me))
+
+
+def _run_range_workload(mode: str, args):
+    """
+    근무조(shift) 여러 개, 근무조마다 의사 여러 명이 모두 당직인 상태에서 시작.
+    트랜잭션들을 라운드로빈으로 한 단계씩 진행시키며 '근무조마다 최소 1명 당직' 불변식을 검사한다.
+    """
+    rng = random.Random(args.seed)
+    doctors = [(s, f"d{d}") for s in range(args.shifts) for d in range(args.doctors)]
+    index = OrderedIndex("on_call", doctors)
+    lm = LockManager(policy="detect")
+    ranges = KeyRangeLocker(lm, index)
+
+    active = {}  # t_id -> {"gen", "undo", "me", "ts", "sleep"}
+    next_id = 0
+
+    def spawn(me=None, ts=None, sleep=0):
+        nonlocal next_id
+        t_id = f"T{next_id}"
+        next_id += 1
+        ts = lm.begin(t_id, ts)
+        me = me or rng.choice(doctors)
+        undo = []
+        active[t_id] = {
+            "gen": _on_call_txn(mode, lm, ranges, index, t_id, me, undo),
+            "undo": undo,
+            "me": me,
+            "ts": ts,
+            "sleep": sleep,
+        }
+
+    for _ in range(args.mpl):
+        spawn()
+
+    commits = aborts = violations = 0
+    t0 = time.perf_counter()
+    for _ in range(args.steps):
+        for t_id in list(active):
+            st = active[t_id]
+            if st["sleep"]:
+                st["sleep"] -= 1
+                continue
+            try:
+                next(st["gen"])
+                continue
+            except StopIteration:
+                lm.release_all(t_id)
+                del active[t_id]
+                commits += 1
+                shift = st["me"][0]
+                if not index.range((shift, ""), (shift, "\uffff")):
+                    violations += 1
+                spawn()
+            except TxnAborted:
+                # 언두 로그를 거꾸로 적용해 롤백 후, 잠시 쉬었다가 같은 작업을 원래 ts로 재시작
+                # (바로 재시작하면 S 를 다시 잡아 같은 교착을 되풀이하는 livelock 이 생김)
+                for op, key in reversed(st["undo"]):
+                    if op == "delete":
+                        index.insert(key)
+                    else:
+                        index.delete(key)
+                lm.release_all(t_id)
+                del active[t_id]
+                aborts += 1
+                spawn(st["me"], st["ts"], sleep=rng.randint(1, args.mpl))
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "mode": mode,
+        "commits": commits,
+        "aborts": aborts,
+        "deadlocks": lm.stats["deadlocks"],
+        "invariant_violations": violations,
+        "commits_per_step": round(commits / args.steps, 3),
+        "commits_per_s": round(commits / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def bench_range(args):
+    """전역 서술 잠금 vs 인덱스 범위 잠금 vs 보호 없음(write skew 발생)"""
+    return [_run_range_workload(m, args) for m in ("predicate", "range", "none")]
+
+
+ENGINES = {"si": MVCCStore, "ssi": SSIStore, "2pl": TwoPLStore}
+
+
+def _run_engine_workload(engine: str, args):
+    """
+    같은 송금 워크로드를 begin/read/write/commit API 만으로 여러 스레드에서 돌린다.
+    - 트랜잭션: 계좌 두 개를 읽고 한쪽에서 1을 빼 다른 쪽에 더한 뒤 커밋
+    - 어보트(커밋 실패 또는 2PL 교착 희생)는 재시도하지 않고 세기만 한다
+    - 끝나면 총 잔고가 보존됐는지 확인
+    """
+    store = ENGINES[engine]()
+    t0 = store.begin()
+    for a in range(args.accounts):
+        t0.write(f"acct{a}", args.initial)
+    ok, _ = t0.commit()
+    assert ok
+
+    counts = {"commits": 0, "aborts": 0}
+    counter_lock = threading.Lock()
+
+    def worker(wid: int):
+        rng = random.Random(args.seed + wid)
+        commits = aborts = 0
+        for _ in range(args.txns_per_thread):
+            src, dst = rng.sample(range(args.accounts), 2)
+            t = store.begin()
+            try:
+                a = t.read(f"acct{src}")
+                b = t.read(f"acct{dst}")
+                t.write(f"acct{src}", a - 1)
+                t.write(f"acct{dst}", b + 1)
+                ok, _ = t.commit()
+            except TxnAborted:
+                ok = False
+            if ok:
+                commits += 1
+            else:
+                aborts += 1
+        with counter_lock:
+            counts["commits"] += commits
+            counts["aborts"] += aborts
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(args.threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    check = store.begin()
+    total = sum(check.read(f"acct{a}") for a in range(args.accounts))
+    check.commit()
+    attempts = counts["commits"] + counts["aborts"]
+    return {
+        "engine": engine,
+        "threads": args.threads,
+        "commits": counts["commits"],
+        "aborts": counts["aborts"],
+        "abort_rate": round(counts["aborts"] / attempts, 4) if attempts else 0.0,
+        "commits_per_s": round(counts["commits"] / elapsed, 1) if elapsed else 0.0,
+        "balance_conserved": total == args.accounts * args.initial,
+    }
+
+
+def bench_engines(args):
+    """SI / SSI / Strict 2PL 엔진을 같은 동시 워크로드로 비교"""
+    return [_run_engine_workload(e, args) for e in args.engines]
+
+
+def _print_csv(rows):
+    # 결과를 CSV로 표준출력(replication/bench.py 와 같은 형식)
+    headers = list(rows[0].keys())
+    print(",".join(headers))
+    for row in rows:
+        print(",".join(str(row.get(h, "")) for h in headers))
+
+
+def main():
+    """명령행 인자를 파싱하고 각 벤치마크를 실행"""
+    p = argparse.ArgumentParser(description="DDIA Ch.7 락 매니저 벤치마크")
+    sub = p.add_subparsers(dest="mode", required=True)
+
+    # ---------------- 교착 상태 처리 ----------------
+    pd = sub.add_parser("deadlock")
+    # 동시에 진행 중인 트랜잭션 수(multiprogramming level)
+    pd.add_argument("--mpl", type=int, default=16)
+    # 키 공간 크기(작을수록 경합↑)
+    pd.add_argument("--keys", type=int, default=64)
+    # 트랜잭션당 락 요청 수
+    pd.add_argument("--locks-per-txn", type=int, default=4)
+    # X 락 비율
+    pd.add_argument("--write-ratio", type=float, default=0.5)
+    # 스케줄러 라운드 수
+    pd.add_argument("--steps", type=int, default=2000)
+    # 주기 탐지 간격(라운드)
+    pd.add_argument("--detect-every", type=int, default=10)
+    pd.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 락 테이블 확장성 ----------------
+    pt = sub.add_parser("locktable")
+    # 비교할 파티션 수 목록(1 = 전역 래치 하나)
+    pt.add_argument("--partitions", type=int, nargs="+", default=[1, 64])
+    pt.add_argument("--threads", type=int, default=8)
+    pt.add_argument("--txns-per-thread", type=int, default=20000)
+    pt.add_argument("--locks-per-txn", type=int, default=4)
+    # 서로 다른 키 수(수백만 개여도 메모리는 동시에 잡힌 락 수에만 비례)
+    pt.add_argument("--keys", type=int, default=5_000_000)
+    pt.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 다중 단위 잠금/승격 ----------------
+    pg = sub.add_parser("granularity")
+    # 비교할 승격 임계값 목록(0 = 승격 안 함)
+    pg.add_argument("--thresholds", type=int, nargs="+", default=[0, 100])
+    # 포인트 트랜잭션 스레드 수
+    pg.add_argument("--threads", type=int, default=4)
+    pg.add_argument("--tables", type=int, default=4)
+    pg.add_argument("--rows", type=int, default=2000)
+    pg.add_argument("--rows-per-page", type=int, default=100)
+    pg.add_argument("--seconds", type=float, default=2.0)
+    pg.add_argument("--seed", type=int, default=42)
+
+    # ---------------- 인덱스 범위 잠금 vs 서술 잠금 ----------------
+    pr = sub.add_parser("range")
+    pr.add_argument("--shifts", type=int, default=16)
+    pr.add_argument("--doctors", type=int, default=4)
+    pr.add_argument("--mpl", type=int, default=16)
+    pr.add_argument("--steps", type=int, default=2000)
+    pr.add_argument("--seed", type=int, default=42)
+
+    # ---------------- SI vs SSI vs 2PL 엔진 ----------------
+    pe = sub.add_parser("engines")
+    pe.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    pe.add_argument("--threads", type=int, default=4)
+    pe.add_argument("--accounts", type=int, default=100)
+    pe.add_argument("--initial", type=int, default=1000)
+    pe.add_argument("--txns-per-thread", type=int, default=1000)
+    pe.add_argument("--seed", type=int, default=42)
+
+    args = p.parse_args()
+
+    if args.mode == "deadlock":
+        rows = bench_deadlock(args)
+    elif args.mode == "locktable":
+        rows = bench_locktable(args)
+    elif args.mode == "granularity":
+        rows = bench_granularity(args)
+    elif args.mode == "range":
+        rows = bench_range(args)
+    else:
+        rows = bench_engines(args)
+
+    _print_csv(rows)
+
+
+if __name__ == "__main__":
+    main()
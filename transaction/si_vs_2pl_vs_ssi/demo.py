@@ -18,7 +18,7 @@ def run():
     print("[SSI: 상호 rw 사이클 → 나중 커미터 abort]")
     print(" ->", demo_SSI())
 
-    print("[2PL + 서술 잠금 락 흉내: write skew 방지]")
+    print("[2PL + 인덱스 범위 잠금: write skew 방지]")
     print(" ->", demo_2pl())
 
 if __name__ == "__main__":
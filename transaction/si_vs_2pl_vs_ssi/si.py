@@ -12,6 +12,7 @@ class MVCCStore:
         self.data = {}       # key -> list[(start_tid, end_tid, value)]
         self._next_tid = 1   # 증가하는 타임스탬프/트랜잭션 ID
         self._lock = Lock()  # _next_tid 보호용
+        self._commit_lock = Lock()  # 충돌 검사~반영을 한 덩어리로(동시 커밋 간 경쟁 방지)
 
     def _alloc_tid(self) -> int:
         # 전역 타임스탬프 발급 (단조 증가)
@@ -96,12 +97,13 @@ class MVCCTransaction:
         self.write_set[key] = value
 
     def commit(self):
-        # WW 충돌만 감지
-        if self.store._check_ww_conflicts(self):
-            self.active = False
-            return False, "write-write conflict -> abort"
-        commit_tid = self.store._alloc_tid()
-        self.store._write_commit(self, commit_tid)
+        with self.store._commit_lock:
+            # WW 충돌만 감지
+            if self.store._check_ww_conflicts(self):
+                self.active = False
+                return False, "write-write conflict -> abort"
+            commit_tid = self.store._alloc_tid()
+            self.store._write_commit(self, commit_tid)
         self.active = False
         return True, commit_tid
 
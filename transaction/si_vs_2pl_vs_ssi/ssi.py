@@ -25,6 +25,8 @@ class SSIStore:
         # 전역 timestamp/tx id
         self._next_tid = 1
         self._tid_lock = Lock()
+        # 커밋 검사(rw-edge 추가 ~ 위험 구조 판정 ~ 반영)를 한 덩어리로 묶는 락
+        self._commit_lock = Lock()
 
         # SIREAD(읽기 발자국): key -> set(tid)
         # - 진짜 DB처럼 복잡한 수명 관리 대신, 데모에 필요한 동안은 유지한다.
@@ -131,7 +133,8 @@ class SSIStore:
         해당 key를 읽은(reader) 트랜잭션들과의 rw-edge를 추가한다.
         """
         for key in write_keys:
-            readers = self.sireads.get(key, set())
+            # 동시에 다른 스레드가 SIREAD 를 추가할 수 있으니 복사본으로 순회
+            readers = list(self.sireads.get(key, ()))
             for r_tid in readers:
                 if r_tid == writer_tid:
                     continue
@@ -153,6 +156,11 @@ class SSIStore:
     # ---------- 커밋/어보트 ----------
 
     def _commit(self, tid: int):
+        # 동시 커밋끼리 검사와 반영이 섞이지 않도록 직렬화
+        with self._commit_lock:
+            return self._commit_locked(tid)
+
+    def _commit_locked(self, tid: int):
         """
         커밋 절차(간이 SSI):
         1) 우선 커밋 타임스탬프 할당
@@ -1,103 +1,780 @@
-class RWLock:
+import time
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+
+
+class TxnAborted(Exception):
+    """
+    락 매니저가 트랜잭션을 어보트시켰음을 알리는 예외.
+    - 데드락 희생자(victim)로 선택되었거나
+    - wait-die 에서 'die', wound-wait 에서 'wound' 당한 경우
+    """
+    def __init__(self, t_id, reason: str):
+        super().__init__(f"{t_id}: {reason}")
+        self.t_id = t_id
+        self.reason = reason
+
+
+# 다중 단위(multi-granularity) 잠금 모드
+# - IS/IX: 하위(페이지/로우)에서 S/X를 잡겠다는 '의도' 표시
+# - SIX  : 전체를 S로 읽으면서 일부 하위를 X로 고치겠다는 뜻(S + IX)
+MODES = ("IS", "IX", "S", "SIX", "X")
+
+# 표준 호환성 행렬: (이미 잡힌 모드, 요청 모드) -> 동시에 허용?
+COMPATIBLE = {
+    "IS":  {"IS": True,  "IX": True,  "S": True,  "SIX": True,  "X": False},
+    "IX":  {"IS": True,  "IX": True,  "S": False, "SIX": False, "X": False},
+    "S":   {"IS": True,  "IX": False, "S": True,  "SIX": False, "X": False},
+    "SIX": {"IS": True,  "IX": False, "S": False, "SIX": False, "X": False},
+    "X":   {"IS": False, "IX": False, "S": False, "SIX": False, "X": False},
+}
+
+
+def _supremum(held, requested):
     """
-    연습용 Read/Write 락.
-    - 다수 Shared(S) 또는 단일 Exclusive(X)
+    같은 트랜잭션이 이미 held 를 가진 상태에서 requested 를 더 요청하면 최종적으로 갖게 될 모드.
+    - 예) S + IX = SIX, IS + X = X
+    """
+    if held is None or held == requested:
+        return requested
+    pair = {held, requested}
+    if "X" in pair:
+        return "X"
+    if "SIX" in pair or pair == {"S", "IX"}:
+        return "SIX"
+    # 남은 경우는 IS + (IX|S) → 더 강한 쪽
+    return (pair - {"IS"}).pop()
+
+
+class GranularLock:
+    """
+    연습용 다중 모드 락(IS/IX/S/SIX/X).
+    - 트랜잭션별로 '지금 가진 모드' 하나를 기억하고, 추가 요청은 상위 모드로 합쳐서(승격) 판단
+    - S/X 만 쓰면 기존 Read/Write 락과 똑같이 동작
     - 공정성/대기열은 생략 (데모 목적)
     """
     def __init__(self):
-        self.readers = []
-        self.writer = None
+        self.granted = {}  # t_id -> mode
 
-    def acquire_shared(self, t_id) -> bool:
-        if self.writer:
-            return False
-        self.readers.append(t_id)
-        return True
+    def holders(self) -> set:
+        return set(self.granted)
+
+    def idle(self) -> bool:
+        return not self.granted
 
-    def release_shared(self, t_id):
-        assert len(self.readers) > 0
-        self.readers.remove(t_id)
+    def blockers(self, t_id, mode: str) -> set:
+        # mode 로 승격하려 할 때 호환되지 않는 다른 보유자들(wait-for 간선의 목적지)
+        want = _supremum(self.granted.get(t_id), mode)
+        return {
+            other for other, held in self.granted.items()
+            if other != t_id and not COMPATIBLE[held][want]
+        }
 
-    def acquire_exclusive(self, t_id) -> bool:
-        if self.writer or len(self.readers) > 1 or t_id not in self.readers:
+    def acquire(self, t_id, mode: str) -> bool:
+        if self.blockers(t_id, mode):
             return False
-        self.writer = t_id
-        self.readers = []
+        self.granted[t_id] = _supremum(self.granted.get(t_id), mode)
         return True
 
-    def release_exclusive(self, t_id):
-        assert self.writer is t_id
-        self.writer = None
+    def release(self, t_id):
+        del self.granted[t_id]
+
+
+class _LockPartition:
+    """
+    락 테이블의 한 조각(partition).
+    - 자기 구간의 name -> GranularLock 만 들고, 자기 래치(latch)로만 보호한다.
+    - 락 객체는 처음 요청될 때 만들고, 아무도 안 잡고 있게 되면 바로 회수한다.
+    """
+    def __init__(self):
+        self.latch = Lock()
+        self.locks = {}       # name -> GranularLock (지금 누군가 잡고 있는 것만)
+        # 경합 측정용 카운터(래치 안에서만 갱신)
+        self.requests = 0     # 래치 획득 횟수
+        self.contended = 0    # 래치가 이미 잡혀 있어 기다려야 했던 횟수
+        self.allocs = 0       # 락 객체 생성 수
+        self.frees = 0        # 락 객체 회수 수
+
+    def enter(self):
+        # 바로 못 잡으면 경합으로 센다
+        contended = not self.latch.acquire(blocking=False)
+        if contended:
+            self.latch.acquire()
+        self.requests += 1
+        self.contended += contended
 
 
 class LockManager:
     """
-    키 이름(혹은 서술 잠금 이름)별로 RWLock을 관리.
+    키 이름(혹은 서술 잠금 이름)별로 GranularLock을 관리.
     - 2PL 흉내를 내는 데 사용.
+    - 락을 못 잡으면 wait-for 그래프에 (대기자 -> 보유자) 간선을 기록한다.
+
+    계층 잠금(multi-granularity)
+    - try_acquire_path(("doctors", "p0", "A_on"), "X", t) 처럼 table→page→row 경로로 요청하면
+      상위에는 의도 락(IS/IX)을, 말단에는 요청 모드를 위에서부터 차례로 잡는다.
+    - 상위에 이미 S/SIX/X 가 있어 말단을 덮으면(covering) 하위 락은 생략.
+    - 한 트랜잭션이 한 테이블 아래에 escalation_threshold 개를 넘는 세밀한 락을 쥐면
+      테이블 락(S 또는 X) 하나로 승격(escalation)하고 하위 락들을 풀어준다.
+
+    락 테이블
+    - 이름의 해시로 n_partitions 개 파티션에 나눠 담고, 파티션마다 래치 하나씩.
+      → 서로 다른 파티션의 요청은 동시에 진행된다(전역 뮤텍스 없음).
+    - 보유자가 없는 락 객체는 해제 즉시 회수 → 메모리는 '지금 잡힌 락 수'에 비례.
+    - wait-for 그래프/트랜잭션 메타는 충돌 경로에서만 만지므로 별도 래치 하나로 보호.
+
+    교착 상태 처리 정책(policy)
+    - "detect"    : wait-for 그래프의 사이클을 찾아 희생자를 고른다.
+                    periodic=False 면 대기가 생길 때마다(점진적),
+                    True 면 detect_deadlocks() 를 주기적으로 호출할 때만 검사.
+                    희생자는 '보유 락이 가장 적고, 그 중 가장 젊은' 트랜잭션.
+    - "wait-die"  : 오래된 트랜잭션만 기다리고, 젊은 요청자는 즉시 어보트(die).
+    - "wound-wait": 오래된 요청자는 젊은 보유자를 어보트(wound)시키고, 젊은 요청자는 기다린다.
+
+    어보트된 트랜잭션은 다음 try_acquire 에서 TxnAborted 를 받고,
+    호출자가 자기 쓰기를 되돌린 뒤 release_all() 로 락을 푼다.
     """
-    def __init__(self):
-        self.locks = {}  # name -> RWLock
+    POLICIES = ("detect", "wait-die", "wound-wait")
+
+    def __init__(self, policy: str = "detect", periodic: bool = False, n_partitions: int = 64,
+                 escalation_threshold: int = 1000):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}")
+        self.policy = policy
+        self.periodic = periodic
+        # 0 이하이면 승격하지 않는다
+        self.escalation_threshold = escalation_threshold
+        self.partitions = [_LockPartition() for _ in range(n_partitions)]
 
-    def _get(self, name: str) -> RWLock:
-        if name not in self.locks:
-            self.locks[name] = RWLock()
-        return self.locks[name]
+        # wait-for 그래프와 트랜잭션 메타 보호용 래치
+        # (순서: 그래프 래치 → 파티션 래치. 파티션 래치를 쥔 채 그래프 래치를 잡지 않는다)
+        self._latch = Lock()
+        self._next_ts = 0
+        self.start_ts = {}    # t_id -> 시작 순서(작을수록 오래된 트랜잭션)
+        self.held = {}        # t_id -> {name: mode}
+        self.fine_counts = {} # t_id -> {table: 그 테이블 아래에 쥔 말단(페이지/로우) 락 수}
+        self.fine_names = {}  # t_id -> fine_counts 에 센 말단 락 이름들(상위 의도 락은 세지 않음)
+        self.waits_for = {}   # t_id -> set(t_id)  (wait-for 그래프)
+        self.waiting_on = {}  # t_id -> 기다리는 락 이름
+        self.lock_waiters = {}  # 락 이름 -> 그 락을 기다리는 t_id 집합(해제 시 간선 정리용)
+        self.wait_since = {}  # t_id -> 대기가 시작된 시각(perf_counter)
+        self.aborted = {}     # t_id -> 어보트 사유 (호출자가 release_all 할 때까지 유지)
+
+        # 측정용 카운터
+        # - detect_latency: 사이클이 완성된 시점부터 탐지될 때까지 걸린 시간(초) 누적
+        # - false_aborts: wait-die/wound-wait 로 어보트했지만 실제 사이클은 없던 경우
+        self.stats = {
+            "waits": 0,
+            "deadlocks": 0,
+            "aborts": 0,
+            "false_aborts": 0,
+            "detect_latency_sum": 0.0,
+            "detect_latency_max": 0.0,
+            "escalations": 0,
+        }
+
+    def _partition(self, name: str) -> _LockPartition:
+        return self.partitions[hash(name) % len(self.partitions)]
+
+    def lock_count(self) -> int:
+        """지금 메모리에 살아 있는 락 객체 수(= 누군가 잡고 있는 이름 수)"""
+        return sum(len(p.locks) for p in self.partitions)
+
+    def partition_stats(self):
+        """파티션별 경합 카운터 목록"""
+        return [
+            {
+                "requests": p.requests,
+                "contended": p.contended,
+                "live": len(p.locks),
+                "allocs": p.allocs,
+                "frees": p.frees,
+            }
+            for p in self.partitions
+        ]
+
+    # ---------- 트랜잭션 등록/정리 ----------
+
+    def begin(self, t_id, ts=None):
+        """
+        트랜잭션의 나이(timestamp)를 등록한다.
+        - 재시작한 트랜잭션에 원래 ts를 넘기면 기아(starvation) 없이 점점 '오래된' 쪽이 된다.
+        - 등록 없이 try_acquire 하면 첫 요청 시점에 자동 등록.
+        """
+        with self._latch:
+            if ts is None:
+                ts = self._next_ts
+                self._next_ts += 1
+            self.start_ts[t_id] = ts
+            self.held.setdefault(t_id, {})
+        return ts
+
+    def release_all(self, t_id):
+        """
+        커밋/어보트 시 트랜잭션의 모든 락을 풀고 메타데이터를 지운다(strict 2PL의 두 번째 단계).
+        """
+        for name, mode in list(self.held.get(t_id, {}).items()):
+            self.release(name, mode, t_id)
+        with self._latch:
+            self._clear_waits(t_id)
+            # 끝난 트랜잭션을 기다리던 간선도 지운다(남겨두면 가짜 사이클이 생김)
+            for waiters in self.waits_for.values():
+                waiters.discard(t_id)
+            self.held.pop(t_id, None)
+            self.fine_counts.pop(t_id, None)
+            self.fine_names.pop(t_id, None)
+            self.start_ts.pop(t_id, None)
+            self.aborted.pop(t_id, None)
+
+    # ---------- 락 획득/해제 ----------
+
+    def _grant(self, name: str, mode: str, t_id):
+        """
+        파티션 래치 하나만 잡고 락을 부여해 본다(빠른 경로).
+        - 성공하면 (True, None), 실패하면 (False, 막고 있는 보유자 집합)
+        """
+        part = self._partition(name)
+        part.enter()
+        try:
+            lk = part.locks.get(name)
+            if lk is None:
+                lk = part.locks[name] = GranularLock()
+                part.allocs += 1
+            if not lk.acquire(t_id, mode):
+                return False, lk.blockers(t_id, mode)
+            self.held[t_id][name] = lk.granted[t_id]
+            return True, None
+        finally:
+            part.latch.release()
 
     def try_acquire(self, name: str, mode: str, t_id: str) -> bool:
-        lk = self._get(name)
-        if mode == "S":
-            return lk.acquire_shared(t_id)
-        if mode == "X":
-            return lk.acquire_exclusive(t_id)
-        raise ValueError("mode must be 'S' or 'X'")
+        """
+        락을 즉시 잡아보고 성공 여부를 돌려준다(대기는 호출자가 재시도로 표현).
+        - mode 는 IS/IX/S/SIX/X 중 하나. 이미 가진 모드가 있으면 둘을 합친 모드로 승격.
+        - 실패하면 wait-for 간선을 남기고, 정책에 따라 교착을 처리한다.
+        - 요청자 자신이 어보트 대상이면 TxnAborted 를 던진다.
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if t_id in self.aborted:
+            raise TxnAborted(t_id, self.aborted[t_id])
+        if t_id not in self.start_ts:
+            self.begin(t_id)
+
+        ok, blockers = self._grant(name, mode, t_id)
+        if ok:
+            if t_id in self.waits_for:
+                with self._latch:
+                    self._clear_waits(t_id)
+            return True
+
+        # 느린 경로: 충돌 → wait-for 그래프 갱신
+        if self.policy == "detect":
+            return self._on_conflict_detect(name, t_id, blockers)
+        if self.policy == "wait-die":
+            return self._on_conflict_wait_die(name, t_id, blockers)
+        return self._on_conflict_wound_wait(name, t_id, blockers)
+
+    def acquire(self, name: str, mode: str, t_id, timeout=None) -> bool:
+        """
+        try_acquire 가 성공할 때까지 기다린다(스레드용 블로킹 버전).
+        - 짧게 자고 다시 시도하며, 대기 간격은 최대 10ms 까지 두 배씩 늘린다.
+        - 교착 희생자가 되면 TxnAborted 가 그대로 전달된다.
+        - timeout(초)이 지나면 False.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        delay = 0.0005
+        while not self.try_acquire(name, mode, t_id):
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.01)
+        return True
 
     def release(self, name: str, mode: str, t_id: str):
-        lk = self._get(name)
-        if mode == "S":
-            lk.release_shared(t_id)
-        elif mode == "X":
-            lk.release_exclusive(t_id)
+        """
+        name 에 대해 t_id 가 가진 락을 푼다(승격된 경우에도 실제로 가진 모드 전체를 해제).
+        """
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        # 그래프 래치 → 파티션 래치 순서(release_all 의 메타 정리, 교착 탐지와 같은 래치)
+        with self._latch:
+            # held 항목을 먼저 빼는 쪽이 실제 해제를 맡는다
+            # (희생자 정리와 본인의 release_all 이 겹쳐도 두 번 풀지 않도록)
+            held_mode = self.held.get(t_id, {}).pop(name, None)
+            if held_mode is None:
+                return
+            counted = self.fine_names.get(t_id)
+            if counted and name in counted:
+                # try_acquire_path 가 센 말단 락만 되돌린다(페이지 의도 락을 풀어도 카운트는 그대로)
+                counted.discard(name)
+                counts = self.fine_counts.get(t_id)
+                table = name.split("/", 1)[0]
+                if counts and counts.get(table):
+                    counts[table] -= 1
+            part = self._partition(name)
+            part.enter()
+            try:
+                lk = part.locks[name]
+                lk.release(t_id)
+                # 아무도 안 잡은 락 객체는 회수
+                if lk.idle():
+                    del part.locks[name]
+                    part.frees += 1
+            finally:
+                part.latch.release()
+            # 이 락을 기다리던 트랜잭션의 t_id 간선은 더 이상 사실이 아님
+            # (남겨 두면 주기적 탐지가 없는 사이클을 찾아 희생자를 괜히 어보트)
+            for waiter in self.lock_waiters.get(name, ()):
+                edges = self.waits_for.get(waiter)
+                if edges:
+                    edges.discard(t_id)
+
+    # ---------- 계층 잠금 ----------
+
+    @staticmethod
+    def path_names(path):
+        """("t", "p0", "r1") -> ["t", "t/p0", "t/p0/r1"]"""
+        return ["/".join(path[:i + 1]) for i in range(len(path))]
+
+    def _covered(self, names, mode: str, t_id) -> bool:
+        # 상위 노드에 이미 말단 요청을 덮는 락이 있는지(X는 전부, S/SIX는 읽기를 덮음)
+        held = self.held.get(t_id, {})
+        for name in names[:-1]:
+            have = held.get(name)
+            if have == "X" or (have in ("S", "SIX") and mode in ("S", "IS")):
+                return True
+        return False
+
+    def try_acquire_path(self, path, mode: str, t_id) -> bool:
+        """
+        table→page→row 경로를 위에서부터 잠근다.
+        - 상위 노드: 말단이 S/IS 면 IS, 그 외(IX/SIX/X)면 IX
+        - 말단 노드: 요청 모드 그대로
+        - 중간에 막히면 False(이미 잡은 상위 의도 락은 유지 → 재시도 시 그대로 재사용)
+        """
+        names = self.path_names(path)
+        if self._covered(names, mode, t_id):
+            return True
+        intent = "IS" if mode in ("S", "IS") else "IX"
+        for name in names[:-1]:
+            if not self.try_acquire(name, intent, t_id):
+                return False
+        leaf = names[-1]
+        is_new = leaf not in self.held.get(t_id, {})
+        if not self.try_acquire(leaf, mode, t_id):
+            return False
+        if is_new and len(names) > 1:
+            table = names[0]
+            counts = self.fine_counts.setdefault(t_id, {})
+            counts[table] = counts.get(table, 0) + 1
+            self.fine_names.setdefault(t_id, set()).add(leaf)
+            if 0 < self.escalation_threshold < counts[table]:
+                self._escalate(table, t_id)
+        return True
+
+    def _escalate(self, table: str, t_id) -> bool:
+        """
+        테이블 아래의 세밀한 락들을 테이블 락 하나로 바꾼다.
+        - 하위에 X 계열이 하나라도 있으면 X, 아니면 S
+        - 다른 트랜잭션과 충돌해 바로 못 잡으면 기다리지 않고 세밀한 락을 그대로 유지
+        """
+        prefix = table + "/"
+        held = self.held.get(t_id, {})
+        fine = [(n, m) for n, m in list(held.items()) if n.startswith(prefix)]
+        target = "X" if any(m in ("IX", "SIX", "X") for _, m in fine) else "S"
+        ok, _ = self._grant(table, target, t_id)
+        if not ok:
+            return False
+        for name, held_mode in fine:
+            self.release(name, held_mode, t_id)
+        self.fine_counts.get(t_id, {}).pop(table, None)
+        with self._latch:
+            self.stats["escalations"] += 1
+        return True
+
+    # ---------- wait-for 그래프 ----------
+
+    def _add_waits(self, t_id, blockers: set, name: str):
+        if t_id not in self.waits_for:
+            self.stats["waits"] += 1
+            self.wait_since[t_id] = time.perf_counter()
+        self.waits_for[t_id] = set(blockers)
+        prev = self.waiting_on.get(t_id)
+        if prev != name:
+            if prev is not None:
+                self._drop_waiter(prev, t_id)
+            self.waiting_on[t_id] = name
+            self.lock_waiters.setdefault(name, set()).add(t_id)
+
+    def _clear_waits(self, t_id):
+        self.waits_for.pop(t_id, None)
+        self.wait_since.pop(t_id, None)
+        name = self.waiting_on.pop(t_id, None)
+        if name is not None:
+            self._drop_waiter(name, t_id)
+
+    def _drop_waiter(self, name: str, t_id):
+        waiters = self.lock_waiters.get(name)
+        if waiters is not None:
+            waiters.discard(t_id)
+            if not waiters:
+                del self.lock_waiters[name]
+
+    def _find_cycle(self, start):
+        """
+        start 에서 출발해 start 로 돌아오는 wait-for 경로를 찾는다(DFS).
+        - 있으면 사이클에 속한 트랜잭션 목록, 없으면 None.
+        """
+        stack = [(start, iter(self.waits_for.get(start, ())))]
+        path = [start]
+        visited = {start}
+        while stack:
+            node, it = stack[-1]
+            nxt = next(it, None)
+            if nxt is None:
+                stack.pop()
+                path.pop()
+                continue
+            if nxt == start:
+                return list(path)
+            if nxt in visited:
+                continue
+            visited.add(nxt)
+            path.append(nxt)
+            stack.append((nxt, iter(self.waits_for.get(nxt, ()))))
+        return None
+
+    def _pick_victim(self, cycle):
+        # 비용이 가장 작은 트랜잭션: 보유 락 수가 적고, 같다면 가장 젊은(ts가 큰) 것
+        return min(cycle, key=lambda t: (len(self.held.get(t, {})), -self.start_ts.get(t, 0)))
+
+    def _resolve_cycle(self, cycle):
+        # 사이클은 마지막 구성원이 대기를 시작한 순간 완성된다 → 그때부터 지금까지가 탐지 지연
+        formed_at = max(self.wait_since.get(t, time.perf_counter()) for t in cycle)
+        latency = time.perf_counter() - formed_at
+        self.stats["deadlocks"] += 1
+        self.stats["detect_latency_sum"] += latency
+        self.stats["detect_latency_max"] = max(self.stats["detect_latency_max"], latency)
+        victim = self._pick_victim(cycle)
+        self._abort(victim, "deadlock victim")
+        return victim
+
+    def detect_deadlocks(self):
+        """
+        wait-for 그래프 전체에서 사이클을 찾아 모두 끊는다(주기적 탐지용).
+        - 끊으면서 어보트한 희생자 목록을 돌려준다.
+        """
+        victims = []
+        with self._latch:
+            for t_id in list(self.waits_for):
+                if t_id not in self.waits_for:
+                    continue
+                cycle = self._find_cycle(t_id)
+                while cycle:
+                    victims.append(self._resolve_cycle(cycle))
+                    cycle = self._find_cycle(t_id) if t_id in self.waits_for else None
+        return victims
+
+    def _abort(self, victim, reason: str):
+        """
+        희생자를 어보트 대상으로 표시하고 wait-for 간선을 끊는다(그래프 래치 안에서 호출).
+        - 락은 여기서 풀지 않는다: 희생자가 다음 요청에서 TxnAborted 를 받고
+          자기 쓰기를 되돌린 뒤 release_all() 로 직접 푼다(되돌리기 전 값이 새어 나가지 않도록).
+        """
+        self._clear_waits(victim)
+        self.aborted[victim] = reason
+        self.stats["aborts"] += 1
+
+    def _would_deadlock(self, t_id, blockers: set) -> bool:
+        # 이 요청이 그냥 기다렸다면 사이클이 생겼을까? (아니라면 예방적 어보트는 불필요한 'false' 어보트)
+        prev = self.waits_for.get(t_id)
+        self.waits_for[t_id] = set(blockers)
+        cycle = self._find_cycle(t_id)
+        if prev is None:
+            self.waits_for.pop(t_id, None)
         else:
-            raise ValueError("mode must be 'S' or 'X'")
+            self.waits_for[t_id] = prev
+        return cycle is not None
+
+    # ---------- 정책별 충돌 처리 ----------
+
+    def _on_conflict_detect(self, name: str, t_id, blockers: set) -> bool:
+        with self._latch:
+            if t_id in self.aborted:
+                raise TxnAborted(t_id, self.aborted[t_id])
+            self._add_waits(t_id, blockers, name)
+            if self.periodic:
+                return False
+            cycle = self._find_cycle(t_id)
+            if not cycle:
+                return False
+            victim = self._resolve_cycle(cycle)
+            if victim == t_id:
+                raise TxnAborted(t_id, self.aborted[t_id])
+        # 다른 트랜잭션이 희생됨 → 그쪽이 정리하고 락을 풀 때까지 계속 대기
+        return False
+
+    def _on_conflict_wait_die(self, name: str, t_id, blockers: set) -> bool:
+        with self._latch:
+            if t_id in self.aborted:
+                raise TxnAborted(t_id, self.aborted[t_id])
+            my_ts = self.start_ts[t_id]
+            if all(my_ts < self.start_ts.get(b, my_ts) for b in blockers):
+                # 모든 보유자보다 오래됨 → 기다린다
+                self._add_waits(t_id, blockers, name)
+                return False
+            # 젊은 요청자 → die
+            if not self._would_deadlock(t_id, blockers):
+                self.stats["false_aborts"] += 1
+            self._abort(t_id, "wait-die: younger requester dies")
+            raise TxnAborted(t_id, self.aborted[t_id])
+
+    def _on_conflict_wound_wait(self, name: str, t_id, blockers: set) -> bool:
+        with self._latch:
+            if t_id in self.aborted:
+                raise TxnAborted(t_id, self.aborted[t_id])
+            my_ts = self.start_ts[t_id]
+            younger = {b for b in blockers if self.start_ts.get(b, my_ts) > my_ts}
+            if not younger:
+                # 보유자가 모두 더 오래됨 → 기다린다
+                self._add_waits(t_id, blockers, name)
+                return False
+            # 오래된 요청자 → 젊은 보유자들을 wound 하고, 그들이 물러날 때까지 대기
+            needless = not self._would_deadlock(t_id, blockers)
+            for b in sorted(younger, key=str):
+                if b not in self.aborted:
+                    self.stats["false_aborts"] += needless
+                    self._abort(b, "wound-wait: wounded by older transaction")
+            self._add_waits(t_id, blockers, name)
+            return False
+
+
+class TwoPLStore:
+    """
+    연습용 Strict 2PL 트랜잭션 KV 스토어. MVCCStore/SSIStore 와 같은 API.
+    - read(): S 락을 잡고 현재 값을 읽는다(스냅샷 없음, 단일 버전).
+    - write(): X 락을 잡고 제자리에서 바로 고친다. 이전 값은 언두 로그에 남긴다.
+    - commit(): 모든 락을 한 번에 해제(strict 2PL).
+    - abort(): 언두 로그를 거꾸로 적용해 되돌린 뒤 락 해제.
+    - 교착 희생자가 되면 read()/write() 가 TxnAborted 를 던지고, 트랜잭션은 이미 어보트된 상태.
+    """
+    def __init__(self, policy: str = "detect"):
+        self.data = {}       # key -> value
+        self.lm = LockManager(policy=policy)
+        self._next_tid = 1
+        self._lock = Lock()  # _next_tid 보호용
+
+    def _alloc_tid(self) -> int:
+        with self._lock:
+            tid = self._next_tid
+            self._next_tid += 1
+            return tid
+
+    def begin(self):
+        """
+        트랜잭션 시작.
+        - tid 가 곧 나이(작을수록 오래됨)가 되어 희생자 선택/wait-die/wound-wait 에 쓰인다.
+        """
+        ts = self._alloc_tid()
+        self.lm.begin(ts, ts)
+        return TwoPLTransaction(self, ts)
+
+
+_MISSING = object()  # 언두 로그에서 '원래 키가 없었음'을 나타내는 표시
+
+
+class TwoPLTransaction:
+    """
+    Strict 2PL 트랜잭션 객체.
+    - read(): S 락 후 읽기
+    - write(): X 락 후 제자리 쓰기 + 언두 로그
+    - commit()/abort(): (ok, info) 튜플을 돌려준다
+    """
+    def __init__(self, store: TwoPLStore, ts: int):
+        self.store = store
+        self.ts = ts
+        self.undo_log = []  # [(key, 이전 값 or _MISSING)]
+        self.active = True
+
+    def _lock(self, key: str, mode: str):
+        if not self.active:
+            raise TxnAborted(self.ts, "already finished")
+        try:
+            self.store.lm.acquire(key, mode, self.ts)
+        except TxnAborted as e:
+            self.abort(e.reason)
+            raise
+
+    def read(self, key: str):
+        self._lock(key, "S")
+        return self.store.data.get(key)
+
+    def write(self, key: str, value):
+        self._lock(key, "X")
+        self.undo_log.append((key, self.store.data.get(key, _MISSING)))
+        self.store.data[key] = value
+
+    def commit(self):
+        if not self.active:
+            return False, "already finished"
+        # 기다리지 않는 동안 wound 당했을 수 있다 → 커밋 대신 어보트
+        reason = self.store.lm.aborted.get(self.ts)
+        if reason is not None:
+            return self.abort(reason)
+        commit_tid = self.store._alloc_tid()
+        self.active = False
+        self.store.lm.release_all(self.ts)
+        return True, commit_tid
+
+    def abort(self, reason="manual abort"):
+        if not self.active:
+            return False, "already finished"
+        # 아직 X 락을 쥐고 있으므로 다른 트랜잭션은 되돌리는 중간 상태를 볼 수 없다
+        for key, old in reversed(self.undo_log):
+            if old is _MISSING:
+                self.store.data.pop(key, None)
+            else:
+                self.store.data[key] = old
+        self.undo_log = []
+        self.active = False
+        self.store.lm.release_all(self.ts)
+        return False, reason
+
+
+class OrderedIndex:
+    """
+    정렬된 인덱스(연습용). 키는 서로 비교 가능한 값(예: (shift, doctor) 튜플).
+    - 범위 잠금에서 '범위 다음 키(next key)'를 찾는 데 사용.
+    """
+    def __init__(self, name: str, keys=()):
+        self.name = name
+        self.keys = sorted(keys)
+
+    def __contains__(self, key) -> bool:
+        i = bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i] == key
+
+    def range(self, lo, hi):
+        # lo <= key <= hi 인 키들(정렬 순)
+        return self.keys[bisect_left(self.keys, lo):bisect_right(self.keys, hi)]
+
+    def next_key(self, key):
+        # key 보다 큰 가장 작은 키(없으면 None = +inf)
+        i = bisect_right(self.keys, key)
+        return self.keys[i] if i < len(self.keys) else None
+
+    def insert(self, key):
+        if key not in self:
+            insort(self.keys, key)
+
+    def delete(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+
+class KeyRangeLocker:
+    """
+    인덱스 범위 잠금(next-key locking, key-range 방식).
+    - 키 k 의 락은 'k 자체 + 바로 앞 키와 k 사이의 틈(gap)'을 함께 덮는다.
+    - 범위 [lo, hi] 읽기: 범위 안의 키들 + 범위 다음 키(없으면 +inf)에 S
+      → 읽은 범위의 틈이 전부 막혀 그 안으로의 삽입(팬텀)이 불가능.
+    - 삽입 k : k 의 다음 키에 IX(삽입 의도) → 그 틈을 읽은 S 와는 충돌, 삽입끼리는 호환.
+               새 키 k 자체에는 X.
+    - 삭제 k : k 와 k 의 다음 키에 X → k 를 읽은(S) 트랜잭션과 충돌하고,
+               k 가 인덱스에서 빠져 합쳐진 틈(다음 키가 덮음)을 스캔하는 트랜잭션도 X 에 막힌다.
+    서술 잠금 하나를 모두가 잡는 것과 달리, 실제로 읽은 범위가 겹칠 때만 충돌한다.
+    모든 메서드는 try_acquire 처럼 못 잡으면 False/None 을 돌려주고, 재시도는 호출자 몫.
+    """
+    def __init__(self, lm: LockManager, index: OrderedIndex):
+        self.lm = lm
+        self.index = index
+
+    def lock_name(self, key) -> str:
+        return f"range:{self.index.name}:{'+inf' if key is None else repr(key)}"
+
+    def scan(self, lo, hi, t_id):
+        """[lo, hi] 범위를 S 로 잠그고 읽는다. 막히면 None."""
+        while True:
+            keys = self.index.range(lo, hi)
+            for key in keys + [self.index.next_key(hi)]:
+                if not self.lm.try_acquire(self.lock_name(key), "S", t_id):
+                    return None
+            # 잠그는 사이 범위가 바뀌었으면(다른 스레드의 삽입/삭제) 새 키까지 다시 잠근다
+            if self.index.range(lo, hi) == keys:
+                return keys
+
+    def insert(self, key, t_id) -> bool:
+        if not self.lm.try_acquire(self.lock_name(self.index.next_key(key)), "IX", t_id):
+            return False
+        if not self.lm.try_acquire(self.lock_name(key), "X", t_id):
+            return False
+        self.index.insert(key)
+        return True
+
+    def delete(self, key, t_id) -> bool:
+        if not self.lm.try_acquire(self.lock_name(key), "X", t_id):
+            return False
+        while True:
+            nxt = self.index.next_key(key)
+            if not self.lm.try_acquire(self.lock_name(nxt), "X", t_id):
+                return False
+            # 잠그는 사이 k 와 다음 키 사이에 삽입이 끼어들었으면 새 다음 키까지 다시 잠근다
+            if self.index.next_key(key) == nxt:
+                break
+        self.index.delete(key)
+        return True
+
 
 def demo_2pl():
     """
-    2PL + 서술 잠금 흉내로 write skew를 방지하는 예.
+    2PL + 인덱스 범위 잠금으로 write skew를 방지하는 예.
 
     아이디어:
-    - '당직자가 존재한다'는 서술 잠금에 대해 S락으로 점검한 뒤,
-      off로 바꾸려면 X락으로 승격(업그레이드)해야 한다.
-    - 두 트랜잭션이 동시에 업그레이드하려 하면 한쪽은 실패/대기 → 결국 한 쪽만 성공.
-
-    단순화를 위해: 대기 대신 '업그레이드 실패=롤백'으로 구현.
-    """
-    # 공유 데이터(그냥 dict)
-    store = {"A_on": True, "B_on": True}
-    lm = LockManager()
-
-    t1_committed = False
-    t2_committed = False
-
-    # 두 트랜잭션이 동시에 'on-call 인 row를 읽기 위한' 서술 공유 잠금을 얻기(S)
-    assert lm.try_acquire("pred:on_call_exists", "S", "T1")
-    assert lm.try_acquire("pred:on_call_exists", "S", "T2")
-
-    # T1: on-call 인 row 의 정보를 변경(쓰기)할  수 있도록, 독점 잠금으로 업그레이드 시도
-    # pred:on_call_exists 에 대한 서술 공유 잠금을 가진 다른 트랜잭션이 있으므로, 서로 대기를 하게 됨 (데드락)
-    # 여기서는 upgrade가 실패한 걸로 표기
-    t1_upgraded = lm.try_acquire("pred:on_call_exists", "X", "T1")
-    t2_upgraded = lm.try_acquire("pred:on_call_exists", "X", "T2")
-
-    # deadlock detection 에 의한 후처리 진행
-    if not t1_upgraded and not t2_upgraded:
-        # 여기서는 t1 롤백하여 t2 가 업그레이드 되도록 처리
-        lm.release("pred:on_call_exists", "S", "T1")
-        t1_committed = False
-        t2_upgraded = lm.try_acquire("pred:on_call_exists", "X", "T2")
-
-    if t2_upgraded:
-        store["B_on"] = False
-        t2_committed = True
-        lm.release("pred:on_call_exists", "X", "T2")
-
-    return {"final": store, "t1_committed": t1_committed, "t2_committed": t2_committed}
\ No newline at end of file
+    - 당직 인덱스 (shift, doctor) 에서 '내 근무조의 당직자' 범위를 S 로 잠그고 읽은 뒤,
+      off 로 바꾸려면 내 인덱스 항목을 지워야 하므로 그 키에 X 가 필요하다.
+    - 같은 근무조의 두 트랜잭션은 서로가 읽은(S) 키를 지우려 하므로 서로 기다리는 교착 상태가 되고,
+      락 매니저의 wait-for 그래프가 사이클을 찾아 희생자 하나를 어보트 → 한 쪽만 성공.
+    - 다른 근무조만 건드리는 트랜잭션은 범위가 겹치지 않아 막히지 않는다.
+
+    단순화를 위해: 대기는 '실패 후 재시도'로 표현.
+    """
+    # 당직 인덱스: 1번 근무조에 A, B 두 의사가 당직 중
+    on_call = OrderedIndex("on_call", [(1, "A"), (1, "B")])
+    lm = LockManager(policy="detect")
+    ranges = KeyRangeLocker(lm, on_call)
+    # T1이 먼저 시작(더 오래된 트랜잭션)
+    lm.begin("T1")
+    lm.begin("T2")
+    my_key = {"T1": (1, "A"), "T2": (1, "B")}
+    shift1 = ((1, ""), (1, "\uffff"))
+    committed = {"T1": False, "T2": False}
+
+    # 두 트랜잭션이 동시에 '1번 근무조 당직자' 범위를 읽는다(S)
+    seen = {t_id: ranges.scan(*shift1, t_id) for t_id in ("T1", "T2")}
+
+    # 각자 둘 이상 당직이면 자기 항목을 지운다(= off)
+    # 상대가 S 로 읽은 키를 지우려 하므로 서로 대기 (데드락)
+    # → 두 번째 요청에서 사이클이 탐지되고, 희생자가 어보트되면 남은 쪽이 진행된다
+    pending = ["T1", "T2"]
+    while pending:
+        t_id = pending.pop(0)
+        try:
+            if len(seen[t_id]) > 1 and not ranges.delete(my_key[t_id], t_id):
+                # 대기 → 다음 차례에 재시도
+                pending.append(t_id)
+                continue
+        except TxnAborted:
+            # 희생자: 롤백(지운 게 없으니 락 정리만)
+            lm.release_all(t_id)
+            continue
+        committed[t_id] = True
+        lm.release_all(t_id)
+
+    return {
+        "final": {"A_on": (1, "A") in on_call, "B_on": (1, "B") in on_call},
+        "t1_committed": committed["T1"],
+        "t2_committed": committed["T2"],
+        "deadlocks": lm.stats["deadlocks"],
+    }